@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+# Compares the throughput of the streaming log decoder with the previous per-chunk pipeline
+# (base64 decoding, bytes to str decoding then regex substitution through the `re` module cache).
+# Usage: ./benchmarks/log_decoding.py [size in MB]
+
+import base64
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyghost.utils import LogDecoder  # noqa: E402
+
+COLORED_LINE = ('2019/02/11 09:34:37 GMT: \x1B[32mTASK [webfront : Deploy module] ***\x1B[0m '
+                'changed: [10.0.0.12] => {"msg": "déploiement terminé"}\n').encode('utf-8')
+PLAIN_LINE = '2019/02/11 09:34:37 GMT: ok: [10.0.0.12] => {"msg": "déploiement terminé"}\n'.encode('utf-8')
+PROFILES = (
+    ('colored', COLORED_LINE),
+    ('mostly plain', COLORED_LINE + PLAIN_LINE * 9),
+)
+CHUNK_SIZE = 4096
+
+
+def legacy_decode(raw_payload):
+    data_str = base64.b64decode(raw_payload)
+    # `trim_ansi_tags` used a strict decoding, which fails on characters split between chunks
+    data_str = data_str.decode('utf-8', 'replace')
+    return re.sub(r'\x1B\[[0-?]*[ -/]*[@-~]', '', data_str)
+
+
+def build_events(size, pattern):
+    data = pattern * (size // len(pattern) + 1)
+    return [base64.b64encode(data[i:i + CHUNK_SIZE]).decode('ascii') for i in range(0, size, CHUNK_SIZE)]
+
+
+def run(name, events, size, decode):
+    start = time.perf_counter()
+    for payload in events:
+        decode(payload)
+    elapsed = time.perf_counter() - start
+    print('{:<30} {:>8.1f} MB/s'.format(name, size / elapsed / 1024 / 1024))
+
+
+def main():
+    size = int(float(sys.argv[1]) * 1024 * 1024) if len(sys.argv) > 1 else 64 * 1024 * 1024
+    for profile, pattern in PROFILES:
+        events = build_events(size, pattern)
+        decoder = LogDecoder(no_color=True)
+        run('legacy ({})'.format(profile), events, size, legacy_decode)
+        run('LogDecoder ({})'.format(profile), events, size,
+            lambda payload: decoder.feed(decoder.decode_base64(payload)))
+
+
+if __name__ == '__main__':
+    main()
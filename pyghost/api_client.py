@@ -1,22 +1,77 @@
-import base64
+import collections
 import copy
+import functools
+import heapq
+import itertools
 import json
 import os
+import re
+import threading
 import time
 import urllib.parse
+import warnings
 from base64 import b64encode
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 from enum import Enum
 
 import requests
+from requests.adapters import HTTPAdapter
+from schema import SchemaError
 from socketIO_client import SocketIO
 
-from .app_schema import APPLICATION_SCHEMA, APPLICATION_ID_SCHEMA
-from .utils import trim_xml_html_tags, trim_ansi_tags
+from .app_schema import COMPILED_APPLICATION_ID_SCHEMA, COMPILED_APPLICATION_SCHEMA
+from .rate_limit import RateLimiter
+from .single_flight import SingleFlight
+from .utils import Backoff, CircuitBreaker, parse_retry_after
 
 DEFAULT_HEADERS = {'Content-type': 'application/json', 'Accept': 'text/plain'}
 
 DEFAULT_PAGE_SIZE = 20
 
+# Eve default `PAGINATION_LIMIT`, used to walk full collections
+DEFAULT_ITER_PAGE_SIZE = 50
+
+DEFAULT_POOL_SIZE = 10
+
+# (connect, read) timeouts, in seconds
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_RETRIES = 3
+DEFAULT_RETRY_DELAY = 0.5
+# Longer `Retry-After` delays are not waited for, the request fails instead
+DEFAULT_MAX_RETRY_DELAY = 30
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+# Most application ids sent in a single `$in` filter, longer query strings may be rejected by the server (HTTP 414)
+DEFAULT_MAX_FILTER_IDS = 100
+
+# Eve object ids, replaced in request paths so that they can be grouped by endpoint
+OBJECT_ID_RE = re.compile(r'(?<=/)[0-9a-f]{24}(?=/|$)')
+# Eve dates, sorted as such when merging lists
+RFC1123_DATE_RE = re.compile(r'^\w{3}, \d{2} \w{3} \d{4} \d{2}:\d{2}:\d{2} GMT$')
+
+DEFAULT_CIRCUIT_FAILURES = 5
+DEFAULT_CIRCUIT_RESET_TIMEOUT = 30
+
+# Longest delay between two job status checks of `wait_for_jobs`, in seconds, the former fixed polling period
+DEFAULT_WAIT_INTERVAL = 3
+
+DEFAULT_SUBMIT_WORKERS = 10
+DEFAULT_RETRIEVE_WORKERS = 10
+DEFAULT_BULK_SIZE = 50
+
+DEFAULT_LOG_BUFFER_SIZE = 1000
+
+# Idle socket.io connections kept open per host, for fast log attaches
+DEFAULT_WARM_LOG_SOCKETS = 2
+
+DEFAULT_APP_RESOLVER_TTL = 60
+
+# Lean projections, for status boards and other listings which do not need full documents
+APP_SUMMARY_FIELDS = ('name', 'env', 'role')
+JOB_SUMMARY_FIELDS = ('command', 'status', 'user', 'app_id', 'message')
+DEPLOYMENT_SUMMARY_FIELDS = ('app_id', 'job_id', 'module', 'revision', 'commit', 'timestamp')
+
 METHOD_GET = 'get'
 METHOD_POST = 'post'
 METHOD_PATCH = 'patch'
@@ -52,6 +107,11 @@ ROLLING_UPDATE_STRATEGY_HALF = '50%'
 ROLLING_UPDATE_STRATEGIES = (ROLLING_UPDATE_STRATEGY_ONE_BY_ONE, ROLLING_UPDATE_STRATEGY_THIRD,
                              ROLLING_UPDATE_STRATEGY_QUARTER, ROLLING_UPDATE_STRATEGY_HALF)
 
+LOG_BUFFER_BLOCK = 'block'
+LOG_BUFFER_DROP_OLDEST = 'drop_oldest'
+LOG_BUFFER_DROP_NEWEST = 'drop_newest'
+LOG_BUFFER_POLICIES = (LOG_BUFFER_BLOCK, LOG_BUFFER_DROP_OLDEST, LOG_BUFFER_DROP_NEWEST)
+
 
 class JobStatuses(Enum):
     def __str__(self):
@@ -65,6 +125,14 @@ class JobStatuses(Enum):
     ABORTED = 'aborted'
 
 
+FINISHED_JOB_STATUSES = (JobStatuses.DONE.value, JobStatuses.FAILED.value,
+                         JobStatuses.ABORTED.value, JobStatuses.CANCELLED.value)
+STARTED_JOB_STATUSES = (JobStatuses.STARTED.value,) + FINISHED_JOB_STATUSES
+
+WAIT_ALL_COMPLETED = 'all_completed'
+WAIT_FIRST_COMPLETED = 'first_completed'
+
+
 class JobCommands(Enum):
     def __str__(self):
         return str(self.value)
@@ -86,22 +154,358 @@ class JobCommands(Enum):
 
 
 class ApiClientException(Exception):
+    def __init__(self, message, status_code=None):
+        """
+        :param message: str: error message
+        :param status_code: int: HTTP status code of the failed response, if any
+        """
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RequestEvent(object):
+    """
+    A request attempt, as seen by the request hooks.
+    A hook object implements any of `before_request(event)`, `after_response(event)` and `on_error(event, exception)`,
+    see `pyghost.metrics.RequestHooks`. `context` can be used by hooks to keep their own state between those calls.
+    `before_request` is called once the client rate limiter lets the attempt through: `queue_wait` is the time spent
+    waiting for it, and is not part of `elapsed`.
+    """
+    __slots__ = ('method', 'endpoint', 'url', 'attempt', 'bytes_out', 'bytes_in', 'status_code', 'elapsed',
+                 'queue_wait', 'context')
+
+    def __init__(self, method, endpoint, url, bytes_out=0):
+        """
+        :param method: str: HTTP method
+        :param endpoint: str: request path, object ids replaced by `{id}`
+        :param url: str: full request URL
+        :param bytes_out: int: size of the request body
+        """
+        self.method = method
+        self.endpoint = endpoint
+        self.url = url
+        self.attempt = 0
+        self.bytes_out = bytes_out
+        self.bytes_in = 0
+        self.status_code = None
+        self.elapsed = None
+        self.queue_wait = 0.0
+        self.context = {}
+
+
+def get_endpoint(path, object_id=None):
+    """
+    Return the endpoint of a request, used to group requests in metrics
+    :param path: str: request path
+    :param object_id: str: requested object id
+    :return: str:
+
+    >>> get_endpoint('/jobs/5a8f1c2e9d3b4a0012345678/websocket_token/')
+    '/jobs/{id}/websocket_token/'
+    >>> get_endpoint('/apps/', '5a8f1c2e9d3b4a0012345678')
+    '/apps/{id}'
+    """
+    if object_id:
+        path = urllib.parse.urljoin(path, '{id}')
+    return OBJECT_ID_RE.sub('{id}', path)
+
+
+def create_request_event(method, path, object_id, url, body):
+    """
+    Return the `RequestEvent` of a request
+    :param method: str: HTTP method
+    :param path: str: request path
+    :param object_id: str: requested object id
+    :param url: str: full request URL
+    :param body: dict|list: JSON request body
+    :return: RequestEvent:
+    """
+    bytes_out = len(json.dumps(body).encode()) if body is not None else 0
+    return RequestEvent(method.upper(), get_endpoint(path, object_id), url, bytes_out)
+
+
+def get_retry_delay(retry_after, backoff):
+    """
+    Return the delay before retrying a request
+    :param retry_after: str: `Retry-After` header of the response, if any
+    :param backoff: Backoff: delays used when the server does not give one
+    :return: float: delay in seconds, or None if the server asks to wait longer than DEFAULT_MAX_RETRY_DELAY
+
+    >>> get_retry_delay('2', Backoff(initial=1, jitter=0))
+    2.0
+    >>> get_retry_delay(None, Backoff(initial=1, jitter=0))
+    1
+    >>> get_retry_delay('3600', Backoff()) is None
+    True
+    """
+    delay = backoff.next()
+    server_delay = parse_retry_after(retry_after)
+    if server_delay is not None:
+        if server_delay > DEFAULT_MAX_RETRY_DELAY:
+            return None
+        delay = max(delay, server_delay)
+    return delay
+
+
+def _call_hooks(hooks, name, *args):
+    for hook in hooks:
+        method = getattr(hook, name, None)
+        if method is not None:
+            method(*args)
+
+
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(host):
+    """
+    Return the `CircuitBreaker` shared by all the clients of a host
+    :param host: str: host for API
+    :return: CircuitBreaker:
+    """
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(host)
+        if breaker is None:
+            breaker = _circuit_breakers[host] = CircuitBreaker(DEFAULT_CIRCUIT_FAILURES, DEFAULT_CIRCUIT_RESET_TIMEOUT)
+        return breaker
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(host):
+    """
+    Return the `RateLimiter` shared by all the clients of a host, it does not limit anything until configured:
+
+        get_rate_limiter('https://cloud-deploy.example.com').configure(rate=20, max_in_flight=8)
+
+    :param host: str: host for API
+    :return: RateLimiter:
+    """
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(host)
+        if limiter is None:
+            limiter = _rate_limiters[host] = RateLimiter()
+        return limiter
+
+
+_single_flights = {}
+_single_flights_lock = threading.Lock()
+
+
+def get_single_flight(host):
+    """
+    Return the `SingleFlight` group shared by all the coalescing clients of a host
+    :param host: str: host for API
+    :return: SingleFlight:
+    """
+    with _single_flights_lock:
+        group = _single_flights.get(host)
+        if group is None:
+            group = _single_flights[host] = SingleFlight()
+        return group
+
+
+_log_sockets = {}
+_log_sockets_lock = threading.Lock()
+
+
+def _checkout_log_socket(host):
+    """
+    Return an idle socket.io connection to a host, kept open by a previous fast log attach, or open a new one
+    :param host: str: websocket server URL
+    :return: SocketIO:
+    """
+    with _log_sockets_lock:
+        sockets = _log_sockets.get(host, [])
+        while sockets:
+            socket = sockets.pop()
+            if socket.connected:
+                return socket
+    return SocketIO(host, verify=True)
+
+
+def _checkin_log_socket(host, socket):
+    """
+    Keep a socket.io connection open for the next fast log attach, or close it if enough are kept
+    :param host: str: websocket server URL
+    :param socket: SocketIO:
+    """
+    socket.on('job', _ignore_log_event)
+    with _log_sockets_lock:
+        sockets = _log_sockets.setdefault(host, [])
+        if socket.connected and len(sockets) < DEFAULT_WARM_LOG_SOCKETS:
+            sockets.append(socket)
+            return
+    socket.disconnect()
+
+
+def _ignore_log_event(*args):
     pass
 
 
+def _get_websocket_error(error):
+    """
+    Return the error given to the exception handler of a log stream when the websocket server cannot be reached
+    :param error: Exception: probe or connection error
+    :return: ApiClientException:
+    """
+    if isinstance(error, ApiClientException):
+        return error
+    exception = ApiClientException('Websocket server is unavailable.')
+    exception.__cause__ = error
+    return exception
+
+
+def _chunk_ids(ids, size):
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def get_sort_key(sort):
+    """
+    Return the key function and order of an Eve `sort` argument, used to merge lists sorted by the server.
+    Dates are compared as dates and embedded documents by id.
+    :param sort: str: comma separated fields, descending when prefixed by '-'
+    :return: tuple: (key, reverse)
+
+    >>> key, reverse = get_sort_key('-_updated')
+    >>> reverse, key({'_updated': 'Tue, 02 Jan 2018 10:00:00 GMT'}) > key({'_updated': 'Wed, 27 Dec 2017 10:00:00 GMT'})
+    (True, True)
+    >>> get_sort_key('name,-_id')
+    Traceback (most recent call last):
+    ...
+    pyghost.api_client.ApiClientException: Lists sorted in mixed orders cannot be merged: "name,-_id"
+    """
+    fields = [field.strip() for field in sort.split(',') if field.strip()]
+    reverse = bool(fields) and fields[0].startswith('-')
+    if any(field.startswith('-') != reverse for field in fields):
+        raise ApiClientException('Lists sorted in mixed orders cannot be merged: "{}"'.format(sort))
+    names = [field.lstrip('-') for field in fields]
+
+    def key(obj):
+        return tuple(_get_sort_value(obj.get(name)) for name in names)
+    return key, reverse
+
+
+def _get_sort_value(value):
+    if isinstance(value, dict):
+        value = value.get('_id')
+    if isinstance(value, str) and RFC1123_DATE_RE.match(value):
+        value = parsedate_to_datetime(value).timestamp()
+    # Missing values come first, as in MongoDB
+    return value is not None, value
+
+
+def _merge_pages(heads, page, sort):
+    """
+    Cut a page out of the results of several list queries, as if they were a single one
+    :param heads: list: (objects, page size, total number of objects) of each query, objects being at least the
+                        first `page` pages in `sort` order
+    :param page: int: page to cut
+    :param sort: str:
+    :return: tuple: (data_list, data_results_per_page, data_total_items, data_current_page)
+    """
+    key, reverse = get_sort_key(sort)
+    nb = min(head_nb for _, head_nb, _ in heads)
+    objects = sorted(itertools.chain.from_iterable(objects for objects, _, _ in heads), key=key, reverse=reverse)
+    return objects[(page - 1) * nb:page * nb], nb, sum(total for _, _, total in heads), page
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Creates a pooled, keep-alive HTTP session which can be shared between several API clients
+    :param pool_size: int: maximum number of connections kept alive per host
+    :return: requests.Session:
+
+    >>> session = create_session(pool_size=4)
+    >>> adapter = session.get_adapter('https://cloud-deploy')
+    >>> adapter.poolmanager.connection_pool_kw['maxsize'], adapter is session.get_adapter('http://cloud-deploy')
+    (4, True)
+    >>> ApiClient('cloud-deploy', 'user', 'pass', session=session).session is session
+    True
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+RetrievedObjects = collections.namedtuple('RetrievedObjects', ['objects', 'missing'])
+
+
 class ApiClient(object):
     path = None
-
-    def __init__(self, host, username, password):
+    # Reference fields embedded by default in listed objects
+    default_embed = ()
+    # Whether the server accepts `$in` queries on `_id`, unknown until the first attempt
+    _in_query_supported = None
+    # Longer application filters are split into several list queries, see `_list_filtered`
+    max_filter_ids = DEFAULT_MAX_FILTER_IDS
+
+    def __init__(self, host, username, password, session=None, pool_size=DEFAULT_POOL_SIZE, cache=None,
+                 timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, circuit_breaker=None, rate_limiter=None,
+                 hooks=None, coalesce=False):
         """
         Creates an API client instance
         :param host: str: host for API
         :param username: str: username for API
         :param password: str: password for API
+        :param session: requests.Session: shared HTTP session, a private one is created if not set
+        :param pool_size: int: connection pool size of the private HTTP session
+        :param cache: pyghost.cache.ResponseCache: optional cache used to revalidate retrieved objects with their etag
+        :param timeout: float|tuple: request timeout, or (connect, read) timeouts, in seconds
+        :param retries: int: number of retries of idempotent requests failing with a connection error or
+                        a RETRY_STATUS_CODES status
+        :param circuit_breaker: CircuitBreaker: defaults to the breaker shared by all the clients of the host
+        :param rate_limiter: RateLimiter: defaults to the limiter shared by all the clients of the host
+        :param hooks: list: request hooks, see `RequestEvent`
+        :param coalesce: bool: share a single request, and its response, between identical GET requests sent
+                         at the same time by the clients of the host, see `get_single_flight`
         """
         self.host = host
         self.username = username
         self.password = password
+        self.pool_size = pool_size
+        self.cache = cache
+        self.timeout = timeout
+        self.retries = retries
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker(host)
+        self.rate_limiter = rate_limiter or get_rate_limiter(host)
+        self.hooks = tuple(hooks or ())
+        self.single_flight = get_single_flight(host) if coalesce else None
+        self._session = session
+        self._owns_session = session is None
+        self._session_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def session(self):
+        """
+        HTTP session used by this client, lazily created and kept alive between requests
+        :return: requests.Session:
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = create_session(self.pool_size)
+        return self._session
+
+    def close(self):
+        """
+        Close the HTTP session if it is owned by this client, shared sessions are left open
+        """
+        with self._session_lock:
+            if self._owns_session and self._session is not None:
+                self._session.close()
+                self._session = None
 
     @staticmethod
     def _clean_dict_object(obj):
@@ -131,9 +535,11 @@ class ApiClient(object):
         return base_url
 
     def _do_request(self, path, object_id=None, body=None, params=None,
-                    method=METHOD_GET, return_type=RETURN_TYPE_JSON, headers=None):
+                    method=METHOD_GET, return_type=RETURN_TYPE_JSON, headers=None, idempotency_key=None):
         """
-        Do the API requests
+        Do the API requests.
+        GET requests, and other ones sent with an idempotency key, are retried on connection errors and
+        RETRY_STATUS_CODES statuses, with an exponential backoff honouring `Retry-After`.
         :param path: str:
         :param object_id: str:
         :param body: dict:
@@ -141,28 +547,124 @@ class ApiClient(object):
         :param method: str:
         :param return_type: str:
         :param headers: dict:
+        :param idempotency_key: str: sent as `Idempotency-Key` header, makes the request safe to retry
         :return: dict:
+
+        >>> class Response(object):
+        ...     def __init__(self, status_code, headers=None):
+        ...         self.status_code, self.headers = status_code, headers or {}
+        ...         self.content, self.text = b'{}', '{}'
+        ...     def json(self):
+        ...         return {}
+        >>> class Session(object):
+        ...     '''Sends the queued responses, then 200 ones'''
+        ...     def __init__(self, *responses):
+        ...         self.responses, self.methods = list(responses), []
+        ...     def request(self, method, url, **kwargs):
+        ...         self.methods.append(method.upper())
+        ...         return self.responses.pop(0) if self.responses else Response(200)
+        >>> session = Session(Response(503), Response(429, {'Retry-After': '3600'}))
+        >>> breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+        >>> api = AppsApiClient('https://cloud-deploy', 'user', 'password', session=session, circuit_breaker=breaker)
+        >>> api._do_request('/apps/', '1')  # 503 retried, 429 not since the server asks to wait too long
+        Traceback (most recent call last):
+        ...
+        pyghost.api_client.ApiClientException: Error while calling Cloud Deploy : [429] {}
+        >>> session.methods
+        ['GET', 'GET']
+        >>> session.responses = [Response(503), Response(503)]
+        >>> for _ in range(2):  # POST requests are not retried, the second failure in a row opens the circuit
+        ...     try:
+        ...         api._do_request('/apps/', body={'name': 'front'}, method=METHOD_POST)
+        ...     except ApiClientException as e:
+        ...         print(e.status_code)
+        503
+        503
+        >>> api._do_request('/apps/', '1')  # doctest: +ELLIPSIS
+        Traceback (most recent call last):
+        ...
+        pyghost.api_client.ApiClientException: Cloud Deploy is unavailable, request to ... not sent
+        >>> time.sleep(0.1)
+        >>> api._do_request('/apps/', '1'), breaker.failures  # half-open: the trial request closes the circuit
+        ({}, 0)
+        >>> session.methods
+        ['GET', 'GET', 'POST', 'POST', 'GET']
         """
         if headers is None:
             headers = {}
+        if idempotency_key is not None:
+            headers['Idempotency-Key'] = idempotency_key
         url = self._get_url(path, params, object_id)
-        try:
-            response = requests.request(method, url,
-                                        json=body,
-                                        auth=(self.username, self.password),
-                                        headers={**DEFAULT_HEADERS, **headers})
-            if response.status_code >= 300:
-                raise ApiClientException(
-                    'Error while calling Cloud Deploy : [{}] {}'.format(response.status_code, response.text))
-            if return_type == RETURN_TYPE_JSON:
-                ret = response.json()
+        if method == METHOD_GET and self.single_flight is not None:
+            key = (self.username, self.password, url, return_type, tuple(sorted(headers.items())))
+            return self.single_flight.do(key, self._send_request, path, object_id, url, body, method, return_type,
+                                         headers, idempotency_key)
+        return self._send_request(path, object_id, url, body, method, return_type, headers, idempotency_key)
+
+    def _send_request(self, path, object_id, url, body, method, return_type, headers, idempotency_key):
+        """
+        Send an API request, retrying it if it is safe to do so
+        :return: dict:
+        """
+        retries = self.retries if method == METHOD_GET or idempotency_key is not None else 0
+        backoff = Backoff(initial=DEFAULT_RETRY_DELAY, maximum=DEFAULT_MAX_RETRY_DELAY)
+        event = create_request_event(method, path, object_id, url, body) if self.hooks else None
+        attempt = 0
+        while True:
+            if not self.circuit_breaker.allow():
+                raise ApiClientException('Cloud Deploy is unavailable, request to {} not sent'.format(url))
+            queued_at = started_at = time.perf_counter()
+            try:
+                with self.rate_limiter:
+                    if event is not None:
+                        started_at = time.perf_counter()
+                        event.attempt = attempt
+                        event.queue_wait = started_at - queued_at
+                        _call_hooks(self.hooks, 'before_request', event)
+                    response = self.session.request(method, url,
+                                                    json=body,
+                                                    auth=(self.username, self.password),
+                                                    headers={**DEFAULT_HEADERS, **headers},
+                                                    timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.circuit_breaker.record_failure()
+                if event is not None:
+                    event.elapsed = time.perf_counter() - started_at
+                    _call_hooks(self.hooks, 'on_error', event, e)
+                if attempt >= retries:
+                    raise ApiClientException('Error while sending request to {}'.format(url)) from e
+                delay = backoff.next()
             else:
-                ret = response.text
-        except requests.ConnectionError as e:
-            raise ApiClientException('Error while sending request to {}'.format(url)) from e
+                if event is not None:
+                    event.elapsed = time.perf_counter() - started_at
+                    event.status_code = response.status_code
+                    event.bytes_in = len(response.content)
+                    _call_hooks(self.hooks, 'after_response', event)
+                if response.status_code >= 500:
+                    self.circuit_breaker.record_failure()
+                else:
+                    self.circuit_breaker.record_success()
+                delay = None
+                if response.status_code in RETRY_STATUS_CODES and attempt < retries:
+                    delay = get_retry_delay(response.headers.get('Retry-After'), backoff)
+                if delay is None:
+                    break
+            attempt += 1
+            time.sleep(delay)
+
+        if response.status_code == 304:
+            # Only returned to conditional requests, the caller already holds the document
+            return None
+        if response.status_code >= 300:
+            raise ApiClientException(
+                'Error while calling Cloud Deploy : [{}] {}'.format(response.status_code, response.text),
+                status_code=response.status_code)
+        if return_type != RETURN_TYPE_JSON:
+            return response.text
+        try:
+            return response.json()
         except ValueError as e:
             raise ApiClientException('Error while reading response from {}'.format(url)) from e
-        return ret
 
     def _do_retrieve(self, path, object_id, **extra_params):
         """
@@ -172,8 +674,22 @@ class ApiClient(object):
         :param extra_params: dict:
         :return: dict:
         """
-        data = self._do_request(path, object_id, params=extra_params)
-        return self._clean_dict_object(data)
+        if self.cache is None:
+            data = self._do_request(path, object_id, params=extra_params)
+            return self._clean_dict_object(data)
+
+        key = (self.username, self._get_url(path, extra_params, object_id))
+        entry = self.cache.get(key)
+        headers = {'If-None-Match': entry.etag} if entry else None
+        data = self._do_request(path, object_id, params=extra_params, headers=headers)
+        if data is None and entry:
+            self.cache.record(hit=True)
+            return copy.deepcopy(entry.data)
+        self.cache.record(hit=False)
+        data = self._clean_dict_object(data)
+        if data.get('_etag'):
+            self.cache.set(key, data['_etag'], data)
+        return data
 
     def _do_list(self, path, nb, page, sort, **extra_params):
         """
@@ -191,15 +707,147 @@ class ApiClient(object):
         return ([self._clean_dict_object(item) for item in data['_items']],
                 data['_meta']['max_results'], data['_meta']['total'], data['_meta']['page'])
 
-    def _do_create(self, path, obj, **extra_params):
+    def _iter_all(self, path, nb, sort, workers=1, **extra_params):
+        """
+        Lazily iterate over all the objects of a collection, page by page.
+        The next `workers` pages are fetched in background threads while the current one is consumed.
+        :param path: str:
+        :param nb: int: page size
+        :param sort: str:
+        :param workers: int: number of pages fetched concurrently
+        :param extra_params: dict:
+        :return: generator: objects
+
+        >>> class StubApi(ApiClient):
+        ...     '''8 objects, pages are capped at 3 objects by the server'''
+        ...     requests = []
+        ...     def _do_list(self, path, nb, page, sort, **extra_params):
+        ...         StubApi.requests.append((page, nb))
+        ...         nb = min(nb, 3)
+        ...         return [{'_id': str(n)} for n in range(8)][(page - 1) * nb:page * nb], nb, 8, page
+        >>> api = StubApi('localhost', 'user', 'pass')
+        >>> objects = api._iter_all('/apps/', 5, '_id', workers=2)
+        >>> [obj['_id'] for obj in objects]
+        ['0', '1', '2', '3', '4', '5', '6', '7']
+        >>> sorted(StubApi.requests)
+        [(1, 5), (2, 3), (3, 3)]
+        """
+        workers = max(workers or 1, 1)
+        # The server may cap the page size, the next pages are requested with the one it applied
+        items, nb, total, _ = self._do_list(path, nb, 1, sort, **extra_params)
+        last_page = max((total + nb - 1) // nb, 1)
+        pending = collections.deque()
+        next_page = 2
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                while True:
+                    while next_page <= last_page and len(pending) < workers:
+                        pending.append(executor.submit(self._do_list, path, nb, next_page, sort, **extra_params))
+                        next_page += 1
+                    yield from items
+                    if not pending:
+                        break
+                    items = pending.popleft().result()[0]
+                    if not items:
+                        break
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _list_head(self, path, nb, limit, sort, **extra_params):
+        """
+        Fetch the first objects of a collection, page by page
+        :param path: str:
+        :param nb: int: page size
+        :param limit: int: number of objects wanted
+        :param sort: str:
+        :param extra_params: dict:
+        :return: tuple: (objects, page size applied by the server, total number of objects)
+        """
+        objects = []
+        page = 1
+        while True:
+            items, nb, total, _ = self._do_list(path, nb, page, sort, **extra_params)
+            objects.extend(items)
+            if not items or len(objects) >= limit or page * nb >= total:
+                return objects[:limit], nb, total
+            page += 1
+
+    def _list_filtered(self, path, nb, page, sort, app_ids, get_query, **extra_params):
+        """
+        Do the list API call on objects filtered by application, see `_get_app_ids`.
+        Past `max_filter_ids` application ids, each chunk of ids is listed separately and the page is cut from their
+        merged first pages.
+        :param path: str:
+        :param nb: int:
+        :param page: int:
+        :param sort: str:
+        :param app_ids: list: application ids, or None
+        :param get_query: function: builds the `where` query of a list of application ids
+        :param extra_params: dict:
+        :return: tuple: (data_list, data_results_per_page, data_total_items, data_current_page)
+
+        >>> class StubApi(ApiClient):
+        ...     '''10 objects of 5 applications, pages are capped at 3 objects'''
+        ...     requests = 0
+        ...     def _do_list(self, path, nb, page, sort, where=None):
+        ...         StubApi.requests += 1
+        ...         app_ids = json.loads(where)['app_id']['$in']
+        ...         objects = [{'n': n, 'app_id': str(n % 5)} for n in range(9, -1, -1) if str(n % 5) in app_ids]
+        ...         nb = min(nb, 3)
+        ...         return objects[(page - 1) * nb:page * nb], nb, len(objects), page
+        >>> api = StubApi('localhost', 'user', 'pass')
+        >>> api.max_filter_ids = 2
+        >>> get_query = JobsApiClient._get_list_query
+        >>> objects, nb, total, page = api._list_filtered('/jobs/', 2, 2, '-n', ['0', '1', '2', '4'], get_query)
+        >>> [obj['n'] for obj in objects], nb, total, page, StubApi.requests
+        ([6, 5], 2, 8, 2, 4)
+        >>> [obj['n'] for obj in api._iter_filtered('/jobs/', 50, '-n', 1, ['0', '1', '2', '4'], get_query)]
+        [9, 7, 6, 5, 4, 2, 1, 0]
+        """
+        if app_ids is None or len(app_ids) <= self.max_filter_ids:
+            return self._do_list(path, nb, page, sort, where=get_query(app_ids), **extra_params)
+        return _merge_pages([self._list_head(path, nb, nb * page, sort, where=get_query(chunk), **extra_params)
+                             for chunk in _chunk_ids(app_ids, self.max_filter_ids)], page, sort)
+
+    def _iter_filtered(self, path, nb, sort, workers, app_ids, get_query, **extra_params):
+        """
+        Lazily iterate over objects filtered by application, see `_list_filtered` and `_iter_all`
+        :return: generator: objects
+        """
+        if app_ids is None or len(app_ids) <= self.max_filter_ids:
+            return self._iter_all(path, nb, sort, workers, where=get_query(app_ids), **extra_params)
+        key, reverse = get_sort_key(sort)
+        return heapq.merge(*[self._iter_all(path, nb, sort, workers, where=get_query(chunk), **extra_params)
+                             for chunk in _chunk_ids(app_ids, self.max_filter_ids)], key=key, reverse=reverse)
+
+    def _get_app_ids(self, application=None, env=None, role=None):
+        """
+        Resolve the application filter used on jobs and deployments
+        :param application: str: filter to apply on application name
+        :param env: str: filter to apply on application env
+        :param role: str: filter to apply on application role
+        :return: list: ids of the matching applications, or None if there is no application filter
+        """
+        if not (application or env or role):
+            return None
+        apps_api = AppsApiClient(self.host, self.username, self.password, session=self.session,
+                                 timeout=self.timeout, retries=self.retries, circuit_breaker=self.circuit_breaker,
+                                 rate_limiter=self.rate_limiter, hooks=self.hooks,
+                                 coalesce=self.single_flight is not None)
+        return get_app_id_resolver(self.host, self.username).resolve(apps_api, application, env, role)
+
+    def _do_create(self, path, obj, idempotency_key=None, **extra_params):
         """
         Do the create API call
         :param path: str:
         :param obj: dict:
+        :param idempotency_key: str: makes the request safe to retry
         :param extra_params: dict:
         :return: str:
         """
-        data = self._do_request(path, body=obj, params=extra_params, method=METHOD_POST)
+        data = self._do_request(path, body=obj, params=extra_params, method=METHOD_POST,
+                                idempotency_key=idempotency_key)
         return data.get('_id')
 
     def _do_update(self, path, obj, etag, headers=None, **extra_params):
@@ -220,39 +868,189 @@ class ApiClient(object):
         headers['If-Match'] = etag
         data = self._do_request(os.path.join(path, obj_id), body=obj, params=extra_params,
                                 method=METHOD_PATCH, headers=headers)
+        if self.cache is not None:
+            self.cache.invalidate((self.username, self._get_url(path, None, obj_id)))
         return data.get('_id')
 
-    def retrieve(self, object_id):
+    @staticmethod
+    def _get_query_params(fields=None, embed=None):
+        """
+        Build the Eve `projection` and `embedded` query arguments
+        :param fields: list|dict: fields to return, or an Eve projection such as {"modules": 0}
+        :param embed: list: reference fields to embed
+        :return: dict:
+
+        >>> ApiClient._get_query_params(JOB_SUMMARY_FIELDS, ['app_id'])['projection']
+        '{"command":1,"status":1,"user":1,"app_id":1,"message":1}'
+        >>> ApiClient._get_query_params({'modules': 0}, ['app_id', 'job_id'])['embedded']
+        '{"app_id":1,"job_id":1}'
+        >>> ApiClient._get_query_params()
+        {}
+        """
+        params = {}
+        if fields:
+            if not isinstance(fields, dict):
+                fields = collections.OrderedDict((field, 1) for field in fields)
+            params['projection'] = json.dumps(fields, separators=(',', ':'))
+        if embed:
+            params['embedded'] = json.dumps(collections.OrderedDict((field, 1) for field in embed),
+                                            separators=(',', ':'))
+        return params
+
+    def _get_list_params(self, fields=None, embed=None):
+        """
+        Build the `projection` and `embedded` query arguments of a list call
+        :param fields: list|dict: fields to return
+        :param embed: list: reference fields to embed, `default_embed` if not set
+        :return: dict:
+        """
+        return self._get_query_params(fields, self.default_embed if embed is None else embed)
+
+    def retrieve(self, object_id, fields=None, embed=None):
         """
         Retrieve an object
         :param object_id: str: id of the object
+        :param fields: list|dict: fields to return, or an Eve projection such as {"modules": 0}, all if not set
+        :param embed: list: reference fields to embed, none if not set
         :return: dict:
         """
         if not self.path:
             raise NotImplementedError('`path` variable must be defined')
-        return self._do_retrieve(self.path, object_id)
+        return self._do_retrieve(self.path, object_id, **self._get_query_params(fields, embed))
 
-    def list(self, nb=DEFAULT_PAGE_SIZE, page=1, sort='-_updated'):
+    def retrieve_many(self, object_ids, fields=None, embed=None, chunk_size=DEFAULT_ITER_PAGE_SIZE,
+                      max_workers=DEFAULT_RETRIEVE_WORKERS):
+        """
+        Retrieve several objects at once, with concurrent `{"_id": {"$in": [...]}}` list queries of `chunk_size` ids.
+        If the server rejects those queries, objects are retrieved one by one, concurrently.
+        Retrieved objects are stored in the client cache, if any, for the next `retrieve` calls.
+        :param object_ids: list: ids of the objects
+        :param fields: list|dict: fields to return, or an Eve projection such as {"modules": 0}, all if not set
+        :param embed: list: reference fields to embed, none if not set
+        :param chunk_size: int: maximum number of ids per list query
+        :param max_workers: int: maximum number of concurrent requests
+        :return: RetrievedObjects: (objects, missing), objects in the order of `object_ids`, None if not found,
+                 and the ids which were not found
+
+        >>> class StubAppsApi(AppsApiClient):
+        ...     '''Serves the applications "0" to "9", 4 per page at most'''
+        ...     requests = 0
+        ...     def _do_request(self, path, object_id=None, params=None, **kwargs):
+        ...         self.requests += 1
+        ...         ids = [i for i in json.loads(params['where'])['_id']['$in'] if i.isdigit()]
+        ...         nb, page = min(params['max_results'], 4), params['page']
+        ...         items = [{'_id': i} for i in ids[(page - 1) * nb:page * nb]]
+        ...         return {'_items': items, '_meta': {'max_results': nb, 'total': len(ids), 'page': page}}
+        >>> api = StubAppsApi('https://cloud-deploy', 'user', 'password')
+        >>> objects, missing = api.retrieve_many(['1', '5', 'x', '1', '2', '3', '4', '6', '7'], chunk_size=6)
+        >>> [obj and obj['_id'] for obj in objects], missing
+        (['1', '5', None, '1', '2', '3', '4', '6', '7'], ['x'])
+        >>> api.requests  # 2 pages for the first chunk of 6 ids, 1 for the second one
+        3
+        """
+        if not self.path:
+            raise NotImplementedError('`path` variable must be defined')
+        params = self._get_query_params(fields, embed)
+        unique_ids = list(collections.OrderedDict.fromkeys(object_ids))
+        found = {}
+        pending = unique_ids
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if self._in_query_supported is not False and len(unique_ids) > 1:
+                chunks = [unique_ids[i:i + chunk_size] for i in range(0, len(unique_ids), chunk_size)]
+                futures = [(chunk, executor.submit(self._retrieve_chunk, chunk, params)) for chunk in chunks]
+                pending = []
+                for chunk, future in futures:
+                    objects = future.result()
+                    if objects is None:
+                        pending.extend(chunk)
+                    else:
+                        found.update(objects)
+
+            futures = [(object_id, executor.submit(self._retrieve_or_none, object_id, params))
+                       for object_id in pending]
+            for object_id, future in futures:
+                obj = future.result()
+                if obj is not None:
+                    found[object_id] = obj
+        return RetrievedObjects([found.get(object_id) for object_id in object_ids],
+                                [object_id for object_id in unique_ids if object_id not in found])
+
+    def _retrieve_chunk(self, object_ids, params):
+        """
+        Retrieve objects with a single `$in` list query
+        :param object_ids: list: ids of the objects
+        :param params: dict: projection and embedding query arguments
+        :return: dict: objects by id, or None if they must be retrieved one by one
+        """
+        where = json.dumps({'_id': {'$in': object_ids}}, separators=(',', ':'))
+        try:
+            objects = list(self._iter_all(self.path, len(object_ids), '_id', where=where, **params))
+        except ApiClientException as e:
+            if e.status_code == 400:
+                # Filtering on `_id` is not allowed on the server
+                self._in_query_supported = False
+                return None
+            raise
+        self._in_query_supported = True
+        if self.cache is not None:
+            for obj in objects:
+                if obj.get('_etag'):
+                    key = (self.username, self._get_url(self.path, params, obj['_id']))
+                    self.cache.set(key, obj['_etag'], obj)
+        return {obj['_id']: obj for obj in objects}
+
+    def _retrieve_or_none(self, object_id, params):
+        """
+        Retrieve an object
+        :param object_id: str: id of the object
+        :param params: dict: projection and embedding query arguments
+        :return: dict: the object, or None if it does not exist
+        """
+        try:
+            return self._do_retrieve(self.path, object_id, **params)
+        except ApiClientException as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+    def list(self, nb=DEFAULT_PAGE_SIZE, page=1, sort='-_updated', fields=None, embed=None):
         """
         List objects
         :param nb: int: the number of objects to list
         :param page: int: the page to fetch
         :param sort: str: the object order
+        :param fields: list|dict: fields to return, or an Eve projection such as {"modules": 0}, all if not set
+        :param embed: list: reference fields to embed, `default_embed` if not set
         :return: tuple: returns the tuple (objects, number of results, total number of objects, page fetched)
         """
         if not self.path:
             raise NotImplementedError('`path` variable must be defined')
-        return self._do_list(self.path, nb, page, sort)
+        return self._do_list(self.path, nb, page, sort, **self._get_list_params(fields, embed))
 
-    def create(self, obj):
+    def iter_all(self, nb=DEFAULT_ITER_PAGE_SIZE, sort='-_updated', workers=1, fields=None, embed=None):
+        """
+        Iterate over all objects, fetching pages lazily
+        :param nb: int: the number of objects per page
+        :param sort: str: the object order
+        :param workers: int: the number of pages fetched ahead, concurrently
+        :param fields: list|dict: fields to return, or an Eve projection such as {"modules": 0}, all if not set
+        :param embed: list: reference fields to embed, `default_embed` if not set
+        :return: generator: objects
+        """
+        if not self.path:
+            raise NotImplementedError('`path` variable must be defined')
+        return self._iter_all(self.path, nb, sort, workers, **self._get_list_params(fields, embed))
+
+    def create(self, obj, idempotency_key=None):
         """
         Create an object
         :param obj: dict: the object
+        :param idempotency_key: str: unique key of this creation, the request is only retried if set
         :return: str: id of the created object
         """
         if not self.path:
             raise NotImplementedError('`path` variable must be defined')
-        return self._do_create(self.path, obj)
+        return self._do_create(self.path, obj, idempotency_key=idempotency_key)
 
     def get_version(self):
         """
@@ -272,7 +1070,8 @@ class ApiClient(object):
 class AppsApiClient(ApiClient):
     path = '/apps/'
 
-    def list(self, nb=DEFAULT_PAGE_SIZE, page=1, sort='-_updated', name=None, env=None, role=None):
+    def list(self, nb=DEFAULT_PAGE_SIZE, page=1, sort='-_updated', name=None, env=None, role=None,
+             fields=None, embed=None):
         """
         List objects
         :param nb: int: the number of objects to list
@@ -281,8 +1080,44 @@ class AppsApiClient(ApiClient):
         :param name: str: filter to apply on application name
         :param env: str: filter to apply on application env
         :param role: str: filter to apply on application role
+        :param fields: list|dict: fields to return, or an Eve projection such as {"modules": 0}, all if not set
+        :param embed: list: reference fields to embed, `default_embed` if not set
         :return: tuple: returns the tuple (objects, number of results, total number of objects, page fetched)
         """
+        return self._do_list(self.path, nb, page, sort, where=self._get_list_query(name, env, role),
+                             **self._get_list_params(fields, embed))
+
+    def iter_all(self, nb=DEFAULT_ITER_PAGE_SIZE, sort='-_updated', workers=1, name=None, env=None, role=None,
+                 fields=None, embed=None):
+        """
+        Iterate over all objects, fetching pages lazily
+        :param nb: int: the number of objects per page
+        :param sort: str: the object order
+        :param workers: int: the number of pages fetched ahead, concurrently
+        :param name: str: filter to apply on application name
+        :param env: str: filter to apply on application env
+        :param role: str: filter to apply on application role
+        :param fields: list|dict: fields to return, or an Eve projection such as {"modules": 0}, all if not set
+        :param embed: list: reference fields to embed, `default_embed` if not set
+        :return: generator: objects
+        """
+        return self._iter_all(self.path, nb, sort, workers, where=self._get_list_query(name, env, role),
+                              **self._get_list_params(fields, embed))
+
+    @staticmethod
+    def _get_list_query(name=None, env=None, role=None):
+        """
+        Build the `where` query used to list applications
+        :param name: str: filter to apply on application name
+        :param env: str: filter to apply on application env
+        :param role: str: filter to apply on application role
+        :return: str:
+
+        >>> AppsApiClient._get_list_query()
+        '{}'
+        >>> AppsApiClient._get_list_query(name='front', env='prod', role='web')
+        '{"role":"web","env":"prod","name":{"$regex":"front"}}'
+        """
         query = []
         if role is not None:
             query.append('"role":"{role}"'.format(role=role))
@@ -290,17 +1125,20 @@ class AppsApiClient(ApiClient):
             query.append('"env":"{env}"'.format(env=env))
         if name is not None:
             query.append('"name":{{"$regex":"{name}"}}'.format(name=name))
-        return self._do_list(self.path, nb, page, sort, where='{' + ",".join(query) + '}')
+        return '{' + ",".join(query) + '}'
 
-    def create(self, obj):
+    def create(self, obj, idempotency_key=None):
         """
         Create an object
         :param obj: dict: the object
+        :param idempotency_key: str: unique key of this creation, the request is only retried if set
         :return: str: id of the created object
         """
         if not self.path:
             raise ValueError('`path` variable must be defined')
-        return self._do_create(self.path, obj)
+        app_id = self._do_create(self.path, obj, idempotency_key=idempotency_key)
+        get_app_id_resolver(self.host, self.username).invalidate()
+        return app_id
 
     def update(self, obj, etag):
         """
@@ -311,7 +1149,9 @@ class AppsApiClient(ApiClient):
         """
         if not self.path:
             raise ValueError('`path` variable must be defined')
-        return self._do_update(self.path, obj, etag)
+        app_id = self._do_update(self.path, obj, etag)
+        get_app_id_resolver(self.host, self.username).invalidate()
+        return app_id
 
     def validate_schema(self, app, check_id=False):
         """
@@ -320,23 +1160,150 @@ class AppsApiClient(ApiClient):
         :param check_id: bool: check application id
         :return: str|bool: id of the updated schema
         """
-        if check_id:
-            check_id = app['_id']
-            del app['_id']
-        APPLICATION_SCHEMA.validate(app)
-        if check_id:
-            APPLICATION_ID_SCHEMA.validate(check_id)
-        return check_id or app.get('_id')
+        return validate_application_schema(app, check_id)
+
+    def validate_many(self, apps, check_id=False, processes=None):
+        """
+        Validate many application schemas, the applications are not modified
+        :param apps: list: the application schemas
+        :param check_id: bool: check applications ids
+        :param processes: int: number of worker processes, validation is done in the current process if not set
+        :return: list: a `SchemaValidation(app_id, error)` per application, in the same order
+        """
+        apps = [dict(app) for app in apps]
+        if not processes:
+            return [_validate_application_schema(app, check_id) for app in apps]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            chunksize = max(len(apps) // (processes * 4), 1)
+            return list(executor.map(_validate_application_schema, apps, [check_id] * len(apps),
+                                     chunksize=chunksize))
+
+
+SchemaValidation = collections.namedtuple('SchemaValidation', ['app_id', 'error'])
+
+
+def validate_application_schema(app, check_id=False):
+    """
+    Validate an application schema
+    :param app: dict: the application schema, its `_id` is removed if checked
+    :param check_id: bool: check application id
+    :return: str|bool: id of the validated schema
+    """
+    if check_id:
+        check_id = app['_id']
+        del app['_id']
+    COMPILED_APPLICATION_SCHEMA.validate(app)
+    if check_id:
+        COMPILED_APPLICATION_ID_SCHEMA.validate(check_id)
+    return check_id or app.get('_id')
+
+
+def _validate_application_schema(app, check_id):
+    app_id = app.get('_id')
+    if check_id and app_id is None:
+        return SchemaValidation(None, SchemaError("Missing key: '_id'"))
+    try:
+        return SchemaValidation(validate_application_schema(app, check_id), None)
+    except SchemaError as e:
+        return SchemaValidation(app_id, e)
+
+
+class AppIdResolver(object):
+    """
+    Resolves application filters (name, env, role) to application ids, all matching pages included.
+    Results are cached for `ttl` seconds and dropped when an application is created or updated.
+
+    >>> resolver = AppIdResolver()
+    >>> resolver.set(('front', 'prod', None), ['a1'])
+    >>> resolver.get(('front', 'prod', None))
+    ['a1']
+    >>> resolver.invalidate()
+    >>> resolver.get(('front', 'prod', None)) is None
+    True
+    """
+
+    def __init__(self, ttl=DEFAULT_APP_RESOLVER_TTL):
+        """
+        :param ttl: int: number of seconds resolved ids are kept
+        """
+        self.ttl = ttl
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        :param key: tuple: (name, env, role) filter
+        :return: list: cached application ids, or None
+        """
+        with self._lock:
+            ids, expires_at = self._ids.get(key, (None, 0))
+            if expires_at < time.monotonic():
+                return None
+            return ids
+
+    def set(self, key, ids):
+        """
+        :param key: tuple: (name, env, role) filter
+        :param ids: list: application ids
+        """
+        with self._lock:
+            self._ids[key] = (ids, time.monotonic() + self.ttl)
+
+    def invalidate(self):
+        """
+        Drop all resolved ids
+        """
+        with self._lock:
+            self._ids.clear()
+
+    def resolve(self, apps_api, application=None, env=None, role=None):
+        """
+        Resolve an application filter
+        :param apps_api: AppsApiClient instance
+        :param application: str: filter to apply on application name
+        :param env: str: filter to apply on application env
+        :param role: str: filter to apply on application role
+        :return: list: ids of the matching applications
+        """
+        key = (application, env, role)
+        ids = self.get(key)
+        if ids is None:
+            ids = [app['_id'] for app in apps_api._iter_all(
+                apps_api.path, DEFAULT_ITER_PAGE_SIZE, '_id', projection='{"_id":1}',
+                where=AppsApiClient._get_list_query(application, env, role))]
+            self.set(key, ids)
+        return ids
+
+
+_app_id_resolvers = {}
+_app_id_resolvers_lock = threading.Lock()
+
+
+def get_app_id_resolver(host, username):
+    """
+    Return the `AppIdResolver` shared by all the clients of a host and user
+    :param host: str: host for API
+    :param username: str: username for API
+    :return: AppIdResolver:
+    """
+    with _app_id_resolvers_lock:
+        resolver = _app_id_resolvers.get((host, username))
+        if resolver is None:
+            resolver = _app_id_resolvers[(host, username)] = AppIdResolver()
+        return resolver
 
 
 def get_applist_join_query(apps_api, application_name, role, env):
     """
     Helper function to generate a query value, get all related application
+    Deprecated: jobs and deployments are filtered with the `$in` application ids of `ApiClient._get_app_ids`
     :param apps_api: AppsApiClient instance
     :param application_name: query app name filter
     :param role: query role filter
     :param env: query env filter
     """
+    warnings.warn('get_applist_join_query is deprecated, use JobsApiClient.list filters instead', DeprecationWarning,
+                  stacklevel=2)
     app_list, _, _, _ = apps_api.list(name=application_name, role=role, env=env)
     applications = [
         json.dumps({"app_id": application['_id']})
@@ -348,28 +1315,11 @@ def get_applist_join_query(apps_api, application_name, role, env):
         return '[{"app_id": "null"}]'
 
 
-class JobsApiClient(ApiClient):
-    path = '/jobs/'
-
-    def list(self, nb=DEFAULT_PAGE_SIZE, page=1, sort='-_updated',
-             application=None, env=None, role=None, command=None, status=None, user=None):
-        query = {}
-
-        if application or env or role:
-            apps_api = AppsApiClient(self.host, self.username, self.password)
-            query['$or'] = get_applist_join_query(apps_api, application, role, env)
-
-        if command:
-            query['command'] = '"{}"'.format(command)
-
-        if status:
-            query['status'] = '"{}"'.format(status)
-
-        if user:
-            query['user'] = '"{}"'.format(user)
-
-        querystr = '{' + ','.join('"{key}":{value}'.format(key=key, value=value) for key, value in query.items()) + '}'
-        return self._do_list(self.path, nb, page, sort, embedded='{"app_id":1}', where=querystr)
+class JobCommandsMixin(object):
+    """
+    Job commands builders, shared by the blocking and asyncio jobs API clients.
+    Each command builds the job document then hands it to `self.create`.
+    """
 
     def command_buildimage(self, application_id, instance_type=None, skip_bootstrap=None):
         """
@@ -581,7 +1531,271 @@ class JobsApiClient(ApiClient):
         }
         return self.create(job)
 
-    def get_logs_async(self, job_id, success_handler, exception_handler, wait_for_start=False, no_color=False):
+
+class JobSpecBuilder(JobCommandsMixin):
+    """
+    Builds and validates job documents from command specs, without sending them.
+    A spec is a dict holding the `command` name and the arguments of the matching `command_*` method.
+
+    >>> JobSpecBuilder().build({'command': 'swapbluegreen', 'application_id': 'a1'})
+    {'command': 'swapbluegreen', 'app_id': 'a1', 'options': ['overlap']}
+    >>> JobSpecBuilder().build({'command': JobCommands.PURGEBLUEGREEN, 'application_id': 'a1'})
+    {'command': 'purgebluegreen', 'app_id': 'a1', 'options': []}
+    >>> JobSpecBuilder().build({'command': 'unknown', 'application_id': 'a1'})
+    Traceback (most recent call last):
+    ...
+    pyghost.api_client.ApiClientException: Unknown job command "unknown"
+    """
+
+    def create(self, obj):
+        return obj
+
+    def build(self, spec):
+        """
+        Build a job document
+        :param spec: dict: command spec
+        :return: dict: the job
+        """
+        spec = dict(spec)
+        command = str(spec.pop('command', ''))
+        method = getattr(self, 'command_{}'.format(command), None)
+        if method is None:
+            raise ApiClientException('Unknown job command "{}"'.format(command))
+        return method(**spec)
+
+
+JobSubmission = collections.namedtuple('JobSubmission', ['job_id', 'error'])
+
+
+class JobsApiClient(JobCommandsMixin, ApiClient):
+    path = '/jobs/'
+    default_embed = ('app_id',)
+
+    # Whether the server accepts Eve bulk inserts, unknown until the first attempt
+    _bulk_supported = None
+
+    def list(self, nb=DEFAULT_PAGE_SIZE, page=1, sort='-_updated',
+             application=None, env=None, role=None, command=None, status=None, user=None, fields=None, embed=None):
+        return self._list_filtered(self.path, nb, page, sort, self._get_app_ids(application, env, role),
+                                   functools.partial(self._get_list_query, command=command, status=status, user=user),
+                                   **self._get_list_params(fields, embed))
+
+    def iter_all(self, nb=DEFAULT_ITER_PAGE_SIZE, sort='-_updated', workers=1,
+                 application=None, env=None, role=None, command=None, status=None, user=None, fields=None, embed=None):
+        """
+        Iterate over all jobs, fetching pages lazily
+        :param nb: int: the number of jobs per page
+        :param sort: str: the job order
+        :param workers: int: the number of pages fetched ahead, concurrently
+        :param fields: list|dict: fields to return, or an Eve projection such as {"modules": 0}, all if not set
+        :param embed: list: reference fields to embed, `default_embed` if not set
+        :return: generator: jobs
+        """
+        return self._iter_filtered(self.path, nb, sort, workers, self._get_app_ids(application, env, role),
+                                   functools.partial(self._get_list_query, command=command, status=status, user=user),
+                                   **self._get_list_params(fields, embed))
+
+    @staticmethod
+    def _get_list_query(app_ids=None, command=None, status=None, user=None):
+        """
+        Build the `where` query used to list jobs
+        :param app_ids: list: filter to apply on job application ids
+        :param command: str: filter to apply on job command
+        :param status: str: filter to apply on job status
+        :param user: str: filter to apply on job user
+        :return: str:
+
+        >>> JobsApiClient._get_list_query(command='deploy', status='done')
+        '{"command":"deploy","status":"done"}'
+        >>> JobsApiClient._get_list_query(app_ids=['a1', 'a2'])
+        '{"app_id":{"$in": ["a1", "a2"]}}'
+        """
+        query = {}
+
+        if app_ids is not None:
+            query['app_id'] = json.dumps({'$in': app_ids})
+
+        if command:
+            query['command'] = '"{}"'.format(command)
+
+        if status:
+            query['status'] = '"{}"'.format(status)
+
+        if user:
+            query['user'] = '"{}"'.format(user)
+
+        return '{' + ','.join('"{key}":{value}'.format(key=key, value=value) for key, value in query.items()) + '}'
+
+    def submit_many(self, specs, max_workers=DEFAULT_SUBMIT_WORKERS, bulk=True, bulk_size=DEFAULT_BULK_SIZE):
+        """
+        Creates several jobs at once. All specs are validated before anything is sent, then jobs are
+        created with Eve bulk inserts when the server accepts them, one by one otherwise.
+        :param specs: list: command specs, see `JobSpecBuilder`
+        :param max_workers: int: maximum number of concurrent requests
+        :param bulk: bool: try bulk inserts
+        :param bulk_size: int: maximum number of jobs per bulk insert
+        :return: list: a `JobSubmission(job_id, error)` per spec, in the same order
+
+        >>> class StubJobsApi(JobsApiClient):
+        ...     '''Answers bulk inserts with a `bulk_status` error if set, job ids are made from app ids'''
+        ...     def __init__(self, bulk_status=None):
+        ...         super().__init__('https://cloud-deploy', 'user', 'password')
+        ...         self.bulk_status, self.requests = bulk_status, []
+        ...     def _do_request(self, path, object_id=None, body=None, **kwargs):
+        ...         bulk = isinstance(body, list)
+        ...         self.requests.append(len(body) if bulk else 1)
+        ...         if bulk and self.bulk_status:
+        ...             raise ApiClientException('Bulk insert failed', status_code=self.bulk_status)
+        ...         if bulk:
+        ...             return {'_items': [{'_id': job['app_id'].replace('a', 'j')} for job in body]}
+        ...         return {'_id': body['app_id'].replace('a', 'j')}
+        >>> specs = [{'command': 'purgebluegreen', 'application_id': 'a{}'.format(i)} for i in range(3)]
+        >>> api = StubJobsApi()
+        >>> [submission.job_id for submission in api.submit_many(specs, max_workers=1, bulk_size=2)], api.requests
+        (['j0', 'j1', 'j2'], [2, 1])
+        >>> api = StubJobsApi(bulk_status=400)  # Bulk inserts disabled: the jobs are sent one by one
+        >>> [submission.job_id for submission in api.submit_many(specs, max_workers=1)], api.requests
+        (['j0', 'j1', 'j2'], [3, 1, 1, 1])
+        >>> api = StubJobsApi(bulk_status=503)  # Unknown outcome: the jobs are not sent again
+        >>> [str(submission.error) for submission in api.submit_many(specs, max_workers=1)], api.requests
+        (['Bulk insert failed', 'Bulk insert failed', 'Bulk insert failed'], [3])
+        """
+        builder = JobSpecBuilder()
+        jobs = []
+        errors = []
+        for index, spec in enumerate(specs):
+            try:
+                jobs.append(builder.build(spec))
+            except (ApiClientException, TypeError) as e:
+                errors.append('#{}: {}'.format(index, e))
+        if errors:
+            raise ApiClientException('Invalid job specs, nothing was sent: {}'.format(', '.join(errors)))
+
+        results = [None] * len(jobs)
+        pending = list(range(len(jobs)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if bulk and self._bulk_supported is not False and len(jobs) > 1:
+                chunks = [pending[i:i + bulk_size] for i in range(0, len(pending), bulk_size)]
+                futures = [(chunk, executor.submit(self._create_bulk, [jobs[i] for i in chunk])) for chunk in chunks]
+                pending = []
+                for chunk, future in futures:
+                    submissions = future.result()
+                    if submissions is None:
+                        pending.extend(chunk)
+                        continue
+                    for index, submission in zip(chunk, submissions):
+                        results[index] = submission
+
+            futures = [(index, executor.submit(self.create, jobs[index])) for index in pending]
+            for index, future in futures:
+                try:
+                    results[index] = JobSubmission(future.result(), None)
+                except ApiClientException as e:
+                    results[index] = JobSubmission(None, e)
+        return results
+
+    def _create_bulk(self, jobs):
+        """
+        Creates jobs with a single Eve bulk insert
+        :param jobs: list: job documents
+        :return: list: a `JobSubmission` per job, or None if the jobs must be sent one by one
+        """
+        try:
+            data = self._do_request(self.path, body=jobs, method=METHOD_POST)
+        except ApiClientException as e:
+            if e.status_code in (400, 405):
+                # Bulk inserts are disabled on the server
+                self._bulk_supported = False
+                return None
+            if e.status_code == 422:
+                # Eve rejects the whole bulk if one job is invalid, send them one by one to get per job errors
+                return None
+            # Unknown outcome, do not resend the jobs
+            return [JobSubmission(None, e)] * len(jobs)
+        self._bulk_supported = True
+        return [JobSubmission(item.get('_id'), None) for item in data['_items']]
+
+    def wait_for_jobs(self, job_ids, timeout=None, return_when=WAIT_ALL_COMPLETED, statuses=FINISHED_JOB_STATUSES,
+                      status_handler=None, backoff=None, initial_statuses=None):
+        """
+        Wait for jobs to reach one of the given statuses.
+        All the watched jobs are fetched with one batched list query per tick, ticks follow an adaptive backoff
+        which restarts from its shortest delay each time a status changes.
+        :param job_ids: list: Job IDs
+        :param timeout: float: maximum number of seconds to wait, forever if not set
+        :param return_when: str: `WAIT_ALL_COMPLETED` or `WAIT_FIRST_COMPLETED`
+        :param statuses: tuple: statuses to wait for, finished statuses by default
+        :param status_handler: function: status change callback, arguments: job_id, old_status, new_status
+        :param backoff: Backoff: delays between two ticks, at most `DEFAULT_WAIT_INTERVAL` seconds if not set
+        :param initial_statuses: dict: statuses already known by the caller, by job id, changes from them are
+                                 notified to `status_handler` too
+        :return: dict: last known state of each job, by job id
+        """
+        job_ids = list(collections.OrderedDict.fromkeys(job_ids))
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        backoff = backoff or Backoff(maximum=DEFAULT_WAIT_INTERVAL)
+        initial_statuses = initial_statuses or {}
+        jobs = {}
+        while True:
+            changed = False
+            watched = [job_id for job_id in job_ids if jobs.get(job_id, {}).get('status') not in statuses]
+            for job in self._fetch_statuses(watched):
+                previous = jobs.get(job['_id'])
+                jobs[job['_id']] = job
+                if previous is None or previous['status'] != job['status']:
+                    changed = True
+                    old_status = previous['status'] if previous is not None else initial_statuses.get(job['_id'])
+                    if old_status is not None and old_status != job['status'] and status_handler:
+                        status_handler(job['_id'], old_status, job['status'])
+
+            missing = [job_id for job_id in job_ids if job_id not in jobs]
+            if missing:
+                raise ApiClientException('Unknown jobs: {}'.format(', '.join(missing)))
+            completed = [job_id for job_id in job_ids if jobs[job_id]['status'] in statuses]
+            if len(completed) == len(job_ids) or (return_when == WAIT_FIRST_COMPLETED and completed):
+                return jobs
+
+            if changed:
+                backoff.reset()
+            delay = backoff.next()
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return jobs
+                delay = min(delay, remaining)
+            time.sleep(delay)
+
+    def _fetch_statuses(self, job_ids):
+        """
+        Fetch the status of many jobs with batched list queries, see `retrieve_many`
+        :param job_ids: list: Job IDs
+        :return: list: jobs, holding only their status, unknown jobs are missing
+
+        >>> class StubJobsApi(JobsApiClient):
+        ...     '''Serves the jobs "0" to "9", 4 per page at most, `$in` queries are rejected without `in_query`'''
+        ...     in_query = True
+        ...     def _do_request(self, path, object_id=None, params=None, **kwargs):
+        ...         if object_id is not None:
+        ...             if not object_id.isdigit():
+        ...                 raise ApiClientException('Not found', status_code=404)
+        ...             return {'_id': object_id, 'status': 'done'}
+        ...         if not self.in_query:
+        ...             raise ApiClientException('Invalid filter', status_code=400)
+        ...         ids = [i for i in json.loads(params['where'])['_id']['$in'] if i.isdigit()]
+        ...         nb, page = min(params['max_results'], 4), params['page']
+        ...         items = [{'_id': i, 'status': 'done'} for i in ids[(page - 1) * nb:page * nb]]
+        ...         return {'_items': items, '_meta': {'max_results': nb, 'total': len(ids), 'page': page}}
+        >>> api = StubJobsApi('https://cloud-deploy', 'user', 'password')
+        >>> [job['_id'] for job in api._fetch_statuses([str(i) for i in range(10)] + ['x'])]
+        ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
+        >>> api.in_query = False
+        >>> [job['_id'] for job in api._fetch_statuses(['1', 'x', '2'])], api._in_query_supported
+        (['1', '2'], False)
+        """
+        return [job for job in self.retrieve_many(job_ids, fields=['status']).objects if job is not None]
+
+    def get_logs_async(self, job_id, success_handler, exception_handler, wait_for_start=False, no_color=False,
+                       from_pos=None, tail=None, checkpoint=None, fast_attach=False, timings=None):
         """
         Return job logs through callback functions
         :param job_id: str: Job ID
@@ -589,53 +1803,165 @@ class JobsApiClient(ApiClient):
         :param exception_handler: function: Error function callback, arguments: exception
         :param wait_for_start: bool: true if we should wait for the job to start
         :param no_color: bool: false by default, should ASCII chars be stripped
-        :return: str: data of the job
+        :param from_pos: int: log offset to resume from, the checkpointed one, or 0, if not set
+        :param tail: int: only return the last lines of the logs already written, then the next ones
+        :param checkpoint: pyghost.logs.LogCheckpoint: where the log offset is recorded while reading
+        :param fast_attach: bool: get the job status and the websocket token while the socket.io connection is
+                            opened, without probing the websocket server first, and keep the connection open for
+                            the next attach to the same host
+        :param timings: dict: filled with the duration of each attach phase, in seconds: `status`, `probe`,
+                        `connect` and `token`, and with `first_byte`, the delay before the first log data
+        :return: int: log offset reached, to resume from
+
+        >>> class Socket(object):
+        ...     '''Warm socket.io connection sending the whole log of the followed job at once'''
+        ...     connected = True
+        ...     def on(self, event, handler):
+        ...         self.handler = handler
+        ...     def emit(self, event, params):
+        ...         self.events = [{'log_id': params['log_id'], 'raw': base64.b64encode(b'log\\n').decode()}]
+        ...     def wait(self, seconds):
+        ...         while self.events:
+        ...             self.handler(self.events.pop())
+        ...     def disconnect(self):
+        ...         self.connected = False
+        >>> class StubJobsApi(JobsApiClient):
+        ...     statuses = ['started', 'done']
+        ...     def retrieve(self, object_id, fields=None, embed=None):
+        ...         return {'_id': object_id, 'status': self.statuses.pop(0)}
+        ...     def _get_websocket_token(self, job_id):
+        ...         return 'token'
+        >>> import base64
+        >>> _checkin_log_socket('https://cloud-deploy', Socket())
+        >>> api = StubJobsApi('https://cloud-deploy', 'user', 'password')
+        >>> logs, timings = [], {}
+        >>> api.get_logs_async('j1', logs.append, print, fast_attach=True, timings=timings)
+        4
+        >>> logs, sorted(timings)
+        ([b'log\\n'], ['connect', 'first_byte', 'status', 'token'])
+        >>> _log_sockets['https://cloud-deploy'][0].connected  # Kept open for the next attach
+        True
+        >>> del _log_sockets['https://cloud-deploy']
         """
-        job = self.retrieve(job_id)
-        while wait_for_start and job['status'] == JobStatuses.INIT.value:
-            time.sleep(3)
-            job = self.retrieve(job_id)
+        from .logs import LogSubscription
+        timings = {} if timings is None else timings
+        started_at = time.perf_counter()
+
+        def timed(phase, function, *args, **kwargs):
+            phase_started_at = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timings[phase] = time.perf_counter() - phase_started_at
+
+        def get_job():
+            if wait_for_start:
+                return self.wait_for_jobs([job_id], statuses=STARTED_JOB_STATUSES)[job_id]
+            return self.retrieve(job_id)
+
+        def handle_data(data):
+            if 'first_byte' not in timings:
+                timings['first_byte'] = time.perf_counter() - started_at
+            success_handler(data)
+
+        subscription = LogSubscription(job_id, handle_data, exception_handler, no_color=no_color,
+                                       last_pos=from_pos, tail=tail, checkpoint=checkpoint)
+        socket_host = self.host if self.host[-1] != '/' else self.host[0:-1]
+        if fast_attach:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                socket_future = executor.submit(timed, 'connect', _checkout_log_socket, socket_host)
+                token_future = executor.submit(timed, 'token', self._get_websocket_token, job_id)
+                try:
+                    job = timed('status', get_job)
+                except BaseException:
+                    if socket_future.exception() is None:
+                        _checkin_log_socket(socket_host, socket_future.result())
+                    raise
+                token = token_future.result()
+                try:
+                    socketIO = socket_future.result()
+                except Exception as e:
+                    exception_handler(_get_websocket_error(e))
+                    return subscription.position
+            if job['status'] == JobStatuses.INIT.value:
+                _checkin_log_socket(socket_host, socketIO)
+                exception_handler(ApiClientException('The job is not started.'))
+                return subscription.position
+        else:
+            job = timed('status', get_job)
+            if job['status'] == JobStatuses.INIT.value:
+                exception_handler(ApiClientException('The job is not started.'))
+                return subscription.position
+            try:
+                check_ws = timed('probe', self.session.get, urllib.parse.urljoin(self.host, '/socket.io/'),
+                                 timeout=self.timeout)
+                if not check_ws.status_code == 200:
+                    raise ApiClientException('Websocket server is unavailable.')
+                socketIO = timed('connect', SocketIO, socket_host, verify=True)
+            except Exception as e:
+                exception_handler(_get_websocket_error(e))
+                return subscription.position
+            token = timed('token', self._get_websocket_token, job_id)
+
+        def handle_event(args):
+            # A reused connection may still receive events of the jobs it followed before
+            if args.get('log_id', job_id) == job_id:
+                subscription.handle_event(args)
 
-        if job['status'] == JobStatuses.INIT.value:
-            exception_handler(ApiClientException('The job is not started.'))
+        try:
+            socketIO.on('job', handle_event)
+            params = {
+                'log_id': job_id,
+                'last_pos': subscription.last_pos,
+                'raw_mode': True,
+                'auth_token': token
+            }
+            socketIO.emit('job_logging', params)
+
+            backoff = Backoff(initial=1, maximum=3)
+            while job['status'] == JobStatuses.STARTED.value:
+                socketIO.wait(seconds=backoff.next())
+                # The backlog of a `tail` stream is what the first wait received
+                subscription.release_tail()
+                job = self.retrieve(job_id)
+            socketIO.wait(seconds=3)    # We wait 3 more seconds to be sure to get all the data
+            subscription.finish()
+        except BaseException:
+            socketIO.disconnect()
+            raise
+        if fast_attach:
+            _checkin_log_socket(socket_host, socketIO)
         else:
-            check_ws = requests.get(urllib.parse.urljoin(self.host, '/socket.io/'))
-            if not check_ws.status_code == 200:
-                exception_handler(ApiClientException('Websocket server is unavailable.'))
-                return
-
-            socket_host = self.host if self.host[-1] != '/' else self.host[0:-1]
-            with SocketIO(socket_host, verify=True) as socketIO:
-                def callback(args):
-                    try:
-                        if 'error' in args:
-                            exception_handler(ApiClientException(args['error']))
-                            return
-                        if 'raw' not in args:
-                            # Backward compatibility, old API returns HTML data for WebUI
-                            data_str = trim_xml_html_tags(args['html'])
-                            data_str = data_str + "\n"
-                        else:
-                            data_str = base64.b64decode(args['raw'])
-                        if no_color:
-                            data_str = trim_ansi_tags(data_str)
-                        success_handler(data_str)
-                    except Exception as e:
-                        exception_handler(e)
-
-                params = {
-                    'log_id': job_id,
-                    'last_pos': 0,
-                    'raw_mode': True,
-                    'auth_token': self._get_websocket_token(job_id)
-                }
-                socketIO.emit('job_logging', params)
-                socketIO.on('job', callback)
-
-                while job['status'] == JobStatuses.STARTED.value:
-                    socketIO.wait(seconds=3)
-                    job = self.retrieve(job_id)
-                socketIO.wait(seconds=3)    # We wait 3 more seconds to be sure to get all the data
+            socketIO.disconnect()
+        return subscription.position
+
+    def iter_logs(self, job_id, no_color=False, last_pos=None, wait_for_start=True,
+                  max_size=DEFAULT_LOG_BUFFER_SIZE, policy=LOG_BUFFER_BLOCK, hub=None, tail=None, checkpoint=None):
+        """
+        Return an iterator over the job log chunks, see `pyghost.logs.LogStream`
+        :param job_id: str: Job ID
+        :param no_color: bool: should ANSI tags be stripped
+        :param last_pos: int: log offset to start from, the checkpointed one, or 0, if not set
+        :param wait_for_start: bool: wait for the job to start before following its logs
+        :param max_size: int: maximum number of buffered chunks
+        :param policy: str: what to do when the consumer is too slow, one of `LOG_BUFFER_POLICIES`
+        :param hub: LogStreamHub: hub to follow the logs with, a private one is used if not set
+        :param tail: int: start with the last lines of the logs already written
+        :param checkpoint: LogCheckpoint: where the offset of the consumed chunks is recorded
+        :return: LogStream:
+        """
+        from .logs import LogStream
+        return LogStream(self, job_id, no_color, last_pos, wait_for_start, max_size, policy, hub, tail, checkpoint)
+
+    def aiter_logs(self, job_id, no_color=False, last_pos=None, wait_for_start=True,
+                   max_size=DEFAULT_LOG_BUFFER_SIZE, policy=LOG_BUFFER_BLOCK, hub=None, tail=None, checkpoint=None):
+        """
+        Return an asynchronous iterator over the job log chunks, see `iter_logs`
+        :return: AsyncLogStream:
+        """
+        from .logs import AsyncLogStream
+        return AsyncLogStream(self, job_id, no_color, last_pos, wait_for_start, max_size, policy, hub, tail,
+                              checkpoint)
 
     def _get_websocket_token(self, job_id):
         """
@@ -646,21 +1972,54 @@ class JobsApiClient(ApiClient):
         path = '/jobs/{}/websocket_token/'.format(job_id)
         try:
             token = self._do_request(path, params={}).get('token', '')
-        except:
+        except ApiClientException:
             token = False
         return token
 
 
 class DeploymentsApiClient(ApiClient):
     path = '/deployments/'
+    default_embed = ('app_id', 'job_id')
 
     def list(self, nb=DEFAULT_PAGE_SIZE, page=1, sort='-timestamp',
-             application=None, env=None, role=None, revision=None, module=None):
+             application=None, env=None, role=None, revision=None, module=None, fields=None, embed=None):
+        return self._list_filtered(self.path, nb, page, sort, self._get_app_ids(application, env, role),
+                                   functools.partial(self._get_list_query, revision=revision, module=module),
+                                   **self._get_list_params(fields, embed))
+
+    def iter_all(self, nb=DEFAULT_ITER_PAGE_SIZE, sort='-timestamp', workers=1,
+                 application=None, env=None, role=None, revision=None, module=None, fields=None, embed=None):
+        """
+        Iterate over all deployments, fetching pages lazily
+        :param nb: int: the number of deployments per page
+        :param sort: str: the deployment order
+        :param workers: int: the number of pages fetched ahead, concurrently
+        :param fields: list|dict: fields to return, or an Eve projection such as {"modules": 0}, all if not set
+        :param embed: list: reference fields to embed, `default_embed` if not set
+        :return: generator: deployments
+        """
+        return self._iter_filtered(self.path, nb, sort, workers, self._get_app_ids(application, env, role),
+                                   functools.partial(self._get_list_query, revision=revision, module=module),
+                                   **self._get_list_params(fields, embed))
+
+    @staticmethod
+    def _get_list_query(app_ids=None, revision=None, module=None):
+        """
+        Build the `where` query used to list deployments
+        :param app_ids: list: filter to apply on deployment application ids
+        :param revision: str: filter to apply on deployment revision
+        :param module: str: filter to apply on deployment module
+        :return: str:
+
+        >>> DeploymentsApiClient._get_list_query(app_ids=['a1'], module='api')
+        '{"app_id":{"$in": ["a1"]},"module":{"$regex":".*api.*"}}'
+        >>> DeploymentsApiClient._get_list_query(app_ids=[])
+        '{"app_id":{"$in": []}}'
+        """
         query = {}
 
-        if application or env or role:
-            apps_api = AppsApiClient(self.host, self.username, self.password)
-            query['$or'] = get_applist_join_query(apps_api, application, role, env)
+        if app_ids is not None:
+            query['app_id'] = json.dumps({'$in': app_ids})
 
         if revision:
             query['revision'] = '"{}"'.format(revision)
@@ -668,5 +2027,4 @@ class DeploymentsApiClient(ApiClient):
         if module:
             query['module'] = '{{"$regex":".*{m}.*"}}'.format(m=module)
 
-        querystr = '{' + ','.join('"{key}":{value}'.format(key=key, value=value) for key, value in query.items()) + '}'
-        return self._do_list(self.path, nb, page, sort, embedded='{"app_id":1,"job_id":1}', where=querystr)
+        return '{' + ','.join('"{key}":{value}'.format(key=key, value=value) for key, value in query.items()) + '}'
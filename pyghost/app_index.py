@@ -0,0 +1,231 @@
+import bisect
+import collections
+import json
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from .api_client import DEFAULT_ITER_PAGE_SIZE
+
+
+class AppIndex(object):
+    """
+    Local in-memory index of the Cloud Deploy applications.
+    All applications are loaded once, then kept up to date with small delta fetches on Eve's `_updated` field,
+    so that lookups by id, (name, env, role), env, role or name prefix do not hit the API.
+    Indexed documents are shared: they must not be modified by the caller.
+    Deleted applications are only dropped by a full refresh, see `refresh`.
+    With a `cache` (a `DiskCache` for instance), the index is saved by the refreshes changing it and reloaded by the
+    next process, which then only fetches the applications updated in the meantime.
+
+    >>> index = AppIndex(None)
+    >>> index.add([
+    ...     {'_id': '1', 'name': 'front', 'env': 'prod', 'role': 'web', '_updated': 'Mon, 01 Jan 2018 10:00:00 GMT'},
+    ...     {'_id': '2', 'name': 'front', 'env': 'dev', 'role': 'web', '_updated': 'Mon, 01 Jan 2018 11:00:00 GMT'},
+    ...     {'_id': '3', 'name': 'batch', 'env': 'prod', 'role': 'worker', '_updated': 'Mon, 01 Jan 2018 12:00:00 GMT'},
+    ... ])
+    3
+    >>> index.get('3')['name']
+    'batch'
+    >>> index.find_one('front', 'dev', 'web')['_id']
+    '2'
+    >>> [app['name'] for app in index.find(env='prod')]
+    ['batch', 'front']
+    >>> [app['_id'] for app in index.find(name_prefix='fr', env='prod')]
+    ['1']
+    >>> index.add([{'_id': '1', 'name': 'frontend', 'env': 'prod', 'role': 'web',
+    ...             '_updated': 'Tue, 02 Jan 2018 10:00:00 GMT'}])
+    1
+    >>> index.add([{'_id': '1', 'name': 'frontend', 'env': 'prod', 'role': 'web',
+    ...             '_updated': 'Tue, 02 Jan 2018 10:00:00 GMT'}])
+    0
+    >>> index.find_one('front', 'prod', 'web') is None
+    True
+    >>> index.last_updated
+    'Tue, 02 Jan 2018 10:00:00 GMT'
+    """
+
+    def __init__(self, apps_api, page_size=DEFAULT_ITER_PAGE_SIZE, workers=1, max_age=None, cache=None):
+        """
+        Creates an application index, loaded on the first `refresh`
+        :param apps_api: AppsApiClient instance
+        :param page_size: int: number of applications fetched per request
+        :param workers: int: number of pages fetched concurrently during a full load
+        :param max_age: int: number of seconds after which lookups refresh the index first, never if not set
+        :param cache: ResponseCache|DiskCache: cache the index is saved to and loaded from
+        """
+        self.apps_api = apps_api
+        self.page_size = page_size
+        self.workers = workers
+        self.max_age = max_age
+        self.cache = cache
+        self.last_updated = None
+        self.refreshed_at = None
+        self._lock = threading.RLock()
+        self._clear()
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, app_id):
+        return app_id in self._by_id
+
+    def __iter__(self):
+        return iter(list(self._by_id.values()))
+
+    def _clear(self):
+        self._by_id = {}
+        self._by_key = {}
+        self._by_env = collections.defaultdict(dict)
+        self._by_role = collections.defaultdict(dict)
+        self._names = []
+        self._last_updated_date = None
+
+    def _remove(self, app):
+        app_id = app['_id']
+        key = (app.get('name'), app.get('env'), app.get('role'))
+        if self._by_key.get(key) is app:
+            del self._by_key[key]
+        self._by_env[app.get('env')].pop(app_id, None)
+        self._by_role[app.get('role')].pop(app_id, None)
+        pos = bisect.bisect_left(self._names, (app.get('name') or '', app_id))
+        if pos < len(self._names) and self._names[pos] == (app.get('name') or '', app_id):
+            del self._names[pos]
+
+    def add(self, apps):
+        """
+        Add or replace applications in the index
+        :param apps: iterable: application documents
+        :return: int: number of applications added or changed, those already indexed as is are skipped
+        """
+        changed = 0
+        with self._lock:
+            for app in apps:
+                app_id = app['_id']
+                previous = self._by_id.get(app_id)
+                if previous is not None:
+                    if _is_same_version(previous, app):
+                        continue
+                    self._remove(previous)
+                changed += 1
+                self._by_id[app_id] = app
+                self._by_key[(app.get('name'), app.get('env'), app.get('role'))] = app
+                self._by_env[app.get('env')][app_id] = app
+                self._by_role[app.get('role')][app_id] = app
+                bisect.insort(self._names, (app.get('name') or '', app_id))
+                updated = app.get('_updated')
+                if updated:
+                    updated_date = parsedate_to_datetime(updated)
+                    if self._last_updated_date is None or updated_date > self._last_updated_date:
+                        self._last_updated_date = updated_date
+                        self.last_updated = updated
+        return changed
+
+    def refresh(self, full=False):
+        """
+        Synchronize the index with the API.
+        The first call, or a `full` one, loads all the applications, next ones only fetch the applications updated
+        since the most recent `_updated` date already indexed.
+        :param full: bool: reload all the applications, also dropping the deleted ones
+        :return: int: number of applications fetched
+        """
+        with self._lock:
+            if self.refreshed_at is None and not full and self.cache is not None:
+                self._load()
+            if full or self.last_updated is None:
+                where = '{}'
+            else:
+                # `_updated` has a one second resolution: applications updated during that same second are
+                # fetched again rather than missed
+                where = json.dumps({'_updated': {'$gte': self.last_updated}})
+            apps = list(self.apps_api._iter_all(self.apps_api.path, self.page_size, '_updated',
+                                                self.workers if where == '{}' else 1, where=where))
+            if where == '{}':
+                self._clear()
+            changed = self.add(apps)
+            self.refreshed_at = time.monotonic()
+            # Delta fetches return at least the most recently updated application again, the saved index is only
+            # rewritten when something actually changed
+            if (changed or where == '{}') and self.cache is not None:
+                self._save()
+            return len(apps)
+
+    def _get_cache_key(self):
+        return 'app-index', self.apps_api.username, self.apps_api._get_url(self.apps_api.path, None)
+
+    def _load(self):
+        entry = self.cache.get(self._get_cache_key())
+        self.cache.record(hit=entry is not None)
+        if entry is not None:
+            self._clear()
+            self.add(entry.data)
+
+    def _save(self):
+        self.cache.set(self._get_cache_key(), self.last_updated, list(self._by_id.values()))
+
+    def _check_age(self):
+        if self.refreshed_at is None or (self.max_age is not None and
+                                         time.monotonic() - self.refreshed_at > self.max_age):
+            if self.apps_api is not None:
+                self.refresh()
+
+    def get(self, app_id):
+        """
+        Return an application by id
+        :param app_id: str: application id
+        :return: dict: application, or None
+        """
+        self._check_age()
+        return self._by_id.get(app_id)
+
+    def find_one(self, name, env, role):
+        """
+        Return the application matching exactly a name, env and role
+        :param name: str: application name
+        :param env: str: application env
+        :param role: str: application role
+        :return: dict: application, or None
+        """
+        self._check_age()
+        return self._by_key.get((name, env, role))
+
+    def find(self, name=None, env=None, role=None, name_prefix=None):
+        """
+        Return the applications matching all the given filters, ordered by name
+        :param name: str: exact application name
+        :param env: str: application env
+        :param role: str: application role
+        :param name_prefix: str: application name prefix
+        :return: list: applications
+        """
+        self._check_age()
+        with self._lock:
+            if name is not None or name_prefix is not None:
+                start = name if name is not None else name_prefix
+                pos = bisect.bisect_left(self._names, (start, ''))
+                apps = []
+                while pos < len(self._names):
+                    app_name, app_id = self._names[pos]
+                    if not (app_name == name if name is not None else app_name.startswith(start)):
+                        break
+                    apps.append(self._by_id[app_id])
+                    pos += 1
+            elif env is not None:
+                apps = sorted(self._by_env.get(env, {}).values(), key=_name_key)
+            elif role is not None:
+                apps = sorted(self._by_role.get(role, {}).values(), key=_name_key)
+            else:
+                apps = sorted(self._by_id.values(), key=_name_key)
+        return [app for app in apps
+                if (env is None or app.get('env') == env) and (role is None or app.get('role') == role) and
+                (name_prefix is None or (app.get('name') or '').startswith(name_prefix))]
+
+
+def _is_same_version(previous, app):
+    if previous.get('_etag') and app.get('_etag'):
+        return previous['_etag'] == app['_etag']
+    return previous == app
+
+
+def _name_key(app):
+    return app.get('name') or '', app['_id']
@@ -1,5 +1,55 @@
+"""
+Cloud Deploy application schema, and its compiled version used for fast validation.
+
+The compiled schema must give the same results and errors as `APPLICATION_SCHEMA`,
+checked here on a valid application and on every mutation of each of its fields:
+
+>>> import copy
+>>> from schema import SchemaError
+>>> app = {
+...     'name': 'webfront', 'env': 'prod', 'role': 'web', 'vpc_id': 'vpc-123', 'autoscale': {'min': 1, 'max': 3},
+...     'build_infos': {'source_ami': 'ami-123', 'subnet_id': 'subnet-1'},
+...     'environment_infos': {
+...         'root_block_device': {'size': 30, 'name': ''}, 'security_groups': ['sg-1'],
+...         'instance_tags': [{'tag_name': 'a', 'tag_value': 'b'}],
+...         'optional_volumes': [{'device_name': '/dev/xvdb', 'volume_type': 'gp2', 'volume_size': 10}]},
+...     'env_vars': [{'var_key': 'A_B', 'var_value': 'x'}],
+...     'log_notifications': [{'email': 'a@b.com', 'job_states': ['done', '*']}],
+...     'blue_green': {'enable_blue_green': True, 'color': 'blue', 'hooks': {'pre_swap': 'x'}},
+...     'features': [{'name': 'nginx', 'version': '1.2', 'provisioner': 'ansible', 'parameters': {'a': 1}}],
+...     'modules': [{'name': 'm', 'source': {'protocol': 's3'}, 'path': '/var/www', 'scope': 'code', 'uid': 0}],
+...     'safe-deployment': {'load_balancer_type': 'alb', 'wait_after_deploy': 5},
+... }
+>>> def outcome(schema, data):
+...     try:
+...         return schema.validate(copy.deepcopy(data))
+...     except SchemaError as e:
+...         return type(e), str(e)
+>>> def mutations(data, path=()):
+...     items = data.items() if isinstance(data, dict) else enumerate(data) if isinstance(data, list) else []
+...     for key, value in list(items):
+...         for new_value in (KeyError, None, 1, 0, True, 'x', 'BAD VALUE', [], {}, ['x'], [{}], 1.5):
+...             mutation = copy.deepcopy(app)
+...             parent = mutation
+...             for step in path:
+...                 parent = parent[step]
+...             if new_value is KeyError:
+...                 del parent[key]
+...             else:
+...                 parent[key] = new_value
+...             yield mutation
+...         yield from mutations(value, path + (key,))
+>>> cases = [app, dict(app, extra=1), 'not a dict'] + list(mutations(app))
+>>> [case for case in cases
+...  if outcome(APPLICATION_SCHEMA, case) != outcome(COMPILED_APPLICATION_SCHEMA, case)]
+[]
+>>> len(cases) > 500
+True
+"""
 from schema import And, Optional, Regex, Schema
 
+from .schema_compiler import compile_schema
+
 
 APPLICATION_ID_SCHEMA = Schema(And(str, Regex(r'[a-f0-9]{24}')))
 
@@ -130,3 +180,7 @@ APPLICATION_SCHEMA = Schema({
         Optional('wait_after_deploy', default=10): And(int, lambda n: n > 0)
     }
 })
+
+COMPILED_APPLICATION_ID_SCHEMA = compile_schema(APPLICATION_ID_SCHEMA)
+
+COMPILED_APPLICATION_SCHEMA = compile_schema(APPLICATION_SCHEMA)
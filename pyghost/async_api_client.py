@@ -0,0 +1,642 @@
+import asyncio
+import collections
+import copy
+import functools
+import json
+import os
+import time
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is an optional dependency, only required by the asyncio clients
+    aiohttp = None
+
+from .api_client import (DEFAULT_HEADERS, DEFAULT_ITER_PAGE_SIZE, DEFAULT_MAX_RETRY_DELAY, DEFAULT_PAGE_SIZE,
+                         DEFAULT_POOL_SIZE, DEFAULT_RETRIES, DEFAULT_RETRY_DELAY, DEFAULT_TIMEOUT, METHOD_GET,
+                         METHOD_PATCH, METHOD_POST, RETRY_STATUS_CODES, RETURN_TYPE_JSON, ApiClient, ApiClientException,
+                         AppsApiClient, DeploymentsApiClient, JobCommandsMixin, JobsApiClient, RetrievedObjects,
+                         _call_hooks, _chunk_ids, _merge_pages, create_request_event, get_app_id_resolver,
+                         get_circuit_breaker, get_rate_limiter, get_retry_delay, get_single_flight)
+from .utils import Backoff
+
+DEFAULT_MAX_CONCURRENCY = 100
+
+
+def get_client_timeout(timeout):
+    """
+    Convert a `requests` like timeout to an aiohttp one
+    :param timeout: float|tuple: request timeout, or (connect, read) timeouts, in seconds
+    :return: aiohttp.ClientTimeout:
+    """
+    if isinstance(timeout, tuple):
+        return aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+    return aiohttp.ClientTimeout(total=timeout)
+
+
+def create_async_session(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Creates a pooled, keep-alive asyncio HTTP session which can be shared between several async API clients.
+    Must be called from a running event loop.
+    :param pool_size: int: maximum number of simultaneous connections
+    :return: aiohttp.ClientSession:
+    """
+    if aiohttp is None:
+        raise ApiClientException('The `aiohttp` package is required by the asyncio API clients')
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=pool_size))
+
+
+class AsyncApiClient(object):
+    """
+    asyncio counterpart of `ApiClient`, every API call is a coroutine.
+    Calls are bounded by `max_concurrency` and can be cancelled like any asyncio task.
+    """
+    path = None
+
+    default_embed = ()
+    _in_query_supported = None
+    max_filter_ids = ApiClient.max_filter_ids
+
+    _clean_dict_object = staticmethod(ApiClient._clean_dict_object)
+    _get_url = ApiClient._get_url
+    _get_query_params = staticmethod(ApiClient._get_query_params)
+    _get_list_params = ApiClient._get_list_params
+
+    def __init__(self, host, username, password, session=None, pool_size=DEFAULT_POOL_SIZE,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 circuit_breaker=None, rate_limiter=None, hooks=None, coalesce=False, cache=None):
+        """
+        Creates an asyncio API client instance
+        :param host: str: host for API
+        :param username: str: username for API
+        :param password: str: password for API
+        :param session: aiohttp.ClientSession: shared HTTP session, a private one is created if not set
+        :param pool_size: int: connection pool size of the private HTTP session
+        :param max_concurrency: int: maximum number of in-flight requests for this client
+        :param timeout: float|tuple: request timeout, or (connect, read) timeouts, in seconds
+        :param retries: int: number of retries of idempotent requests, see `ApiClient._do_request`
+        :param circuit_breaker: CircuitBreaker: defaults to the breaker shared by all the clients of the host
+        :param rate_limiter: RateLimiter: defaults to the limiter shared by all the clients of the host, including the
+                             synchronous ones
+        :param hooks: list: request hooks, see `RequestEvent`
+        :param coalesce: bool: share a single request between identical GET requests sent at the same time by the
+                         tasks of an event loop, see `ApiClient`
+        :param cache: ResponseCache|DiskCache: optional cache used to revalidate retrieved objects with their etag,
+                      it can be shared with synchronous clients
+        """
+        if aiohttp is None:
+            raise ApiClientException('The `aiohttp` package is required by the asyncio API clients')
+        self.host = host
+        self.username = username
+        self.password = password
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker(host)
+        self.rate_limiter = rate_limiter or get_rate_limiter(host)
+        self.hooks = tuple(hooks or ())
+        self.single_flight = get_single_flight(host) if coalesce else None
+        self.cache = cache
+        self._session = session
+        self._owns_session = session is None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def session(self):
+        """
+        HTTP session used by this client, lazily created and kept alive between requests
+        :return: aiohttp.ClientSession:
+        """
+        if self._session is None:
+            self._session = create_async_session(self.pool_size)
+        return self._session
+
+    async def close(self):
+        """
+        Close the HTTP session if it is owned by this client, shared sessions are left open
+        """
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_semaphore(self):
+        # Created lazily so that it is bound to the event loop running the requests
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency or DEFAULT_MAX_CONCURRENCY)
+        return self._semaphore
+
+    async def _do_request(self, path, object_id=None, body=None, params=None,
+                          method=METHOD_GET, return_type=RETURN_TYPE_JSON, headers=None, idempotency_key=None):
+        """
+        Do the API requests, retried like `ApiClient._do_request`
+        :param path: str:
+        :param object_id: str:
+        :param body: dict:
+        :param params: dict:
+        :param method: str:
+        :param return_type: str:
+        :param headers: dict:
+        :param idempotency_key: str: sent as `Idempotency-Key` header, makes the request safe to retry
+        :return: dict:
+        """
+        if headers is None:
+            headers = {}
+        if idempotency_key is not None:
+            headers['Idempotency-Key'] = idempotency_key
+        url = self._get_url(path, params, object_id)
+        if method == METHOD_GET and self.single_flight is not None:
+            key = (self.username, self.password, url, return_type, tuple(sorted(headers.items())))
+            return await self.single_flight.do_async(key, self._send_request, path, object_id, url, body, method,
+                                                     return_type, headers, idempotency_key)
+        return await self._send_request(path, object_id, url, body, method, return_type, headers, idempotency_key)
+
+    async def _send_request(self, path, object_id, url, body, method, return_type, headers, idempotency_key):
+        """
+        Send an API request, retrying it if it is safe to do so
+        :return: dict:
+
+        >>> from pyghost.rate_limit import RateLimiter
+        >>> from pyghost.utils import CircuitBreaker
+        >>> class Response(object):
+        ...     '''Response of the stub session, sent once its gate is open'''
+        ...     def __init__(self, session, status):
+        ...         self.session, self.status, self.headers = session, status, {'Retry-After': '0'}
+        ...     async def __aenter__(self):
+        ...         self.session.active += 1
+        ...         self.session.peak = max(self.session.peak, self.session.active)
+        ...         try:
+        ...             await self.session.gate.wait()
+        ...         finally:
+        ...             self.session.active -= 1
+        ...         return self
+        ...     async def __aexit__(self, *exc_info):
+        ...         pass
+        ...     async def read(self):
+        ...         return b'{}'
+        ...     async def text(self):
+        ...         return '{}'
+        >>> class Session(object):
+        ...     '''Sends the queued statuses, then 200 responses'''
+        ...     def __init__(self, *statuses):
+        ...         self.statuses, self.methods, self.active, self.peak = list(statuses), [], 0, 0
+        ...         self.gate = asyncio.Event()
+        ...         self.gate.set()
+        ...     def request(self, method, url, **kwargs):
+        ...         self.methods.append(method.upper())
+        ...         return Response(self, self.statuses.pop(0) if self.statuses else 200)
+        >>> loop = asyncio.new_event_loop()
+        >>> asyncio.set_event_loop(loop)
+        >>> session, limiter = Session(503), RateLimiter()
+        >>> api = AsyncAppsApiClient('https://cloud-deploy', 'user', 'password', session=session, max_concurrency=2,
+        ...                          circuit_breaker=CircuitBreaker(), rate_limiter=limiter)
+        >>> loop.run_until_complete(api._do_request('/apps/', '1')), session.methods  # 503 retried
+        ({}, ['GET', 'GET'])
+        >>> session.statuses = [503]
+        >>> loop.run_until_complete(api._do_request('/apps/', body={'name': 'front'}, method=METHOD_POST))
+        Traceback (most recent call last):
+        ...
+        pyghost.api_client.ApiClientException: Error while calling Cloud Deploy : [503] {}
+        >>> session.gate.clear()
+        >>> tasks = [loop.create_task(api._do_request('/apps/', str(i))) for i in range(5)]
+        >>> loop.run_until_complete(asyncio.sleep(0.01))
+        >>> session.active, limiter.stats()['in_flight']  # bounded by `max_concurrency`
+        (2, 2)
+        >>> session.gate.set()
+        >>> len(loop.run_until_complete(asyncio.gather(*tasks))), session.peak
+        (5, 2)
+        >>> limiter.configure(max_in_flight=1)
+        >>> session.gate.clear()
+        >>> tasks = [loop.create_task(api._do_request('/apps/', str(i))) for i in range(2)]
+        >>> loop.run_until_complete(asyncio.sleep(0.01))
+        >>> stats = limiter.stats()
+        >>> stats['in_flight'], stats['waiting']
+        (1, 1)
+        >>> for task in tasks:  # cancelled while sent, and while waiting for the limiter
+        ...     _ = task.cancel()
+        >>> _ = loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        >>> stats = limiter.stats()
+        >>> stats['in_flight'], stats['waiting'], session.active
+        (0, 0, 0)
+        >>> session.gate.set()
+        >>> loop.run_until_complete(api._do_request('/apps/', '1'))
+        {}
+        >>> loop.close()
+        >>> asyncio.set_event_loop(None)
+        """
+        retries = self.retries if method == METHOD_GET or idempotency_key is not None else 0
+        backoff = Backoff(initial=DEFAULT_RETRY_DELAY, maximum=DEFAULT_MAX_RETRY_DELAY)
+        event = create_request_event(method, path, object_id, url, body) if self.hooks else None
+        attempt = 0
+        while True:
+            if not self.circuit_breaker.allow():
+                raise ApiClientException('Cloud Deploy is unavailable, request to {} not sent'.format(url))
+            queued_at = started_at = time.perf_counter()
+            try:
+                async with self._get_semaphore(), self.rate_limiter:
+                    if event is not None:
+                        started_at = time.perf_counter()
+                        event.attempt = attempt
+                        event.queue_wait = started_at - queued_at
+                        _call_hooks(self.hooks, 'before_request', event)
+                    async with self.session.request(method, url,
+                                                    json=body,
+                                                    auth=aiohttp.BasicAuth(self.username, self.password),
+                                                    headers={**DEFAULT_HEADERS, **headers},
+                                                    timeout=get_client_timeout(self.timeout)) as response:
+                        content = await response.read()
+                        text = await response.text()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                self.circuit_breaker.record_failure()
+                if event is not None:
+                    event.elapsed = time.perf_counter() - started_at
+                    _call_hooks(self.hooks, 'on_error', event, e)
+                if attempt >= retries:
+                    raise ApiClientException('Error while sending request to {}'.format(url)) from e
+                delay = backoff.next()
+            else:
+                if event is not None:
+                    event.elapsed = time.perf_counter() - started_at
+                    event.status_code = response.status
+                    event.bytes_in = len(content)
+                    _call_hooks(self.hooks, 'after_response', event)
+                if response.status >= 500:
+                    self.circuit_breaker.record_failure()
+                else:
+                    self.circuit_breaker.record_success()
+                delay = None
+                if response.status in RETRY_STATUS_CODES and attempt < retries:
+                    delay = get_retry_delay(response.headers.get('Retry-After'), backoff)
+                if delay is None:
+                    break
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        if response.status == 304:
+            # Only returned to conditional requests, the caller already holds the document
+            return None
+        if response.status >= 300:
+            raise ApiClientException(
+                'Error while calling Cloud Deploy : [{}] {}'.format(response.status, text),
+                status_code=response.status)
+        if return_type != RETURN_TYPE_JSON:
+            return text
+        try:
+            return json.loads(text)
+        except ValueError as e:
+            raise ApiClientException('Error while reading response from {}'.format(url)) from e
+
+    async def _do_retrieve(self, path, object_id, **extra_params):
+        """
+        Do the retrieve API call
+        :param path: str:
+        :param object_id: str:
+        :param extra_params: dict:
+        :return: dict:
+        """
+        if self.cache is None:
+            data = await self._do_request(path, object_id, params=extra_params)
+            return self._clean_dict_object(data)
+
+        key = (self.username, self._get_url(path, extra_params, object_id))
+        entry = self.cache.get(key)
+        headers = {'If-None-Match': entry.etag} if entry else None
+        data = await self._do_request(path, object_id, params=extra_params, headers=headers)
+        if data is None and entry:
+            self.cache.record(hit=True)
+            return copy.deepcopy(entry.data)
+        self.cache.record(hit=False)
+        data = self._clean_dict_object(data)
+        if data.get('_etag'):
+            self.cache.set(key, data['_etag'], data)
+        return data
+
+    async def _do_list(self, path, nb, page, sort, **extra_params):
+        """
+        Do the list API call
+        :param path: str:
+        :param nb: int:
+        :param page: int:
+        :param sort: str:
+        :param extra_params: dict:
+        :return: tuple: (data_list, data_results_per_page, data_total_items, data_current_page)
+        """
+        params = dict(extra_params)
+        params.update({'max_results': nb, 'page': page, 'sort': sort})
+        data = await self._do_request(path, params=params)
+        return ([self._clean_dict_object(item) for item in data['_items']],
+                data['_meta']['max_results'], data['_meta']['total'], data['_meta']['page'])
+
+    async def _list_all(self, path, nb, sort, **extra_params):
+        """
+        Fetch all the objects of a collection, page by page
+        :param path: str:
+        :param nb: int: page size
+        :param sort: str:
+        :param extra_params: dict:
+        :return: list: objects
+        """
+        objects = []
+        page = 1
+        while True:
+            items, nb, total, _ = await self._do_list(path, nb, page, sort, **extra_params)
+            objects.extend(items)
+            if not items or page * nb >= total:
+                return objects
+            page += 1
+
+    async def _list_head(self, path, nb, limit, sort, **extra_params):
+        """
+        Fetch the first objects of a collection, page by page, see `ApiClient._list_head`
+        :return: tuple: (objects, page size applied by the server, total number of objects)
+        """
+        objects = []
+        page = 1
+        while True:
+            items, nb, total, _ = await self._do_list(path, nb, page, sort, **extra_params)
+            objects.extend(items)
+            if not items or len(objects) >= limit or page * nb >= total:
+                return objects[:limit], nb, total
+            page += 1
+
+    async def _list_filtered(self, path, nb, page, sort, app_ids, get_query, **extra_params):
+        """
+        Do the list API call on objects filtered by application, see `ApiClient._list_filtered`.
+        The chunks of application ids are listed concurrently.
+        :return: tuple: (data_list, data_results_per_page, data_total_items, data_current_page)
+        """
+        if app_ids is None or len(app_ids) <= self.max_filter_ids:
+            return await self._do_list(path, nb, page, sort, where=get_query(app_ids), **extra_params)
+        heads = await asyncio.gather(*[
+            self._list_head(path, nb, nb * page, sort, where=get_query(chunk), **extra_params)
+            for chunk in _chunk_ids(app_ids, self.max_filter_ids)])
+        return _merge_pages(heads, page, sort)
+
+    async def _do_create(self, path, obj, idempotency_key=None, **extra_params):
+        """
+        Do the create API call
+        :param path: str:
+        :param obj: dict:
+        :param idempotency_key: str: makes the request safe to retry
+        :param extra_params: dict:
+        :return: str:
+        """
+        data = await self._do_request(path, body=obj, params=extra_params, method=METHOD_POST,
+                                      idempotency_key=idempotency_key)
+        return data.get('_id')
+
+    async def _do_update(self, path, obj, etag, headers=None, **extra_params):
+        """
+        Do the update API call
+        :param path: str:
+        :param obj: dict:
+        :param etag: string ID:
+        :param headers: dict:
+        :param extra_params: dict:
+        :return: str:
+        """
+        obj_id = obj.get('_id', None)
+        if obj_id is None:
+            raise ValueError("'_id' attribute must be set on your object.")
+        if headers is None:
+            headers = {}
+        headers['If-Match'] = etag
+        data = await self._do_request(os.path.join(path, obj_id), body=obj, params=extra_params,
+                                      method=METHOD_PATCH, headers=headers)
+        if self.cache is not None:
+            self.cache.invalidate((self.username, self._get_url(path, None, obj_id)))
+        return data.get('_id')
+
+    async def retrieve(self, object_id, fields=None, embed=None):
+        """
+        Retrieve an object
+        :param object_id: str: id of the object
+        :param fields: list|dict: fields to return, or an Eve projection such as {"modules": 0}, all if not set
+        :param embed: list: reference fields to embed, none if not set
+        :return: dict:
+        """
+        if not self.path:
+            raise NotImplementedError('`path` variable must be defined')
+        return await self._do_retrieve(self.path, object_id, **self._get_query_params(fields, embed))
+
+    async def retrieve_many(self, object_ids, fields=None, embed=None, chunk_size=DEFAULT_ITER_PAGE_SIZE):
+        """
+        Retrieve several objects at once, see `ApiClient.retrieve_many`.
+        Requests are sent concurrently, bounded by `max_concurrency`.
+        :param object_ids: list: ids of the objects
+        :param fields: list|dict: fields to return, or an Eve projection such as {"modules": 0}, all if not set
+        :param embed: list: reference fields to embed, none if not set
+        :param chunk_size: int: maximum number of ids per list query
+        :return: RetrievedObjects: (objects, missing), objects in the order of `object_ids`, None if not found,
+                 and the ids which were not found
+
+        >>> from pyghost.cache import ResponseCache
+        >>> class StubAppsApi(AsyncAppsApiClient):
+        ...     '''Serves the applications "0" to "9", 4 per page at most'''
+        ...     requests = 0
+        ...     async def _do_request(self, path, object_id=None, params=None, headers=None, **kwargs):
+        ...         self.requests += 1
+        ...         if object_id is not None:
+        ...             return None if headers and headers['If-None-Match'] == 'e' + object_id else {'_id': object_id}
+        ...         ids = [i for i in json.loads(params['where'])['_id']['$in'] if i.isdigit()]
+        ...         nb, page = min(params['max_results'], 4), params['page']
+        ...         items = [{'_id': i, '_etag': 'e' + i} for i in ids[(page - 1) * nb:page * nb]]
+        ...         return {'_items': items, '_meta': {'max_results': nb, 'total': len(ids), 'page': page}}
+        >>> api = StubAppsApi('https://cloud-deploy', 'user', 'password', cache=ResponseCache())
+        >>> loop = asyncio.new_event_loop()
+        >>> objects, missing = loop.run_until_complete(
+        ...     api.retrieve_many(['1', '5', 'x', '1', '2', '3', '4', '6', '7'], chunk_size=6))
+        >>> [obj and obj['_id'] for obj in objects], missing
+        (['1', '5', None, '1', '2', '3', '4', '6', '7'], ['x'])
+        >>> api.requests  # 2 pages for the first chunk of 6 ids, 1 for the second one
+        3
+        >>> loop.run_until_complete(api.retrieve('5')), api.cache.stats()['hits']
+        ({'_id': '5', '_etag': 'e5'}, 1)
+        >>> loop.close()
+        """
+        if not self.path:
+            raise NotImplementedError('`path` variable must be defined')
+        params = self._get_query_params(fields, embed)
+        unique_ids = list(collections.OrderedDict.fromkeys(object_ids))
+        found = {}
+        pending = unique_ids
+        if self._in_query_supported is not False and len(unique_ids) > 1:
+            chunks = [unique_ids[i:i + chunk_size] for i in range(0, len(unique_ids), chunk_size)]
+            results = await asyncio.gather(*[self._retrieve_chunk(chunk, params) for chunk in chunks])
+            pending = []
+            for chunk, objects in zip(chunks, results):
+                if objects is None:
+                    pending.extend(chunk)
+                else:
+                    found.update(objects)
+
+        objects = await asyncio.gather(*[self._retrieve_or_none(object_id, params) for object_id in pending])
+        found.update((object_id, obj) for object_id, obj in zip(pending, objects) if obj is not None)
+        return RetrievedObjects([found.get(object_id) for object_id in object_ids],
+                                [object_id for object_id in unique_ids if object_id not in found])
+
+    async def _retrieve_chunk(self, object_ids, params):
+        """
+        Retrieve objects with a single `$in` list query
+        :param object_ids: list: ids of the objects
+        :param params: dict: projection and embedding query arguments
+        :return: dict: objects by id, or None if they must be retrieved one by one
+        """
+        where = json.dumps({'_id': {'$in': object_ids}}, separators=(',', ':'))
+        try:
+            objects = await self._list_all(self.path, len(object_ids), '_id', where=where, **params)
+        except ApiClientException as e:
+            if e.status_code == 400:
+                # Filtering on `_id` is not allowed on the server
+                self._in_query_supported = False
+                return None
+            raise
+        self._in_query_supported = True
+        if self.cache is not None:
+            for obj in objects:
+                if obj.get('_etag'):
+                    key = (self.username, self._get_url(self.path, params, obj['_id']))
+                    self.cache.set(key, obj['_etag'], obj)
+        return {obj['_id']: obj for obj in objects}
+
+    async def _retrieve_or_none(self, object_id, params):
+        """
+        Retrieve an object
+        :param object_id: str: id of the object
+        :param params: dict: projection and embedding query arguments
+        :return: dict: the object, or None if it does not exist
+        """
+        try:
+            return await self._do_retrieve(self.path, object_id, **params)
+        except ApiClientException as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+    async def list(self, nb=DEFAULT_PAGE_SIZE, page=1, sort='-_updated', fields=None, embed=None):
+        """
+        List objects
+        :param nb: int: the number of objects to list
+        :param page: int: the page to fetch
+        :param sort: str: the object order
+        :param fields: list|dict: fields to return, or an Eve projection such as {"modules": 0}, all if not set
+        :param embed: list: reference fields to embed, `default_embed` if not set
+        :return: tuple: returns the tuple (objects, number of results, total number of objects, page fetched)
+        """
+        if not self.path:
+            raise NotImplementedError('`path` variable must be defined')
+        return await self._do_list(self.path, nb, page, sort, **self._get_list_params(fields, embed))
+
+    async def create(self, obj, idempotency_key=None):
+        """
+        Create an object
+        :param obj: dict: the object
+        :param idempotency_key: str: unique key of this creation, the request is only retried if set
+        :return: str: id of the created object
+        """
+        if not self.path:
+            raise NotImplementedError('`path` variable must be defined')
+        return await self._do_create(self.path, obj, idempotency_key=idempotency_key)
+
+    async def _get_app_ids(self, application=None, env=None, role=None):
+        """
+        Resolve the application filter used on jobs and deployments, see `ApiClient._get_app_ids`
+        :return: list: ids of the matching applications, or None if there is no application filter
+        """
+        if not (application or env or role):
+            return None
+        resolver = get_app_id_resolver(self.host, self.username)
+        key = (application, env, role)
+        ids = resolver.get(key)
+        if ids is None:
+            apps = await self._list_all(AppsApiClient.path, DEFAULT_ITER_PAGE_SIZE, '_id', projection='{"_id":1}',
+                                        where=AppsApiClient._get_list_query(application, env, role))
+            ids = [app['_id'] for app in apps]
+            resolver.set(key, ids)
+        return ids
+
+    async def get_version(self):
+        """
+        Return Cloud Deploy running version
+        :return: dict: API version or git branch/tag
+        """
+        try:
+            return await self._do_request('/version')
+        except (ApiClientException, asyncio.TimeoutError):
+            return {
+                'current_revision_date': '',
+                'current_revision_name': 'unknown',
+                'current_revision': 'unknown'
+            }
+
+
+class AsyncAppsApiClient(AsyncApiClient):
+    path = AppsApiClient.path
+
+    validate_schema = AppsApiClient.validate_schema
+
+    async def list(self, nb=DEFAULT_PAGE_SIZE, page=1, sort='-_updated', name=None, env=None, role=None,
+                   fields=None, embed=None):
+        """
+        List objects
+        :param nb: int: the number of objects to list
+        :param page: int: the page to fetch
+        :param sort: str: the object order
+        :param name: str: filter to apply on application name
+        :param env: str: filter to apply on application env
+        :param role: str: filter to apply on application role
+        :param fields: list|dict: fields to return, or an Eve projection such as {"modules": 0}, all if not set
+        :param embed: list: reference fields to embed, `default_embed` if not set
+        :return: tuple: returns the tuple (objects, number of results, total number of objects, page fetched)
+        """
+        return await self._do_list(self.path, nb, page, sort, where=AppsApiClient._get_list_query(name, env, role),
+                                   **self._get_list_params(fields, embed))
+
+    async def create(self, obj, idempotency_key=None):
+        """
+        Create an object
+        :param obj: dict: the object
+        :param idempotency_key: str: unique key of this creation, the request is only retried if set
+        :return: str: id of the created object
+        """
+        app_id = await self._do_create(self.path, obj, idempotency_key=idempotency_key)
+        get_app_id_resolver(self.host, self.username).invalidate()
+        return app_id
+
+    async def update(self, obj, etag):
+        """
+        Update an object
+        :param obj: dict: the object
+        :param etag: str: the application etag
+        :return: str: id of the updated object
+        """
+        app_id = await self._do_update(self.path, obj, etag)
+        get_app_id_resolver(self.host, self.username).invalidate()
+        return app_id
+
+
+class AsyncJobsApiClient(JobCommandsMixin, AsyncApiClient):
+    path = JobsApiClient.path
+    default_embed = JobsApiClient.default_embed
+
+    async def list(self, nb=DEFAULT_PAGE_SIZE, page=1, sort='-_updated', application=None, env=None, role=None,
+                   command=None, status=None, user=None, fields=None, embed=None):
+        get_query = functools.partial(JobsApiClient._get_list_query, command=command, status=status, user=user)
+        return await self._list_filtered(self.path, nb, page, sort, await self._get_app_ids(application, env, role),
+                                         get_query, **self._get_list_params(fields, embed))
+
+
+class AsyncDeploymentsApiClient(AsyncApiClient):
+    path = DeploymentsApiClient.path
+    default_embed = DeploymentsApiClient.default_embed
+
+    async def list(self, nb=DEFAULT_PAGE_SIZE, page=1, sort='-timestamp', application=None, env=None, role=None,
+                   revision=None, module=None, fields=None, embed=None):
+        get_query = functools.partial(DeploymentsApiClient._get_list_query, revision=revision, module=module)
+        return await self._list_filtered(self.path, nb, page, sort, await self._get_app_ids(application, env, role),
+                                         get_query, **self._get_list_params(fields, embed))
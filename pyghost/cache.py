@@ -0,0 +1,105 @@
+import collections
+import copy
+import threading
+import time
+
+DEFAULT_CACHE_SIZE = 1000
+
+CacheEntry = collections.namedtuple('CacheEntry', ['etag', 'data', 'expires_at'])
+
+
+class ResponseCache(object):
+    """
+    Thread-safe LRU cache of API documents, keyed by URL and storing their Eve `_etag` for conditional GETs.
+    A cache instance can be shared between several API clients.
+
+    >>> cache = ResponseCache(max_size=2)
+    >>> cache.set('/apps/1', 'e1', {'_id': '1'})
+    >>> cache.set('/apps/2', 'e2', {'_id': '2'})
+    >>> cache.get('/apps/1').etag
+    'e1'
+    >>> cache.set('/apps/3', 'e3', {'_id': '3'})
+    >>> cache.get('/apps/2') is None
+    True
+    >>> sorted(cache.stats().items())
+    [('evictions', 1), ('hits', 0), ('misses', 0), ('size', 2)]
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, ttl=None):
+        """
+        Creates a response cache
+        :param max_size: int: maximum number of cached documents, least recently used ones are evicted first
+        :param ttl: int: number of seconds a document is kept, forever if not set
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Get a cache entry, expired entries are dropped
+        :param key: hashable: cache key
+        :return: CacheEntry: or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at is not None and entry.expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, etag, data):
+        """
+        Store a document in the cache
+        :param key: hashable: cache key
+        :param etag: str: document etag
+        :param data: dict: document
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = CacheEntry(etag, copy.deepcopy(data), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """
+        Drop a cache entry, or all of them if no key is given
+        :param key: hashable: cache key
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def record(self, hit):
+        """
+        Count a cache hit or miss
+        :param hit: bool: true if the cached document was used
+        """
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        """
+        Return cache counters
+        :return: dict:
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._entries)}
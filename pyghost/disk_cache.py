@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .cache import CacheEntry
+
+DEFAULT_DISK_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'pyghost', 'cache.db')
+DEFAULT_DISK_CACHE_SIZE = 256 * 1024 * 1024
+DEFAULT_DISK_CACHE_MMAP_SIZE = 256 * 1024 * 1024
+
+
+class DiskCache(object):
+    """
+    Persistent cache of API documents, a drop-in replacement of `ResponseCache` which survives the process.
+    Documents are stored as compact JSON in a SQLite database read through a memory map, along with their `_etag`
+    for conditional GETs. When the database grows over `max_size` bytes, the oldest documents are evicted first.
+    The database can be shared between processes, the total size of the documents is kept up to date by triggers.
+
+    >>> import tempfile
+    >>> cache = DiskCache(os.path.join(tempfile.mkdtemp(), 'cache.db'), max_size=50)
+    >>> cache.set(('user', 'https://cloud-deploy/apps/1'), 'e1', {'_id': '1'})
+    >>> cache.get(('user', 'https://cloud-deploy/apps/1'))
+    CacheEntry(etag='e1', data={'_id': '1'}, expires_at=None)
+    >>> cache.set(('user', 'https://cloud-deploy/apps/2'), 'e2', {'_id': '2', 'name': 'a' * 20})
+    >>> cache.get(('user', 'https://cloud-deploy/apps/1')) is None
+    True
+    >>> sorted(cache.stats().items())
+    [('bytes', 41), ('evictions', 1), ('hits', 0), ('misses', 0), ('size', 1)]
+    >>> cache.set(('user', 'https://cloud-deploy/apps/2'), 'e3', {'_id': '2'})
+    >>> cache.stats()['bytes']
+    11
+    >>> cache.invalidate(('user', 'https://cloud-deploy/apps/2'))
+    >>> cache.stats()['bytes']
+    0
+    >>> cache.close()
+    """
+
+    def __init__(self, path=DEFAULT_DISK_CACHE_PATH, max_size=DEFAULT_DISK_CACHE_SIZE, ttl=None,
+                 mmap_size=DEFAULT_DISK_CACHE_MMAP_SIZE):
+        """
+        Opens or creates a disk cache
+        :param path: str: database file, its directory is created if needed
+        :param max_size: int: maximum size of the cached documents, in bytes
+        :param ttl: int: number of seconds a document is kept, forever if not set
+        :param mmap_size: int: number of bytes of the database read through a memory map
+        """
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('PRAGMA mmap_size={:d}'.format(mmap_size))
+        self._db.execute('CREATE TABLE IF NOT EXISTS documents ('
+                         'key TEXT PRIMARY KEY, etag TEXT, data TEXT NOT NULL, size INTEGER NOT NULL, '
+                         'stored_at REAL NOT NULL, expires_at REAL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS documents_stored_at ON documents (stored_at)')
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            # Running total of the document sizes, computed once for databases created before it existed
+            self._db.execute('CREATE TABLE IF NOT EXISTS documents_size ('
+                             'id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)')
+            self._db.execute('INSERT OR IGNORE INTO documents_size SELECT 0, COALESCE(SUM(size), 0) FROM documents')
+            self._db.execute('CREATE TRIGGER IF NOT EXISTS documents_insert AFTER INSERT ON documents BEGIN '
+                             'UPDATE documents_size SET total = total + NEW.size; END')
+            self._db.execute('CREATE TRIGGER IF NOT EXISTS documents_delete AFTER DELETE ON documents BEGIN '
+                             'UPDATE documents_size SET total = total - OLD.size; END')
+            self._db.execute('COMMIT')
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Close the database
+        """
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _get_key(key):
+        return key if isinstance(key, str) else json.dumps(key, separators=(',', ':'))
+
+    def get(self, key):
+        """
+        Get a cache entry, expired entries are dropped.
+        Unlike `ResponseCache`, expiry uses wall-clock time since entries outlive the process.
+        :param key: str|tuple: cache key
+        :return: CacheEntry: or None
+        """
+        db_key = self._get_key(key)
+        with self._lock:
+            row = self._db.execute('SELECT etag, data, expires_at FROM documents WHERE key = ?', (db_key,)).fetchone()
+            if row is None:
+                return None
+            etag, data, expires_at = row
+            if expires_at is not None and expires_at < time.time():
+                self._db.execute('DELETE FROM documents WHERE key = ?', (db_key,))
+                return None
+        return CacheEntry(etag, json.loads(data), expires_at)
+
+    def set(self, key, etag, data):
+        """
+        Store a document in the cache, evicting the oldest ones if the cache is full
+        :param key: str|tuple: cache key
+        :param etag: str: document etag
+        :param data: dict|list: JSON serializable document
+        """
+        text = json.dumps(data, separators=(',', ':'))
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                # Not an INSERT OR REPLACE, its implicit delete does not fire the size trigger
+                db_key = self._get_key(key)
+                self._db.execute('DELETE FROM documents WHERE key = ?', (db_key,))
+                self._db.execute('INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?)',
+                                 (db_key, etag, text, len(text), now, expires_at))
+                self._evict()
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def _evict(self):
+        total = self._db.execute('SELECT total FROM documents_size').fetchone()[0]
+        if total <= self.max_size:
+            return
+        evicted = []
+        for db_key, size in self._db.execute('SELECT key, size FROM documents ORDER BY stored_at'):
+            if total <= self.max_size:
+                break
+            evicted.append((db_key,))
+            total -= size
+        self._db.executemany('DELETE FROM documents WHERE key = ?', evicted)
+        self.evictions += len(evicted)
+
+    def invalidate(self, key=None):
+        """
+        Drop a cache entry, or all of them if no key is given
+        :param key: str|tuple: cache key
+        """
+        with self._lock:
+            if key is None:
+                self._db.execute('DELETE FROM documents')
+            else:
+                self._db.execute('DELETE FROM documents WHERE key = ?', (self._get_key(key),))
+
+    def record(self, hit):
+        """
+        Count a cache hit or miss
+        :param hit: bool: true if the cached document was used
+        """
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        """
+        Return cache counters, `size` is the number of cached documents and `bytes` their total size
+        :return: dict:
+        """
+        size = len(self)
+        with self._lock:
+            total = self._db.execute('SELECT total FROM documents_size').fetchone()[0]
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': size,
+                    'bytes': total}
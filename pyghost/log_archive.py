@@ -0,0 +1,378 @@
+import bisect
+import collections
+import gzip
+import json
+import os
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:  # zstandard is an optional dependency, only required by the `zstd` compression
+    zstandard = None
+
+from .api_client import ApiClientException
+
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_ZSTD = 'zstd'
+COMPRESSIONS = (COMPRESSION_GZIP, COMPRESSION_ZSTD)
+COMPRESSION_EXTENSIONS = {COMPRESSION_GZIP: '.log.gz', COMPRESSION_ZSTD: '.log.zst'}
+
+# Uncompressed log bytes written at once, each batch is a compressed frame listed in the job index
+DEFAULT_ARCHIVE_BATCH_SIZE = 64 * 1024
+# Number of seconds log data can wait in memory before being written
+DEFAULT_ARCHIVE_FLUSH_INTERVAL = 1
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+DEFAULT_SEGMENT_AGE = 3600
+# Fast compression levels, the archiver must keep up with the log streams
+DEFAULT_COMPRESSION_LEVELS = {COMPRESSION_GZIP: 6, COMPRESSION_ZSTD: 3}
+
+INDEX_FILE_NAME = 'index.jsonl'
+
+IndexEntry = collections.namedtuple('IndexEntry', ['offset', 'length', 'timestamp', 'segment', 'position'])
+
+
+class _JobArchive(object):
+    """
+    Write state of the archive of a job
+    """
+
+    def __init__(self, offset):
+        self.offset = offset
+        self.buffer = []
+        self.buffered = 0
+        self.buffered_at = None
+        self.received_at = None
+        self.segment = None
+        self.segment_size = 0
+        self.segment_started_at = None
+
+
+class LogArchiver(object):
+    """
+    Sink archiving job logs on disk, to be used as the success handler of a log stream:
+
+        jobs_api.get_logs_async(job_id, archiver.handler(job_id), exception_handler)
+
+    Log data is queued without blocking, then a background thread batches it per job and appends each batch as a
+    compressed frame to the current segment file of the job, `<directory>/<job_id>/<offset>.log.gz`.
+    Segments are rotated once they hold `segment_size` uncompressed bytes or are `segment_age` seconds old.
+    Each batch is listed in the job `index.jsonl`, with its offset in the archived log, the time it was received and
+    its position in its segment, so that `read` and `find` go straight to the right frame.
+    Text data is archived as UTF-8, offsets count archived bytes.
+
+    >>> import tempfile
+    >>> archiver = LogArchiver(tempfile.mkdtemp())
+    >>> write = archiver.handler('j1')
+    >>> write('line 1\\n'); write(b'line 2\\n')
+    >>> archiver.flush()
+    >>> b''.join(archiver.read('j1')), b''.join(archiver.read('j1', offset=9))
+    (b'line 1\\nline 2\\n', b'ne 2\\n')
+    >>> archiver.size('j1'), archiver.find('j1', 0)
+    (14, 0)
+    >>> archiver.write('../j2', 'line 1\\n')
+    Traceback (most recent call last):
+    ...
+    ValueError: Invalid job id "../j2"
+    >>> archiver.close()
+    >>> archiver.flush()
+    Traceback (most recent call last):
+    ...
+    pyghost.api_client.ApiClientException: The log archiver is closed
+    """
+
+    def __init__(self, directory, compression=COMPRESSION_GZIP, batch_size=DEFAULT_ARCHIVE_BATCH_SIZE,
+                 flush_interval=DEFAULT_ARCHIVE_FLUSH_INTERVAL, segment_size=DEFAULT_SEGMENT_SIZE,
+                 segment_age=DEFAULT_SEGMENT_AGE, compression_level=None, exception_handler=None):
+        """
+        :param directory: str: archive root directory, created if needed
+        :param compression: str: one of `COMPRESSIONS`, `zstd` requires the `zstandard` package
+        :param batch_size: int: number of uncompressed bytes written at once
+        :param flush_interval: float: maximum number of seconds log data waits in memory
+        :param segment_size: int: number of uncompressed bytes after which a segment is rotated
+        :param segment_age: float: number of seconds after which a segment is rotated
+        :param compression_level: int: compression level, from `DEFAULT_COMPRESSION_LEVELS` if not set
+        :param exception_handler: function: called with the errors of the background writer, arguments:
+                                  exception, they are raised by the next `flush` or `close` otherwise
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError('Unknown log archive compression "{}"'.format(compression))
+        if compression == COMPRESSION_ZSTD and zstandard is None:
+            raise ApiClientException('The `zstandard` package is required by the zstd log archive compression')
+        self.directory = directory
+        self.compression = compression
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_size = segment_size
+        self.segment_age = segment_age
+        self.compression_level = compression_level
+        self.exception_handler = exception_handler
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.segments = 0
+        os.makedirs(directory, exist_ok=True)
+        self._queue = collections.deque()
+        self._jobs = {}
+        self._error = None
+        self._busy = False
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='pyghost-log-archiver', daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def handler(self, job_id):
+        """
+        Return a log stream success handler archiving the logs of a job
+        :param job_id: str: Job ID
+        :return: function: arguments: log_message
+        """
+        _check_job_id(job_id)
+        return lambda data: self.write(job_id, data)
+
+    def write(self, job_id, data):
+        """
+        Queue log data of a job, without blocking
+        :param job_id: str: Job ID
+        :param data: str|bytes: log data
+        """
+        _check_job_id(job_id)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        with self._condition:
+            if self._stopped:
+                raise ApiClientException('The log archiver is closed')
+            self._queue.append((job_id, data, time.time()))
+            self._condition.notify_all()
+
+    def close_job(self, job_id):
+        """
+        Write the queued logs of a job and release its state, it can be used as a log stream finished handler
+        :param job_id: str: Job ID
+        """
+        _check_job_id(job_id)
+        with self._condition:
+            if self._stopped:
+                raise ApiClientException('The log archiver is closed')
+            self._queue.append((job_id, None, time.time()))
+            self._condition.notify_all()
+
+    def flush(self):
+        """
+        Wait until all the queued log data is written
+        """
+        with self._condition:
+            if self._stopped:
+                raise ApiClientException('The log archiver is closed')
+            self._queue.append((None, None, None))
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: not self._queue and not self._busy)
+        self._raise_error()
+
+    def close(self):
+        """
+        Write all the queued log data, then stop the background thread
+        """
+        with self._condition:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+                self._condition.wait_for(lambda: self._queue or self._stopped, self._get_timeout())
+                items, self._queue = self._queue, collections.deque()
+                stopped = self._stopped
+                self._busy = True
+            try:
+                self._process(items, flush_all=stopped)
+            except Exception as e:
+                if self.exception_handler is not None:
+                    self.exception_handler(e)
+                else:
+                    self._error = e
+            if stopped:
+                with self._condition:
+                    if not self._queue:
+                        self._busy = False
+                        self._condition.notify_all()
+                        return
+
+    def _get_timeout(self):
+        pending = [job.buffered_at for job in self._jobs.values() if job.buffered_at is not None]
+        if not pending:
+            return None
+        return max(min(pending) + self.flush_interval - time.monotonic(), 0)
+
+    def _process(self, items, flush_all=False):
+        flush_all = flush_all or any(job_id is None for job_id, _, _ in items)
+        for job_id, data, received_at in items:
+            if job_id is None:
+                continue
+            job = self._get_job(job_id)
+            if data is None:
+                self._write_batch(job_id, job)
+                del self._jobs[job_id]
+                continue
+            if not job.buffer:
+                job.buffered_at = time.monotonic()
+                job.received_at = received_at
+            job.buffer.append(data)
+            job.buffered += len(data)
+            self.bytes_in += len(data)
+            if job.buffered >= self.batch_size:
+                self._write_batch(job_id, job)
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if job.buffer and (flush_all or now - job.buffered_at >= self.flush_interval):
+                self._write_batch(job_id, job)
+
+    def _get_job(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._jobs[job_id] = _JobArchive(self.size(job_id))
+        return job
+
+    def _compress(self, data):
+        level = self.compression_level
+        if level is None:
+            level = DEFAULT_COMPRESSION_LEVELS[self.compression]
+        if self.compression == COMPRESSION_ZSTD:
+            return zstandard.ZstdCompressor(level=level).compress(data)
+        return gzip.compress(data, compresslevel=level)
+
+    def _write_batch(self, job_id, job):
+        """
+        Append the buffered data of a job to its current segment, rotating it first if needed
+        """
+        if not job.buffer:
+            return
+        data = b''.join(job.buffer)
+        now = time.monotonic()
+        if job.segment is None or job.segment_size >= self.segment_size or \
+                now - job.segment_started_at >= self.segment_age:
+            job.segment = '{:016d}{}'.format(job.offset, COMPRESSION_EXTENSIONS[self.compression])
+            job.segment_size = 0
+            job.segment_started_at = now
+            self.segments += 1
+        job_directory = self._get_job_directory(job_id)
+        os.makedirs(job_directory, exist_ok=True)
+        frame = self._compress(data)
+        with open(os.path.join(job_directory, job.segment), 'ab') as segment_file:
+            position = segment_file.tell()
+            segment_file.write(frame)
+        entry = IndexEntry(job.offset, len(data), job.received_at, job.segment, position)
+        with open(os.path.join(job_directory, INDEX_FILE_NAME), 'a') as index_file:
+            index_file.write(json.dumps(list(entry)) + '\n')
+        job.offset += len(data)
+        job.segment_size += len(data)
+        job.buffer = []
+        job.buffered = 0
+        job.buffered_at = None
+        self.bytes_out += len(frame)
+
+    def _get_job_directory(self, job_id):
+        _check_job_id(job_id)
+        return os.path.join(self.directory, job_id)
+
+    def index(self, job_id):
+        """
+        Return the index of the archived logs of a job, written batches only
+        :param job_id: str: Job ID
+        :return: list: `IndexEntry(offset, length, timestamp, segment, position)` tuples, in offset order
+        """
+        try:
+            with open(os.path.join(self._get_job_directory(job_id), INDEX_FILE_NAME)) as index_file:
+                # A line cut by a crash is ignored
+                return [IndexEntry(*json.loads(line)) for line in index_file if line.endswith('\n')]
+        except FileNotFoundError:
+            return []
+
+    def size(self, job_id):
+        """
+        :param job_id: str: Job ID
+        :return: int: number of archived log bytes of a job
+        """
+        entries = self.index(job_id)
+        return entries[-1].offset + entries[-1].length if entries else 0
+
+    def find(self, job_id, timestamp):
+        """
+        Return the offset of the logs received at or after a time
+        :param job_id: str: Job ID
+        :param timestamp: float: POSIX timestamp
+        :return: int: offset to `read` from, the archive size if nothing was received since
+        """
+        entries = self.index(job_id)
+        pos = bisect.bisect_left([entry.timestamp for entry in entries], timestamp)
+        return entries[pos].offset if pos < len(entries) else self.size(job_id)
+
+    def read(self, job_id, offset=0):
+        """
+        Read the archived logs of a job, only the frames following `offset` are decompressed
+        :param job_id: str: Job ID
+        :param offset: int: offset to start from
+        :return: generator: log data chunks, as bytes
+        """
+        entries = self.index(job_id)
+        start = max(bisect.bisect_right([entry.offset for entry in entries], offset) - 1, 0)
+        job_directory = self._get_job_directory(job_id)
+        segment_file = None
+        try:
+            for entry in entries[start:]:
+                if segment_file is None or segment_file.name != os.path.join(job_directory, entry.segment):
+                    if segment_file is not None:
+                        segment_file.close()
+                    segment_file = open(os.path.join(job_directory, entry.segment), 'rb')
+                data = self._decompress_frame(segment_file, entry)
+                if entry.offset < offset:
+                    data = data[offset - entry.offset:]
+                if data:
+                    yield data
+        finally:
+            if segment_file is not None:
+                segment_file.close()
+
+    def _decompress_frame(self, segment_file, entry):
+        segment_file.seek(entry.position)
+        if entry.segment.endswith(COMPRESSION_EXTENSIONS[COMPRESSION_ZSTD]):
+            if zstandard is None:
+                raise ApiClientException('The `zstandard` package is required to read zstd log archives')
+            reader = zstandard.ZstdDecompressor().stream_reader(segment_file)
+            return reader.read(entry.length)
+        with gzip.GzipFile(fileobj=segment_file) as reader:
+            return reader.read(entry.length)
+
+    def stats(self):
+        """
+        Return the archiver counters, `bytes_in` and `bytes_out` are the log bytes before and after compression
+        :return: dict:
+        """
+        with self._condition:
+            queued = len(self._queue)
+        return {'queued': queued, 'jobs': len(self._jobs), 'bytes_in': self.bytes_in, 'bytes_out': self.bytes_out,
+                'segments': self.segments}
+
+
+def _check_job_id(job_id):
+    """
+    Reject the job ids which cannot be used as an archive directory name
+    """
+    if not job_id or not isinstance(job_id, str) or os.sep in job_id or job_id.startswith('.'):
+        raise ValueError('Invalid job id "{}"'.format(job_id))
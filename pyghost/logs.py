@@ -0,0 +1,836 @@
+import asyncio
+import collections
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+
+from socketIO_client import SocketIO
+
+from .api_client import (DEFAULT_LOG_BUFFER_SIZE, FINISHED_JOB_STATUSES, LOG_BUFFER_BLOCK, LOG_BUFFER_DROP_NEWEST,
+                         LOG_BUFFER_DROP_OLDEST, LOG_BUFFER_POLICIES, STARTED_JOB_STATUSES, ApiClientException)
+from .utils import Backoff, LogDecoder
+
+DEFAULT_STATUS_INTERVAL = 3
+DEFAULT_DRAIN_DELAY = 3
+DEFAULT_CHECKPOINT_INTERVAL = 1
+# Number of seconds between two checks that the producer of a waiting log buffer is still alive
+DEFAULT_PRODUCER_CHECK_INTERVAL = 1
+
+
+class LogCheckpoint(object):
+    """
+    Log offsets of many jobs, saved to a JSON file so that a collector restarted after a crash resumes each log
+    where it stopped. Offsets are saved at most once per `save_interval`, and by `save`.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'offsets.json')
+    >>> checkpoint = LogCheckpoint(path)
+    >>> checkpoint.update('j1', 1024)
+    >>> checkpoint.save()
+    >>> LogCheckpoint(path).get('j1'), LogCheckpoint(path).get('j2')
+    (1024, None)
+    """
+
+    def __init__(self, path, save_interval=DEFAULT_CHECKPOINT_INTERVAL):
+        """
+        :param path: str: checkpoint file path, loaded if it exists
+        :param save_interval: float: minimum number of seconds between two automatic saves
+        """
+        self.path = path
+        self.save_interval = save_interval
+        self._offsets = {}
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+        try:
+            with open(path) as checkpoint_file:
+                self._offsets = json.load(checkpoint_file)
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            raise ApiClientException('Invalid log checkpoint file {}'.format(path)) from e
+
+    def get(self, job_id, default=None):
+        """
+        :param job_id: str: Job ID
+        :param default: int: returned if the job has no offset
+        :return: int: log offset of the job
+        """
+        with self._lock:
+            return self._offsets.get(job_id, default)
+
+    def update(self, job_id, pos):
+        """
+        Record the log offset of a job, saved later
+        :param job_id: str: Job ID
+        :param pos: int: offset of the next log byte to read
+        """
+        with self._lock:
+            if self._offsets.get(job_id) == pos:
+                return
+            self._offsets[job_id] = pos
+            self._dirty = True
+            due = time.monotonic() - self._saved_at >= self.save_interval
+        if due:
+            self.save()
+
+    def remove(self, job_id):
+        """
+        Forget the offset of a job, once its logs are fully collected
+        :param job_id: str: Job ID
+        """
+        with self._lock:
+            if self._offsets.pop(job_id, None) is not None:
+                self._dirty = True
+
+    def save(self):
+        """
+        Write the offsets to the checkpoint file, atomically, if they changed
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.checkpoint-')
+            try:
+                with os.fdopen(fd, 'w') as tmp_file:
+                    json.dump(self._offsets, tmp_file)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._dirty = False
+            self._saved_at = time.monotonic()
+
+
+class LogTail(object):
+    """
+    Keeps the last lines of a log backlog, to start a stream near its end
+
+    >>> tail = LogTail(2)
+    >>> tail.feed('one\\ntwo\\nthr'), tail.feed('ee\\nfou')
+    (None, None)
+    >>> tail.release()
+    'two\\nthree\\nfou'
+    """
+
+    def __init__(self, lines):
+        """
+        :param lines: int: number of lines to keep
+        """
+        self.lines = collections.deque(maxlen=lines)
+        self._partial = None
+
+    def feed(self, data):
+        """
+        :param data: str|bytes: decoded log chunk
+        """
+        if self._partial:
+            data = self._partial + data
+        lines = data.splitlines(True)
+        self._partial = data[:0]
+        if lines and lines[-1].splitlines()[0] == lines[-1]:
+            self._partial = lines.pop()
+        self.lines.extend(lines)
+
+    def release(self):
+        """
+        :return: str|bytes: the kept lines, and the last incomplete one, None if nothing was fed
+        """
+        if self._partial is None:
+            return None
+        data = self._partial[:0].join(self.lines) + self._partial
+        self.lines.clear()
+        self._partial = None
+        return data
+
+
+class LogSubscription(object):
+    """
+    State of a job log stream followed by a `LogStreamHub`, or by `JobsApiClient.get_logs_async`
+    """
+
+    def __init__(self, job_id, success_handler, exception_handler=None, finished_handler=None,
+                 no_color=False, last_pos=None, tail=None, checkpoint=None):
+        """
+        :param job_id: str: Job ID
+        :param success_handler: function: Success function callback, arguments: log_message
+        :param exception_handler: function: Error function callback, arguments: exception
+        :param finished_handler: function: Called once the job is finished and its logs drained, arguments: job_id
+        :param no_color: bool: should ANSI tags be stripped
+        :param last_pos: int: log offset to start from, the checkpointed one, or 0, if not set
+        :param tail: int: only hand over the last lines of the log backlog, see `release_tail`
+        :param checkpoint: LogCheckpoint: where the log offset is recorded
+        """
+        if last_pos is None:
+            last_pos = checkpoint.get(job_id, 0) if checkpoint is not None else 0
+        self.job_id = job_id
+        self.success_handler = success_handler
+        self.exception_handler = exception_handler
+        self.finished_handler = finished_handler
+        self.no_color = no_color
+        self.last_pos = last_pos
+        self.finished_at = None
+        self.checkpoint = checkpoint
+        self._tail = LogTail(tail) if tail else None
+        # Raw bytes are handed over as is, like `get_logs_async` does, unless ANSI tags are stripped
+        self._decoder = LogDecoder(no_color=no_color, text=no_color)
+
+    def handle_event(self, args):
+        """
+        Handle a `job` websocket event of this job
+        :param args: dict: event payload
+        """
+        try:
+            if 'error' in args:
+                raise ApiClientException(args['error'])
+            if 'raw' in args:
+                raw = self._decoder.decode_base64(args['raw'])
+                self.last_pos = args.get('last_pos', self.last_pos + len(raw))
+                data = self._decoder.feed(raw)
+            else:
+                data = self._decoder.decode_event(args)
+                self.last_pos = args.get('last_pos', self.last_pos)
+            if data:
+                if self._tail is not None:
+                    self._tail.feed(data)
+                else:
+                    self.success_handler(data)
+            if self.checkpoint is not None:
+                self.checkpoint.update(self.job_id, self.position)
+        except Exception as e:
+            if self.exception_handler is None:
+                raise
+            self.exception_handler(e)
+
+    @property
+    def position(self):
+        """
+        :return: int: log offset of the first byte not handed over yet, to resume the stream from
+        """
+        return self.last_pos - self._decoder.pending
+
+    def release_tail(self):
+        """
+        End the backlog of a `tail` stream: hand over its last lines, then the next data as it comes
+        """
+        if self._tail is None:
+            return
+        data, self._tail = self._tail.release(), None
+        if data:
+            self.success_handler(data)
+
+    def finish(self):
+        """
+        Flush the data kept back by the decoder and notify the end of the stream
+        """
+        self.release_tail()
+        data = self._decoder.flush()
+        if data:
+            self.success_handler(data)
+        if self.checkpoint is not None:
+            self.checkpoint.update(self.job_id, self.last_pos)
+            self.checkpoint.save()
+        if self.finished_handler:
+            self.finished_handler(self.job_id)
+
+
+class LogStreamHub(object):
+    """
+    Follows the logs of many jobs over a single socket.io connection.
+    Every `job` event is routed to its subscription by `log_id`. After a connection drop, all the streams are
+    requested again from their `last_pos` so no log data is lost or duplicated.
+    The hub is driven by a single thread, either by calling `poll` or with `start`, handlers are called from it.
+    A background hub survives polling errors: they are handed over to the exception handler of every subscription,
+    then the connection is opened again after a backoff delay.
+
+    >>> class Hub(LogStreamHub):
+    ...     '''Fails its first poll'''
+    ...     polls = 0
+    ...     recovered = threading.Event()
+    ...     def poll(self, seconds=1):
+    ...         self.polls += 1
+    ...         if self.polls == 1:
+    ...             raise ApiClientException('Jobs API is unavailable')
+    ...         self.recovered.set()
+    >>> hub = Hub(None)
+    >>> errors = []
+    >>> _ = hub.subscribe('j1', print, exception_handler=errors.append)
+    >>> hub.start()
+    >>> hub.recovered.wait(5)
+    True
+    >>> hub.close()
+    >>> errors
+    [ApiClientException('Jobs API is unavailable')]
+    """
+
+    def __init__(self, jobs_api, status_interval=DEFAULT_STATUS_INTERVAL, drain_delay=DEFAULT_DRAIN_DELAY):
+        """
+        :param jobs_api: JobsApiClient: client used for websocket tokens and job statuses
+        :param status_interval: float: number of seconds between two job status checks
+        :param drain_delay: float: number of seconds logs are still followed once a job is finished
+        """
+        self.jobs_api = jobs_api
+        self.status_interval = status_interval
+        self.drain_delay = drain_delay
+        self._socket = None
+        self._subscriptions = {}
+        self._pending = collections.deque()
+        self._lock = threading.Lock()
+        self._disconnected = False
+        self._last_status_check = 0
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def socket(self):
+        """
+        socket.io connection, lazily opened
+        :return: SocketIO:
+        """
+        if self._socket is None:
+            host = self.jobs_api.host
+            self._socket = SocketIO(host if host[-1] != '/' else host[0:-1], verify=True)
+            self._socket.on('job', self._on_job)
+            self._socket.on('disconnect', self._on_disconnect)
+        return self._socket
+
+    @property
+    def job_ids(self):
+        """
+        :return: list: IDs of the followed jobs
+        """
+        with self._lock:
+            return list(self._subscriptions)
+
+    def subscribe(self, job_id, success_handler, exception_handler=None, finished_handler=None,
+                  no_color=False, last_pos=None, tail=None, checkpoint=None):
+        """
+        Follow the logs of a job, see `LogSubscription` for the arguments.
+        Can be called from any thread, the stream is requested on the next `poll`, the backlog of a `tail` stream
+        is what that poll receives.
+        :return: LogSubscription:
+        """
+        subscription = LogSubscription(job_id, success_handler, exception_handler, finished_handler,
+                                       no_color, last_pos, tail, checkpoint)
+        with self._lock:
+            self._subscriptions[job_id] = subscription
+            self._pending.append(job_id)
+        return subscription
+
+    def unsubscribe(self, job_id):
+        """
+        Stop following the logs of a job
+        :param job_id: str: Job ID
+        """
+        with self._lock:
+            self._subscriptions.pop(job_id, None)
+
+    def _on_disconnect(self, *args):
+        self._disconnected = True
+
+    def _on_job(self, args):
+        with self._lock:
+            subscription = self._subscriptions.get(args.get('log_id'))
+            if subscription is None and 'log_id' not in args and len(self._subscriptions) == 1:
+                # Servers which do not echo the `log_id` can only be followed one job at a time
+                subscription = next(iter(self._subscriptions.values()))
+        if subscription is not None:
+            subscription.handle_event(args)
+
+    def _request_streams(self):
+        with self._lock:
+            if self._disconnected:
+                self._disconnected = False
+                self._pending = collections.deque(self._subscriptions)
+            pending, self._pending = self._pending, collections.deque()
+            subscriptions = [self._subscriptions[job_id] for job_id in pending if job_id in self._subscriptions]
+        for subscription in subscriptions:
+            self.socket.emit('job_logging', {
+                'log_id': subscription.job_id,
+                'last_pos': subscription.last_pos,
+                'raw_mode': True,
+                'auth_token': self.jobs_api._get_websocket_token(subscription.job_id)
+            })
+        return subscriptions
+
+    def _check_statuses(self):
+        now = time.monotonic()
+        if now - self._last_status_check < self.status_interval:
+            return
+        self._last_status_check = now
+        with self._lock:
+            running = [job_id for job_id, sub in self._subscriptions.items() if sub.finished_at is None]
+        finished = [job['_id'] for job in self.jobs_api._fetch_statuses(running)
+                    if job['status'] in FINISHED_JOB_STATUSES]
+        with self._lock:
+            for job_id in finished:
+                if job_id in self._subscriptions:
+                    self._subscriptions[job_id].finished_at = now
+            drained = [sub for sub in self._subscriptions.values()
+                       if sub.finished_at is not None and now - sub.finished_at >= self.drain_delay]
+            for subscription in drained:
+                del self._subscriptions[subscription.job_id]
+        for subscription in drained:
+            subscription.finish()
+
+    def poll(self, seconds=1):
+        """
+        Request the new streams, process socket events for some time, then check the job statuses
+        :param seconds: float: number of seconds to wait for socket events
+        """
+        requested = self._request_streams()
+        self.socket.wait(seconds=seconds)
+        for subscription in requested:
+            subscription.release_tail()
+        self._check_statuses()
+
+    def _fail(self, error):
+        """
+        Hand over a polling error to the subscriptions, and drop the connection so that the next poll opens it again
+        and requests all the streams from their last position
+        :param error: Exception:
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+        for subscription in subscriptions:
+            if subscription.exception_handler is not None:
+                subscription.exception_handler(error)
+        if self._socket is not None:
+            try:
+                self._socket.disconnect()
+            except Exception:
+                pass
+            self._socket = None
+        self._disconnected = True
+
+    @property
+    def thread(self):
+        """
+        :return: threading.Thread: background thread driving the hub, None if not started
+        """
+        return self._thread
+
+    def wait(self, timeout=None):
+        """
+        Drive the hub from the current thread until every followed job is finished
+        :param timeout: float: maximum number of seconds to wait, forever if not set
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self.job_ids and (deadline is None or time.monotonic() < deadline):
+            self.poll()
+
+    def start(self):
+        """
+        Drive the hub from a background thread, until `close`
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+
+        def run():
+            backoff = Backoff()
+            while not self._stopping.is_set():
+                if not self.job_ids:
+                    self._stopping.wait(0.1)
+                    continue
+                try:
+                    self.poll()
+                except Exception as e:
+                    self._fail(e)
+                    self._stopping.wait(backoff.next())
+                else:
+                    backoff.reset()
+
+        self._thread = threading.Thread(target=run, name='pyghost-log-stream-hub', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """
+        Stop the background thread, if any, and close the socket.io connection
+        """
+        self._stopping.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        if self._socket is not None:
+            self._socket.disconnect()
+            self._socket = None
+
+
+_hubs = {}
+_hubs_lock = threading.Lock()
+
+
+def get_log_stream_hub(jobs_api):
+    """
+    Return the shared `LogStreamHub` of the client host and user, started in a background thread
+    :param jobs_api: JobsApiClient:
+    :return: LogStreamHub:
+    """
+    key = (jobs_api.host, jobs_api.username)
+    with _hubs_lock:
+        hub = _hubs.get(key)
+        if hub is None:
+            hub = _hubs[key] = LogStreamHub(jobs_api)
+        hub.start()
+        return hub
+
+
+class LogBuffer(object):
+    """
+    Bounded, thread-safe buffer of log chunks. When full, `put` either blocks the producer (backpressure)
+    or drops a chunk, depending on the policy.
+    Consumers stop waiting with an error once the `producer` thread, if set, is not alive anymore.
+
+    >>> buffer = LogBuffer(max_size=2, policy=LOG_BUFFER_DROP_OLDEST)
+    >>> for chunk in ('a', 'b', 'c'):
+    ...     _ = buffer.put(chunk)
+    >>> buffer.close()
+    >>> buffer.get(), buffer.get(), buffer.dropped
+    ('b', 'c', 1)
+    >>> buffer.get()
+    Traceback (most recent call last):
+    ...
+    EOFError
+    >>> buffer = LogBuffer()
+    >>> buffer.producer = threading.Thread(target=buffer.put, args=('a',))
+    >>> buffer.producer.start()
+    >>> buffer.get()
+    'a'
+    >>> buffer.get()
+    Traceback (most recent call last):
+    ...
+    pyghost.api_client.ApiClientException: The log producer stopped before the end of the stream
+    """
+
+    def __init__(self, max_size=DEFAULT_LOG_BUFFER_SIZE, policy=LOG_BUFFER_BLOCK):
+        """
+        :param max_size: int: maximum number of buffered chunks
+        :param policy: str: what to do when the buffer is full, one of `LOG_BUFFER_POLICIES`
+        """
+        if policy not in LOG_BUFFER_POLICIES:
+            raise ValueError('Unknown log buffer policy "{}"'.format(policy))
+        self.max_size = max_size
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+        # Thread feeding the buffer
+        self.producer = None
+        self._items = collections.deque()
+        self._condition = threading.Condition()
+        self._listeners = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def add_listener(self, listener):
+        """
+        Register a function called, without arguments, each time a chunk is added or the buffer is closed
+        :param listener: function:
+        """
+        self._listeners.append(listener)
+
+    def _notify(self):
+        for listener in self._listeners:
+            listener()
+
+    def put(self, item):
+        """
+        Add a chunk
+        :param item: chunk
+        :return: bool: false if the chunk was dropped
+        """
+        with self._condition:
+            while not self.closed and len(self._items) >= self.max_size:
+                if self.policy == LOG_BUFFER_DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.policy == LOG_BUFFER_DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                    break
+                self._condition.wait()
+            if self.closed:
+                return False
+            self._items.append(item)
+            self._condition.notify_all()
+        self._notify()
+        return True
+
+    def get(self, block=True, timeout=None):
+        """
+        Remove and return the oldest chunk
+        :param block: bool: wait for a chunk if the buffer is empty
+        :param timeout: float: maximum number of seconds to wait
+        :return: chunk
+        :raises EOFError: if the buffer is closed and empty
+        :raises ApiClientException: if the buffer is empty and its producer is not alive anymore
+        :raises queue.Empty: if no chunk is available in time
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            while True:
+                if self._items:
+                    item = self._items.popleft()
+                    self._condition.notify_all()
+                    return item
+                if self.closed:
+                    raise EOFError
+                if self.producer is not None and not self.producer.is_alive():
+                    raise ApiClientException('The log producer stopped before the end of the stream')
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if not block or (remaining is not None and remaining <= 0):
+                    raise queue.Empty
+                self._condition.wait(DEFAULT_PRODUCER_CHECK_INTERVAL if remaining is None else
+                                     min(remaining, DEFAULT_PRODUCER_CHECK_INTERVAL))
+
+    def close(self):
+        """
+        Stop accepting chunks and wake up producers and consumers, buffered chunks can still be read
+        """
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+        self._notify()
+
+
+class LogStream(object):
+    """
+    Iterator over the decoded log chunks of a job, fed by a `LogStreamHub` through a `LogBuffer`.
+    The iteration ends once the job is finished and its logs are drained.
+    `last_pos` is the log offset following the chunks consumed so far: a chunk is considered consumed, and
+    checkpointed, once the next one is requested or the stream is closed. A stream closed early is resumed from
+    the first chunk it did not return, even if later ones were already received.
+    The iteration fails if the hub does, or if its thread stops before the end of the stream.
+
+    >>> import base64
+    >>> class Hub(object):
+    ...     '''Sends the 7 byte lines of a finished job log from the requested offset'''
+    ...     def subscribe(self, job_id, **kwargs):
+    ...         self.subscription = LogSubscription(job_id, **kwargs)
+    ...         return self.subscription
+    ...     def start(self):
+    ...         log = b''.join(b'line %d\\n' % i for i in range(10))
+    ...         for pos in range(self.subscription.last_pos, len(log), 7):
+    ...             self.subscription.handle_event({'raw': base64.b64encode(log[pos:pos + 7]).decode()})
+    ...         self.subscription.finish()
+    ...     def unsubscribe(self, job_id):
+    ...         pass
+    >>> stream = LogStream(None, 'j1', wait_for_start=False, max_size=2, policy=LOG_BUFFER_DROP_NEWEST, hub=Hub())
+    >>> next(stream), next(stream)
+    (b'line 0\\n', b'line 1\\n')
+    >>> stream.close()
+    >>> stream.dropped, stream.last_pos
+    (8, 14)
+    >>> stream = LogStream(None, 'j1', last_pos=stream.last_pos, wait_for_start=False, hub=Hub())
+    >>> chunks = list(stream)
+    >>> chunks[0], len(chunks), stream.last_pos
+    (b'line 2\\n', 8, 70)
+    >>> class FailingHub(LogStreamHub):
+    ...     '''Sends a line, then fails'''
+    ...     def poll(self, seconds=1):
+    ...         subscription = self._subscriptions['j1']
+    ...         if subscription.last_pos:
+    ...             raise ApiClientException('Jobs API is unavailable')
+    ...         subscription.handle_event({'raw': base64.b64encode(b'line 0\\n').decode()})
+    >>> hub = FailingHub(None)
+    >>> stream = LogStream(None, 'j1', wait_for_start=False, hub=hub)
+    >>> next(stream)
+    b'line 0\\n'
+    >>> next(stream)
+    Traceback (most recent call last):
+    ...
+    pyghost.api_client.ApiClientException: Jobs API is unavailable
+    >>> hub.close()
+    >>> class StoppingHub(Hub):
+    ...     '''Sends a line from a thread which then stops'''
+    ...     def start(self):
+    ...         event = {'raw': base64.b64encode(b'line 0\\n').decode()}
+    ...         self.thread = threading.Thread(target=self.subscription.handle_event, args=(event,))
+    ...         self.thread.start()
+    >>> stream = LogStream(None, 'j1', wait_for_start=False, hub=StoppingHub())
+    >>> next(stream)
+    b'line 0\\n'
+    >>> next(stream)
+    Traceback (most recent call last):
+    ...
+    pyghost.api_client.ApiClientException: The log producer stopped before the end of the stream
+    """
+
+    def __init__(self, jobs_api, job_id, no_color=False, last_pos=None, wait_for_start=True,
+                 max_size=DEFAULT_LOG_BUFFER_SIZE, policy=LOG_BUFFER_BLOCK, hub=None, tail=None, checkpoint=None):
+        """
+        :param jobs_api: JobsApiClient:
+        :param job_id: str: Job ID
+        :param no_color: bool: should ANSI tags be stripped
+        :param last_pos: int: log offset to start from, the checkpointed one, or 0, if not set
+        :param wait_for_start: bool: wait for the job to start before following its logs
+        :param max_size: int: maximum number of buffered chunks
+        :param policy: str: what to do when the consumer is too slow, one of `LOG_BUFFER_POLICIES`
+        :param hub: LogStreamHub: hub to follow the logs with, a private one is used if not set.
+            A blocking policy on a shared hub stalls all its streams while the buffer is full.
+        :param tail: int: start with the last lines of the log backlog only
+        :param checkpoint: LogCheckpoint: where the offset of the consumed chunks is recorded
+        """
+        if last_pos is None:
+            last_pos = checkpoint.get(job_id, 0) if checkpoint is not None else 0
+        self.jobs_api = jobs_api
+        self.job_id = job_id
+        self.no_color = no_color
+        self.last_pos = last_pos
+        self.tail = tail
+        self.checkpoint = checkpoint
+        self.wait_for_start = wait_for_start
+        self.buffer = LogBuffer(max_size, policy)
+        self._hub = hub
+        self._owns_hub = hub is None
+        self._subscription = None
+        self._consumed_pos = None
+        self._closed = False
+        self._drained = False
+        # Set by the buffer listener of an `AsyncLogStream`
+        self._ready = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.start()
+        self._commit()
+        try:
+            data, error, pos = self.buffer.get()
+        except EOFError:
+            # Unless `close` was called, the buffer was closed by the end of the job
+            self._drained = not self._closed
+            self.close()
+            raise StopIteration
+        except ApiClientException:
+            self.close()
+            raise
+        if error is not None:
+            self.close()
+            raise error
+        self._consumed_pos = pos
+        return data
+
+    def _commit(self):
+        """
+        Record the offset of the chunk returned last, which the consumer is done with
+        """
+        if self._consumed_pos is None:
+            return
+        self.last_pos, self._consumed_pos = self._consumed_pos, None
+        if self.checkpoint is not None:
+            self.checkpoint.update(self.job_id, self.last_pos)
+
+    def _put(self, data):
+        subscription = self._subscription
+        self.buffer.put((data, None, subscription.position if subscription is not None else None))
+
+    @property
+    def dropped(self):
+        """
+        :return: int: number of chunks dropped because the consumer was too slow
+        """
+        return self.buffer.dropped
+
+    def start(self):
+        """
+        Subscribe to the job logs, called by the first iteration
+        """
+        if self._subscription is not None:
+            return
+        if self.wait_for_start:
+            self.jobs_api.wait_for_jobs([self.job_id], statuses=STARTED_JOB_STATUSES)
+        if self._hub is None:
+            self._hub = LogStreamHub(self.jobs_api)
+        self._subscription = self._hub.subscribe(
+            self.job_id,
+            success_handler=self._put,
+            exception_handler=lambda e: self.buffer.put((None, e, None)),
+            finished_handler=lambda job_id: self.buffer.close(),
+            no_color=self.no_color, last_pos=self.last_pos, tail=self.tail)
+        self._hub.start()
+        self.buffer.producer = getattr(self._hub, 'thread', None)
+
+    def close(self):
+        """
+        Stop following the job logs
+        """
+        self._closed = True
+        self.buffer.close()
+        if self._hub is not None:
+            self._hub.unsubscribe(self.job_id)
+            if self._owns_hub:
+                self._hub.close()
+        self._commit()
+        if self._drained:
+            # The job is finished and everything received was consumed, including events without data
+            self.last_pos = self._subscription.position
+            if self.checkpoint is not None:
+                self.checkpoint.update(self.job_id, self.last_pos)
+        if self.checkpoint is not None:
+            self.checkpoint.save()
+
+
+class AsyncLogStream(LogStream):
+    """
+    Asynchronous iterator over the decoded log chunks of a job, see `LogStream`
+    """
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        loop = asyncio.get_event_loop()
+        if self._ready is None:
+            ready = asyncio.Event()
+            self.buffer.add_listener(lambda: loop.call_soon_threadsafe(ready.set))
+            self._ready = ready
+        if self._subscription is None:
+            await loop.run_in_executor(None, self.start)
+        while True:
+            self._ready.clear()
+            self._commit()
+            try:
+                data, error, pos = self.buffer.get(block=False)
+            except queue.Empty:
+                try:
+                    await asyncio.wait_for(self._ready.wait(), DEFAULT_PRODUCER_CHECK_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            except EOFError:
+                self._drained = not self._closed
+                await self.aclose()
+                raise StopAsyncIteration
+            except ApiClientException:
+                await self.aclose()
+                raise
+            if error is not None:
+                await self.aclose()
+                raise error
+            self._consumed_pos = pos
+            return data
+
+    async def aclose(self):
+        """
+        Stop following the job logs without blocking the event loop, see `close`
+        """
+        await asyncio.get_event_loop().run_in_executor(None, self.close)
@@ -0,0 +1,258 @@
+import bisect
+import collections
+import threading
+
+try:
+    from opentelemetry import trace
+except ImportError:  # opentelemetry is an optional dependency, only required by `OpenTelemetryHooks`
+    trace = None
+
+from .api_client import ApiClientException
+
+# Request latency histogram buckets, in seconds
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+DEFAULT_METRICS_PREFIX = 'pyghost'
+
+
+class RequestHooks(object):
+    """
+    Base class of request hooks, called by the API clients around each request attempt with a `RequestEvent`.
+    Hooks are called in the thread, or the event loop, sending the request and must not block.
+    """
+
+    def before_request(self, event):
+        """
+        Called before a request attempt is sent, once the client rate limiter let it through
+        :param event: RequestEvent: the request, `attempt` is 0 for the first attempt, with `queue_wait` set
+        """
+
+    def after_response(self, event):
+        """
+        Called once a response is received, whatever its status code
+        :param event: RequestEvent: the request, with `status_code`, `bytes_in` and `elapsed` set
+        """
+
+    def on_error(self, event, exception):
+        """
+        Called when a request attempt fails without response (connection error, timeout...)
+        :param event: RequestEvent: the request, with `elapsed` set
+        :param exception: Exception: the error
+        """
+
+
+class EndpointMetrics(object):
+    """
+    Metrics of the requests sent to an endpoint with a method
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.latency_sum = 0.0
+        self.queue_wait_sum = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.status_codes = collections.Counter()
+
+    def observe(self, elapsed):
+        self.count += 1
+        self.latency_sum += elapsed
+        self.bucket_counts[bisect.bisect_left(self.buckets, elapsed)] += 1
+
+    def percentile(self, ratio):
+        """
+        Estimate a latency percentile from the histogram, interpolating inside buckets like Prometheus does
+        :param ratio: float: percentile, between 0 and 1
+        :return: float: latency in seconds, or None if there is no request
+        """
+        if not self.count:
+            return None
+        rank = ratio * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.bucket_counts):
+            if bucket_count and seen + bucket_count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+
+class MetricsCollector(RequestHooks):
+    """
+    Request hook collecting latency histograms, sizes, retries and status codes per method and endpoint.
+    A collector can be shared by several API clients, synchronous or asyncio ones.
+
+    >>> from pyghost.api_client import RequestEvent
+    >>> metrics = MetricsCollector()
+    >>> for elapsed in (0.02, 0.04, 0.2):
+    ...     event = RequestEvent('GET', '/apps/{id}', 'https://cloud-deploy/apps/1')
+    ...     metrics.before_request(event)
+    ...     event.status_code, event.bytes_in, event.elapsed = 200, 1000, elapsed
+    ...     metrics.after_response(event)
+    >>> stats = metrics.stats()['GET /apps/{id}']
+    >>> stats['count'], stats['bytes_in'], stats['status_codes']
+    (3, 3000, {200: 3})
+    >>> round(stats['p50'], 3), round(stats['p99'], 3)
+    (0.038, 0.245)
+    >>> print(metrics.to_prometheus().splitlines()[2])
+    pyghost_requests_total{method="GET",endpoint="/apps/{id}",status="200"} 3
+    """
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS, prefix=DEFAULT_METRICS_PREFIX):
+        """
+        :param buckets: tuple: latency histogram buckets upper bounds, in seconds
+        :param prefix: str: Prometheus metrics names prefix
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def _get_endpoint(self, event):
+        key = (event.method, event.endpoint)
+        metrics = self._endpoints.get(key)
+        if metrics is None:
+            metrics = self._endpoints[key] = EndpointMetrics(self.buckets)
+        return metrics
+
+    def before_request(self, event):
+        with self._lock:
+            metrics = self._get_endpoint(event)
+            metrics.bytes_out += event.bytes_out
+            metrics.queue_wait_sum += event.queue_wait
+            if event.attempt:
+                metrics.retries += 1
+
+    def after_response(self, event):
+        with self._lock:
+            metrics = self._get_endpoint(event)
+            metrics.observe(event.elapsed)
+            metrics.bytes_in += event.bytes_in
+            metrics.status_codes[event.status_code] += 1
+
+    def on_error(self, event, exception):
+        with self._lock:
+            metrics = self._get_endpoint(event)
+            metrics.observe(event.elapsed)
+            metrics.errors += 1
+
+    def reset(self):
+        """
+        Drop all the collected metrics
+        """
+        with self._lock:
+            self._endpoints.clear()
+
+    def stats(self):
+        """
+        Return the collected metrics, keyed by 'METHOD endpoint', latencies are in seconds
+        :return: dict:
+        """
+        with self._lock:
+            return {
+                '{} {}'.format(method, endpoint): {
+                    'count': metrics.count,
+                    'errors': metrics.errors,
+                    'retries': metrics.retries,
+                    'bytes_in': metrics.bytes_in,
+                    'bytes_out': metrics.bytes_out,
+                    'status_codes': dict(metrics.status_codes),
+                    'latency_sum': metrics.latency_sum,
+                    'queue_wait_sum': metrics.queue_wait_sum,
+                    'p50': metrics.percentile(0.5),
+                    'p95': metrics.percentile(0.95),
+                    'p99': metrics.percentile(0.99),
+                }
+                for (method, endpoint), metrics in sorted(self._endpoints.items())
+            }
+
+    def to_prometheus(self):
+        """
+        Export the collected metrics in Prometheus text exposition format
+        :return: str:
+        """
+        prefix = self.prefix
+        requests = ['# HELP {}_requests_total Responses received, by status code.'.format(prefix),
+                    '# TYPE {}_requests_total counter'.format(prefix)]
+        errors = ['# HELP {}_request_errors_total Requests failed without response.'.format(prefix),
+                  '# TYPE {}_request_errors_total counter'.format(prefix)]
+        retries = ['# HELP {}_request_retries_total Retried requests.'.format(prefix),
+                   '# TYPE {}_request_retries_total counter'.format(prefix)]
+        bytes_out = ['# HELP {}_request_bytes_total Request bodies size.'.format(prefix),
+                     '# TYPE {}_request_bytes_total counter'.format(prefix)]
+        bytes_in = ['# HELP {}_response_bytes_total Response bodies size.'.format(prefix),
+                    '# TYPE {}_response_bytes_total counter'.format(prefix)]
+        queue_wait = ['# HELP {}_request_queue_wait_seconds_total Time spent waiting for the client rate limiter.'
+                      .format(prefix),
+                      '# TYPE {}_request_queue_wait_seconds_total counter'.format(prefix)]
+        latency = ['# HELP {}_request_duration_seconds Request latency, client queue wait excluded.'.format(prefix),
+                   '# TYPE {}_request_duration_seconds histogram'.format(prefix)]
+        with self._lock:
+            for (method, endpoint), metrics in sorted(self._endpoints.items()):
+                labels = 'method="{}",endpoint="{}"'.format(method, _escape_label(endpoint))
+                for status_code, count in sorted(metrics.status_codes.items()):
+                    requests.append('{}_requests_total{{{},status="{}"}} {}'.format(prefix, labels, status_code, count))
+                errors.append('{}_request_errors_total{{{}}} {}'.format(prefix, labels, metrics.errors))
+                retries.append('{}_request_retries_total{{{}}} {}'.format(prefix, labels, metrics.retries))
+                bytes_out.append('{}_request_bytes_total{{{}}} {}'.format(prefix, labels, metrics.bytes_out))
+                bytes_in.append('{}_response_bytes_total{{{}}} {}'.format(prefix, labels, metrics.bytes_in))
+                queue_wait.append('{}_request_queue_wait_seconds_total{{{}}} {}'.format(
+                    prefix, labels, metrics.queue_wait_sum))
+                cumulative = 0
+                for bucket, bucket_count in zip(self.buckets + ('+Inf',), metrics.bucket_counts):
+                    cumulative += bucket_count
+                    latency.append('{}_request_duration_seconds_bucket{{{},le="{}"}} {}'.format(
+                        prefix, labels, bucket, cumulative))
+                latency.append('{}_request_duration_seconds_sum{{{}}} {}'.format(prefix, labels, metrics.latency_sum))
+                latency.append('{}_request_duration_seconds_count{{{}}} {}'.format(prefix, labels, metrics.count))
+        return '\n'.join(requests + errors + retries + bytes_out + bytes_in + queue_wait + latency) + '\n'
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class OpenTelemetryHooks(RequestHooks):
+    """
+    Request hook recording each request attempt as an OpenTelemetry client span.
+    Requires the `opentelemetry-api` package, spans are exported by the SDK configured by the application.
+    """
+
+    def __init__(self, tracer=None):
+        """
+        :param tracer: opentelemetry.trace.Tracer: defaults to the `pyghost` tracer of the global tracer provider
+        """
+        if trace is None:
+            raise ApiClientException('The `opentelemetry-api` package is required by `OpenTelemetryHooks`')
+        self.tracer = tracer or trace.get_tracer('pyghost')
+
+    def before_request(self, event):
+        event.context['span'] = self.tracer.start_span(
+            '{} {}'.format(event.method, event.endpoint), kind=trace.SpanKind.CLIENT,
+            attributes={'http.method': event.method, 'http.url': event.url, 'http.route': event.endpoint,
+                        'http.resend_count': event.attempt, 'http.request_content_length': event.bytes_out,
+                        'pyghost.queue_wait': event.queue_wait})
+
+    def after_response(self, event):
+        span = event.context.pop('span', None)
+        if span is None:
+            return
+        span.set_attribute('http.status_code', event.status_code)
+        span.set_attribute('http.response_content_length', event.bytes_in)
+        if event.status_code >= 400:
+            span.set_status(trace.Status(trace.StatusCode.ERROR))
+        span.end()
+
+    def on_error(self, event, exception):
+        span = event.context.pop('span', None)
+        if span is None:
+            return
+        span.record_exception(exception)
+        span.set_status(trace.Status(trace.StatusCode.ERROR, str(exception)))
+        span.end()
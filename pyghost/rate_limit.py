@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter(object):
+    """
+    Token bucket rate limiter combined with a maximum number of in-flight requests.
+    It can be used from threads (`with limiter:`) and from asyncio tasks (`async with limiter:`), even at the same
+    time. An unconfigured limiter does not limit anything but still measures the requests.
+
+    >>> limiter = RateLimiter(max_in_flight=2)
+    >>> with limiter:
+    ...     limiter.stats()['in_flight']
+    1
+    >>> limiter.try_acquire(), limiter.try_acquire(), limiter.try_acquire()
+    (True, True, False)
+    >>> limiter.release(); limiter.release()
+    >>> stats = limiter.stats()
+    >>> stats['acquired'], stats['in_flight']
+    (3, 0)
+    >>> limiter = RateLimiter(rate=1, burst=2)
+    >>> limiter.try_acquire(), limiter.try_acquire(), limiter.try_acquire()
+    (True, True, False)
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        """
+        :param rate: float: number of requests allowed per second, unlimited if not set
+        :param burst: int: number of requests allowed at once after an idle period, defaults to one second of `rate`
+        :param max_in_flight: int: maximum number of simultaneous requests, unlimited if not set
+        """
+        self._cond = threading.Condition(threading.Lock())
+        self._async_waiters = []
+        self._in_flight = 0
+        self.acquired = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.configure(rate, burst, max_in_flight)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def configure(self, rate=None, burst=None, max_in_flight=None):
+        """
+        Change the limits, requests already in flight are kept
+        :param rate: float: number of requests allowed per second, unlimited if not set
+        :param burst: int: number of requests allowed at once after an idle period, defaults to one second of `rate`
+        :param max_in_flight: int: maximum number of simultaneous requests, unlimited if not set
+        """
+        with self._cond:
+            self.rate = rate
+            self.burst = burst or max(rate or 0, 1)
+            self.max_in_flight = max_in_flight
+            self._tokens = self.burst
+            self._refilled_at = time.monotonic()
+            self._wake_up()
+
+    def _reserve(self):
+        """
+        Take a token and an in-flight slot if both are available, must be called with the lock held
+        :return: float: 0 once reserved, else the delay before a token is available, or None to wait for a release
+        """
+        if self.max_in_flight is not None and self._in_flight >= self.max_in_flight:
+            return None
+        if self.rate:
+            now = time.monotonic()
+            self._tokens = min(self._tokens + (now - self._refilled_at) * self.rate, self.burst)
+            self._refilled_at = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        self._in_flight += 1
+        self.acquired += 1
+        return 0
+
+    def _record_wait(self, started_at):
+        wait = time.monotonic() - started_at
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def _wake_up(self):
+        self._cond.notify_all()
+        for loop, future in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(_set_future_result, future)
+            except RuntimeError:  # The waiting loop has been closed meanwhile
+                pass
+        self._async_waiters = []
+
+    def try_acquire(self):
+        """
+        Reserve a request without waiting
+        :return: bool: true if reserved, `release` must then be called once the request is done
+        """
+        with self._cond:
+            return self._reserve() == 0
+
+    def acquire(self):
+        """
+        Wait until a request can be sent, `release` must be called once it is done
+        """
+        started_at = time.monotonic()
+        with self._cond:
+            self.waiting += 1
+            try:
+                delay = self._reserve()
+                while delay != 0:
+                    self._cond.wait(delay)
+                    delay = self._reserve()
+                self._record_wait(started_at)
+            finally:
+                self.waiting -= 1
+
+    async def acquire_async(self):
+        """
+        asyncio version of `acquire`, the event loop is not blocked while waiting
+        """
+        loop = asyncio.get_event_loop()
+        started_at = time.monotonic()
+        with self._cond:
+            self.waiting += 1
+        try:
+            while True:
+                with self._cond:
+                    delay = self._reserve()
+                    if delay == 0:
+                        self._record_wait(started_at)
+                        return
+                    future = loop.create_future()
+                    self._async_waiters.append((loop, future))
+                # Woken up by `release`, or once a token is available
+                await asyncio.wait([future], timeout=delay)
+        finally:
+            with self._cond:
+                self.waiting -= 1
+
+    def release(self):
+        """
+        Mark a request as done
+        """
+        with self._cond:
+            self._in_flight -= 1
+            self._wake_up()
+
+    def stats(self):
+        """
+        Return limiter counters, waits are in seconds
+        :return: dict:
+        """
+        with self._cond:
+            return {
+                'acquired': self.acquired,
+                'in_flight': self._in_flight,
+                'waiting': self.waiting,
+                'total_wait': self.total_wait,
+                'max_wait': self.max_wait,
+                'average_wait': self.total_wait / self.acquired if self.acquired else 0.0,
+            }
+
+
+def _set_future_result(future):
+    if not future.done():
+        future.set_result(None)
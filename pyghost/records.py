@@ -0,0 +1,336 @@
+import collections
+import collections.abc
+import sys
+from array import array
+from email.utils import parsedate_to_datetime
+
+from .api_client import JobCommands, JobStatuses
+
+_JOB_STATUSES = {status.value: status for status in JobStatuses}
+_JOB_COMMANDS = {command.value: command for command in JobCommands}
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _get_id(value):
+    # Reference fields are documents when embedded
+    if isinstance(value, dict):
+        value = value.get('_id')
+    return _intern(value)
+
+
+def parse_date(value):
+    """
+    Parse an Eve date
+    :param value: str: RFC 1123 date, as returned by Eve
+    :return: float: POSIX timestamp, or NaN if the date is missing or invalid
+
+    >>> parse_date('Mon, 01 Jan 2018 10:00:00 GMT')
+    1514800800.0
+    >>> parse_date(None)
+    nan
+    """
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, AttributeError):
+        return float('nan')
+
+
+class Record(object):
+    """
+    Compact, read-only view of an API document.
+    Only the listed `_fields` are kept as attributes, renamed without their leading underscore (`_id` becomes `id`).
+    Repeated strings are interned, other document keys are kept in `extra` when `keep_extra` is set.
+    """
+    __slots__ = ('extra',)
+    _fields = ()
+    _interned = ()
+    _references = ()
+
+    def __init__(self, **values):
+        self.extra = values.get('extra')
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(
+            '{}={!r}'.format(name, getattr(self, name)) for name in self.__slots__ if name != 'extra'))
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.extra == other.extra and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    @classmethod
+    def from_dict(cls, data, keep_extra=False):
+        """
+        Build a record from an API document
+        :param data: dict: the document
+        :param keep_extra: bool: keep the unknown keys of the document in `extra`
+        :return: Record:
+        """
+        record = cls.__new__(cls)
+        for key in cls._fields:
+            value = data.get(key)
+            if key in cls._references:
+                value = _get_id(value)
+            elif key in cls._interned:
+                value = _intern(value)
+            setattr(record, key.lstrip('_'), value)
+        record.extra = {key: value for key, value in data.items() if key not in cls._fields} if keep_extra else None
+        return record
+
+    def to_dict(self):
+        """
+        Convert the record back to an API document
+        :return: dict:
+        """
+        data = dict(self.extra or {})
+        for key in self._fields:
+            value = getattr(self, key.lstrip('_'))
+            if value is not None:
+                data[key] = value.value if isinstance(value, (JobStatuses, JobCommands)) else value
+        return data
+
+
+class App(Record):
+    """
+    Application record
+
+    >>> app = App.from_dict({'_id': 'a1', 'name': 'front', 'env': 'prod', 'role': 'web', 'modules': []})
+    >>> app.name, app.env, app.extra
+    ('front', 'prod', None)
+    """
+    __slots__ = ('id', 'name', 'env', 'role', 'etag', 'created', 'updated')
+    _fields = ('_id', 'name', 'env', 'role', '_etag', '_created', '_updated')
+    _interned = ('name', 'env', 'role')
+
+
+class Deployment(Record):
+    """
+    Deployment record, embedded application and job are replaced by their ids
+    """
+    __slots__ = ('id', 'app_id', 'job_id', 'module', 'revision', 'commit', 'timestamp', 'etag', 'created', 'updated')
+    _fields = ('_id', 'app_id', 'job_id', 'module', 'revision', 'commit', 'timestamp', '_etag', '_created',
+               '_updated')
+    _interned = ('module', 'revision')
+    _references = ('app_id', 'job_id')
+
+
+class Job(Record):
+    """
+    Job record, `status` and `command` are `JobStatuses` and `JobCommands` members when known.
+    An embedded application is replaced by its id.
+
+    >>> job = Job.from_dict({'_id': 'j1', 'command': 'deploy', 'status': 'done', 'app_id': {'_id': 'a1'}})
+    >>> job.status, job.command, job.app_id
+    (<JobStatuses.DONE: 'done'>, <JobCommands.DEPLOY: 'deploy'>, 'a1')
+    >>> job.to_dict() == {'_id': 'j1', 'command': 'deploy', 'status': 'done', 'app_id': 'a1'}
+    True
+    """
+    __slots__ = ('id', 'command', 'status', 'user', 'app_id', 'message', 'etag', 'created', 'updated')
+    _fields = ('_id', 'command', 'status', 'user', 'app_id', 'message', '_etag', '_created', '_updated')
+    _interned = ('user',)
+    _references = ('app_id',)
+
+    @classmethod
+    def from_dict(cls, data, keep_extra=False):
+        record = super().from_dict(data, keep_extra)
+        record.status = _JOB_STATUSES.get(record.status, _intern(record.status))
+        record.command = _JOB_COMMANDS.get(record.command, _intern(record.command))
+        return record
+
+
+class _Categories(object):
+    """
+    Distinct values of a column, each value is stored once and referenced by its code
+    """
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class JobTable(object):
+    """
+    Columnar storage of many jobs, for reporting.
+    Status, command, application and user are stored as integer codes, dates as POSIX timestamps, so that large
+    job sets can be filtered and grouped without keeping the documents.
+
+    >>> table = JobTable.from_jobs([
+    ...     {'_id': 'j1', 'command': 'deploy', 'status': 'done', 'app_id': 'a1',
+    ...      '_created': 'Mon, 01 Jan 2018 10:00:00 GMT'},
+    ...     {'_id': 'j2', 'command': 'deploy', 'status': 'failed', 'app_id': 'a2',
+    ...      '_created': 'Mon, 01 Jan 2018 11:30:00 GMT'},
+    ...     {'_id': 'j3', 'command': 'buildimage', 'status': 'done', 'app_id': 'a1',
+    ...      '_created': 'Tue, 02 Jan 2018 09:00:00 GMT'},
+    ... ])
+    >>> len(table), table.filter(status='done', app_id='a1').ids
+    (3, ['j1', 'j3'])
+    >>> sorted(table.count_by('command').items())
+    [(('buildimage',), 1), (('deploy',), 2)]
+    >>> sorted(table.count_by('status', 'created', interval=86400).items())
+    [(('done', 1514764800), 1), (('done', 1514851200), 1), (('failed', 1514764800), 1)]
+    >>> table[1].status
+    <JobStatuses.FAILED: 'failed'>
+    """
+    CATEGORY_COLUMNS = ('status', 'command', 'app_id', 'user')
+    DATE_COLUMNS = ('created', 'updated')
+
+    def __init__(self):
+        self.ids = []
+        self._categories = {column: _Categories() for column in self.CATEGORY_COLUMNS}
+        self._codes = {column: array('I') for column in self.CATEGORY_COLUMNS}
+        self._dates = {column: array('d') for column in self.DATE_COLUMNS}
+
+    @classmethod
+    def from_jobs(cls, jobs):
+        """
+        Build a table
+        :param jobs: iterable: job documents or `Job` records, such as `JobsApiClient.iter_all()`
+        :return: JobTable:
+        """
+        table = cls()
+        table.extend(jobs)
+        return table
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        """
+        :param index: int: row number
+        :return: Job: the job, with the table columns only and dates as POSIX timestamps
+        """
+        values = {column: self.column(column, index) for column in self.CATEGORY_COLUMNS + self.DATE_COLUMNS}
+        return Job(id=self.ids[index], **values)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, job):
+        """
+        Add a job
+        :param job: dict|Job: job document or record
+        """
+        if isinstance(job, dict):
+            job = Job.from_dict(job)
+        self.ids.append(job.id)
+        for column in self.CATEGORY_COLUMNS:
+            self._codes[column].append(self._categories[column].encode(getattr(job, column)))
+        self._dates['created'].append(parse_date(job.created))
+        self._dates['updated'].append(parse_date(job.updated))
+
+    def extend(self, jobs):
+        """
+        Add jobs
+        :param jobs: iterable: job documents or records
+        """
+        for job in jobs:
+            self.append(job)
+
+    def column(self, name, index=None):
+        """
+        Return a column, or one of its values
+        :param name: str: column name, one of CATEGORY_COLUMNS, DATE_COLUMNS or 'id'
+        :param index: int: row number, the whole column if not set
+        :return: list|object:
+        """
+        if name == 'id':
+            return self.ids if index is None else self.ids[index]
+        if name in self._dates:
+            return self._dates[name] if index is None else self._dates[name][index]
+        values = self._categories[name].values
+        if index is None:
+            return [values[code] for code in self._codes[name]]
+        return values[self._codes[name][index]]
+
+    def _take(self, indexes):
+        table = type(self).__new__(type(self))
+        table.ids = [self.ids[i] for i in indexes]
+        table._categories = self._categories
+        table._codes = {column: array('I', (codes[i] for i in indexes)) for column, codes in self._codes.items()}
+        table._dates = {column: array('d', (dates[i] for i in indexes)) for column, dates in self._dates.items()}
+        return table
+
+    def _get_codes(self, column, values):
+        if isinstance(values, (str, JobStatuses, JobCommands)) or not isinstance(values, collections.abc.Iterable):
+            values = (values,)
+        codes = self._categories[column].codes
+        result = set()
+        for value in values:
+            if isinstance(value, str) and column == 'status':
+                value = _JOB_STATUSES.get(value, value)
+            elif isinstance(value, str) and column == 'command':
+                value = _JOB_COMMANDS.get(value, value)
+            if value in codes:
+                result.add(codes[value])
+        return result
+
+    def filter(self, status=None, command=None, app_id=None, user=None, since=None, until=None):
+        """
+        Return the jobs matching all the given filters
+        :param status: str|JobStatuses|list: job status, or any of several statuses
+        :param command: str|JobCommands|list: job command, or any of several commands
+        :param app_id: str|list: application id, or any of several ids
+        :param user: str|list: job user, or any of several users
+        :param since: float: minimum creation POSIX timestamp, included
+        :param until: float: maximum creation POSIX timestamp, excluded
+        :return: JobTable:
+        """
+        indexes = range(len(self))
+        for column, values in (('status', status), ('command', command), ('app_id', app_id), ('user', user)):
+            if values is not None:
+                codes = self._get_codes(column, values)
+                column_codes = self._codes[column]
+                indexes = [i for i in indexes if column_codes[i] in codes]
+        if since is not None or until is not None:
+            created = self._dates['created']
+            since = float('-inf') if since is None else since
+            until = float('inf') if until is None else until
+            indexes = [i for i in indexes if since <= created[i] < until]
+        return self._take(indexes)
+
+    def _get_keys(self, columns, interval):
+        keys = []
+        for column in columns:
+            if column in self._dates:
+                if interval is None:
+                    raise ValueError('An interval is required to group by {}'.format(column))
+                keys.append([None if date != date else int(date // interval * interval)
+                             for date in self._dates[column]])
+            else:
+                keys.append(self.column(column))
+        return zip(*keys)
+
+    def group_by(self, *columns, interval=None):
+        """
+        Split the table by the values of some columns
+        :param columns: str: column names, dates are grouped by `interval`
+        :param interval: int: date buckets size, in seconds
+        :return: dict: tables, keyed by tuples of column values
+        """
+        groups = collections.defaultdict(list)
+        for index, key in enumerate(self._get_keys(columns, interval)):
+            groups[key].append(index)
+        return {key: self._take(indexes) for key, indexes in groups.items()}
+
+    def count_by(self, *columns, interval=None):
+        """
+        Count the jobs by the values of some columns
+        :param columns: str: column names, dates are grouped by `interval`
+        :param interval: int: date buckets size, in seconds
+        :return: collections.Counter: counts, keyed by tuples of column values, statuses and commands as strings
+        """
+        counts = collections.Counter(self._get_keys(columns, interval))
+        return collections.Counter({tuple(str(value) if isinstance(value, (JobStatuses, JobCommands)) else value
+                                          for value in key): count for key, count in counts.items()})
@@ -0,0 +1,378 @@
+import collections
+import time
+
+from .api_client import (DEFAULT_WAIT_INTERVAL, FINISHED_JOB_STATUSES, WAIT_FIRST_COMPLETED, ApiClientException,
+                         JobSpecBuilder, JobStatuses)
+from .utils import Backoff
+
+# Scheduler states of the jobs which have no Cloud Deploy status
+SCHEDULED_PENDING = 'pending'
+SCHEDULED_SKIPPED = 'skipped'
+SCHEDULED_ERROR = 'error'
+
+
+class ScheduledJob(object):
+    """
+    A job of a `JobScheduler`, times are in seconds since the start of the run
+    """
+    __slots__ = ('name', 'spec', 'depends_on', 'env', 'role', 'wave', 'height', 'status', 'job_id', 'error',
+                 'ready_at', 'submitted_at', 'started_at', 'finished_at')
+
+    def __init__(self, name, spec, depends_on=(), env=None, role=None):
+        self.name = name
+        self.spec = spec
+        self.depends_on = tuple(depends_on)
+        self.env = env
+        self.role = role
+        self.wave = None
+        # Length of the longest chain of jobs starting with this one
+        self.height = None
+        self.status = SCHEDULED_PENDING
+        self.job_id = None
+        self.error = None
+        self.ready_at = None
+        self.submitted_at = None
+        self.started_at = None
+        self.finished_at = None
+
+    def __repr__(self):
+        return 'ScheduledJob(name={!r}, status={!r}, job_id={!r})'.format(self.name, self.status, self.job_id)
+
+    @property
+    def duration(self):
+        """
+        :return: float: seconds from submission to completion, None if the job is not finished
+        """
+        if self.submitted_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.submitted_at
+
+
+class ScheduleReport(object):
+    """
+    Outcome and timings of a `JobScheduler` run
+    """
+
+    def __init__(self, jobs, waves, elapsed, dry_run=False, timed_out=False):
+        """
+        :param jobs: OrderedDict: `ScheduledJob` by name
+        :param waves: list: lists of job names, each wave only depends on the previous ones
+        :param elapsed: float: wall-clock duration of the run, in seconds
+        :param dry_run: bool: nothing was sent
+        :param timed_out: bool: the run stopped before all its jobs were finished
+        """
+        self.jobs = jobs
+        self.waves = waves
+        self.elapsed = elapsed
+        self.dry_run = dry_run
+        self.timed_out = timed_out
+
+    @property
+    def ok(self):
+        """
+        :return: bool: true if all the jobs are done
+        """
+        return all(job.status == JobStatuses.DONE.value for job in self.jobs.values())
+
+    @property
+    def failed(self):
+        """
+        :return: list: names of the jobs which could not be submitted or did not succeed
+        """
+        return [name for name, job in self.jobs.items() if job.status == SCHEDULED_ERROR or (
+            job.status in FINISHED_JOB_STATUSES and job.status != JobStatuses.DONE.value)]
+
+    @property
+    def skipped(self):
+        """
+        :return: list: names of the jobs which were not submitted because of a failure or a timeout
+        """
+        return [name for name, job in self.jobs.items() if job.status == SCHEDULED_SKIPPED]
+
+    @property
+    def total_job_time(self):
+        """
+        :return: float: sum of the finished jobs durations, the wall-clock time of a sequential run
+        """
+        return sum(job.duration for job in self.jobs.values() if job.duration is not None)
+
+    @property
+    def critical_path(self):
+        """
+        Chain of jobs which determined the run duration: the last finished job, then the dependency it waited for
+        last, and so on. For a dry run, the longest chain of dependencies.
+        :return: list: job names, first to run first
+        """
+        if self.dry_run:
+            candidates = list(self.jobs.values())
+            path = []
+            while candidates:
+                job = max(candidates, key=lambda candidate: candidate.height)
+                path.append(job.name)
+                candidates = [candidate for candidate in self.jobs.values() if job.name in candidate.depends_on]
+            return path
+        finished = [job for job in self.jobs.values() if job.finished_at is not None]
+        path = []
+        while finished:
+            job = max(finished, key=lambda candidate: candidate.finished_at)
+            path.append(job.name)
+            finished = [self.jobs[name] for name in job.depends_on if self.jobs[name].finished_at is not None]
+        return path[::-1]
+
+    def format(self):
+        """
+        Format the report as a text table
+        :return: str:
+        """
+        def seconds(value):
+            return '-' if value is None else '{:.1f}'.format(value)
+
+        lines = ['{:<24} {:>4} {:<10} {:<24} {:>8} {:>8} {:>8}'.format(
+            'NAME', 'WAVE', 'STATUS', 'JOB', 'QUEUED', 'START', 'DURATION')]
+        for job in self.jobs.values():
+            queued = None
+            if job.ready_at is not None and job.submitted_at is not None:
+                queued = job.submitted_at - job.ready_at
+            lines.append('{:<24} {:>4} {:<10} {:<24} {:>8} {:>8} {:>8}'.format(
+                job.name, job.wave, job.status, job.job_id or '-', seconds(queued), seconds(job.submitted_at),
+                seconds(job.duration)))
+        lines.append('Elapsed: {:.1f}s, total job time: {:.1f}s, critical path: {}'.format(
+            self.elapsed, self.total_job_time, ' > '.join(self.critical_path)))
+        return '\n'.join(lines)
+
+
+class JobScheduler(object):
+    """
+    Runs a graph of jobs, each job being submitted as soon as all the jobs it depends on are done.
+    Ready jobs are submitted together, with `JobsApiClient.submit_many`, those heading the longest chains first,
+    within the concurrency limits. Running jobs are followed with `JobsApiClient.wait_for_jobs`.
+    A job which does not succeed (failed, aborted or cancelled) stops the run: no other job is submitted, the
+    running ones are waited for and the remaining ones are skipped.
+
+    >>> scheduler = JobScheduler(None)
+    >>> _ = scheduler.add('build', {'command': 'buildimage', 'application_id': 'a1'})
+    >>> _ = scheduler.add('deploy', {'command': 'deploy', 'application_id': 'a1', 'modules': []},
+    ...                   depends_on=['build'])
+    >>> _ = scheduler.add('swap', {'command': 'swapbluegreen', 'application_id': 'a1'}, depends_on=['deploy'])
+    >>> _ = scheduler.add('worker', {'command': 'redeploy', 'application_id': 'a2', 'deployment_id': 'd1'})
+    >>> scheduler.waves()
+    [['build', 'worker'], ['deploy'], ['swap']]
+    >>> report = scheduler.run(dry_run=True)
+    >>> report.critical_path, report.skipped
+    (['build', 'deploy', 'swap'], [])
+    >>> _ = scheduler.add('loop', {'command': 'buildimage', 'application_id': 'a3'}, depends_on=['loop'])
+    >>> scheduler.waves()
+    Traceback (most recent call last):
+    ...
+    pyghost.api_client.ApiClientException: Job dependencies cycle between: loop
+    >>> from pyghost.api_client import JobsApiClient, JobSubmission
+    >>> class StubJobsApi(JobsApiClient):
+    ...     '''Jobs j1 and j2, whose statuses change at each status check'''
+    ...     checks = [{'j1': 'started', 'j2': 'init'}, {'j1': 'done', 'j2': 'init'}, {'j2': 'started'}, {'j2': 'done'}]
+    ...     def submit_many(self, specs, **kwargs):
+    ...         return [JobSubmission('j{}'.format(i), None) for i in range(1, len(specs) + 1)]
+    ...     def _fetch_statuses(self, job_ids):
+    ...         statuses = self.checks.pop(0)
+    ...         return [{'_id': job_id, 'status': statuses[job_id]} for job_id in job_ids]
+    >>> scheduler = JobScheduler(StubJobsApi('localhost', 'user', 'pass'), backoff=Backoff(initial=0, jitter=0))
+    >>> _ = scheduler.add('build', {'command': 'buildimage', 'application_id': 'a1'})
+    >>> _ = scheduler.add('worker', {'command': 'buildimage', 'application_id': 'a2'})
+    >>> report = scheduler.run(status_handler=lambda *args: print(*args))
+    build init started
+    build started done
+    worker init started
+    worker started done
+    >>> report.ok, [job.started_at is not None for job in report.jobs.values()]
+    (True, [True, True])
+    """
+
+    def __init__(self, jobs_api, apps_api=None, limits=None, max_in_flight=None, backoff=None):
+        """
+        :param jobs_api: JobsApiClient instance
+        :param apps_api: AppsApiClient instance, used to fetch the env and role of the jobs applications when
+                         `limits` are set and `add` was not given them
+        :param limits: dict: maximum number of running jobs per env, such as {'prod': 2}, or per (env, role),
+                       such as {('prod', 'webfront'): 1}
+        :param max_in_flight: int: maximum number of running jobs, unlimited if not set
+        :param backoff: Backoff: delays between two job status checks, at most `DEFAULT_WAIT_INTERVAL` seconds
+                         if not set
+        """
+        self.jobs_api = jobs_api
+        self.apps_api = apps_api
+        self.limits = dict(limits or {})
+        self.max_in_flight = max_in_flight
+        self.backoff = backoff or Backoff(maximum=DEFAULT_WAIT_INTERVAL)
+        self.jobs = collections.OrderedDict()
+
+    def add(self, name, spec, depends_on=(), env=None, role=None):
+        """
+        Add a job to the graph
+        :param name: str: unique job name
+        :param spec: dict: command spec, see `JobSpecBuilder`
+        :param depends_on: list: names of the jobs which must be done before this one is submitted
+        :param env: str: env of the job application, for `limits`
+        :param role: str: role of the job application, for `limits`
+        :return: ScheduledJob:
+        """
+        if name in self.jobs:
+            raise ApiClientException('Job "{}" is already scheduled'.format(name))
+        job = self.jobs[name] = ScheduledJob(name, spec, depends_on, env, role)
+        return job
+
+    def waves(self):
+        """
+        Group the jobs in waves, each wave only depending on the previous ones
+        :return: list: lists of job names
+        """
+        for job in self.jobs.values():
+            unknown = [name for name in job.depends_on if name not in self.jobs]
+            if unknown:
+                raise ApiClientException('Job "{}" depends on unknown jobs: {}'.format(job.name, ', '.join(unknown)))
+        waves = []
+        placed = set()
+        remaining = list(self.jobs.values())
+        while remaining:
+            wave = [job for job in remaining if all(name in placed for name in job.depends_on)]
+            if not wave:
+                raise ApiClientException('Job dependencies cycle between: {}'.format(
+                    ', '.join(job.name for job in remaining)))
+            for job in wave:
+                job.wave = len(waves)
+            waves.append([job.name for job in wave])
+            placed.update(job.name for job in wave)
+            remaining = [job for job in remaining if job.name not in placed]
+
+        for wave in reversed(waves):
+            for name in wave:
+                self.jobs[name].height = 1
+        for wave in reversed(waves):
+            for name in wave:
+                for parent in self.jobs[name].depends_on:
+                    self.jobs[parent].height = max(self.jobs[parent].height, self.jobs[name].height + 1)
+        return waves
+
+    def _resolve_apps(self):
+        """
+        Fetch the env and role of the jobs applications, with a single batched request
+        """
+        jobs = [job for job in self.jobs.values()
+                if (job.env is None or job.role is None) and job.spec.get('application_id')]
+        if not (self.limits and self.apps_api and jobs):
+            return
+        app_ids = [job.spec['application_id'] for job in jobs]
+        apps, _ = self.apps_api.retrieve_many(app_ids, fields=('env', 'role'))
+        for job, app in zip(jobs, apps):
+            if app is not None:
+                job.env = job.env or app.get('env')
+                job.role = job.role or app.get('role')
+
+    def _get_limit_keys(self, job):
+        return [key for key in (job.env, (job.env, job.role)) if key in self.limits]
+
+    def _select(self, ready, running):
+        """
+        Pick the ready jobs which can be submitted within the concurrency limits
+        :param ready: list: ready jobs
+        :param running: dict: running jobs, by job id
+        :return: list: jobs to submit
+        """
+        counts = collections.Counter()
+        for job in running.values():
+            counts.update(self._get_limit_keys(job))
+        in_flight = len(running)
+        selected = []
+        for job in sorted(ready, key=lambda candidate: -candidate.height):
+            if self.max_in_flight is not None and in_flight >= self.max_in_flight:
+                break
+            keys = self._get_limit_keys(job)
+            if any(counts[key] >= self.limits[key] for key in keys):
+                continue
+            counts.update(keys)
+            in_flight += 1
+            selected.append(job)
+        return selected
+
+    def run(self, dry_run=False, timeout=None, status_handler=None):
+        """
+        Run the jobs
+        :param dry_run: bool: only validate the graph and the job specs, nothing is sent
+        :param timeout: float: maximum number of seconds to wait, jobs still running are then left running
+        :param status_handler: function: status change callback, arguments: job name, old_status, new_status
+        :return: ScheduleReport:
+        """
+        waves = self.waves()
+        builder = JobSpecBuilder()
+        errors = []
+        for job in self.jobs.values():
+            try:
+                builder.build(job.spec)
+            except (ApiClientException, TypeError) as e:
+                errors.append('{}: {}'.format(job.name, e))
+        if errors:
+            raise ApiClientException('Invalid job specs, nothing was sent: {}'.format(', '.join(errors)))
+        if dry_run:
+            return ScheduleReport(self.jobs, waves, 0.0, dry_run=True)
+        self._resolve_apps()
+
+        started_at = time.monotonic()
+        deadline = started_at + timeout if timeout is not None else None
+        running = {}
+        stopped = timed_out = False
+
+        def handle_status(job_id, old_status, new_status):
+            job = running[job_id]
+            job.status = new_status
+            # Jobs may go from init to finished between two status checks
+            if job.started_at is None and new_status != JobStatuses.INIT.value:
+                job.started_at = time.monotonic() - started_at
+            if status_handler:
+                status_handler(job.name, old_status, new_status)
+
+        while True:
+            if not stopped:
+                ready = [job for job in self.jobs.values() if job.status == SCHEDULED_PENDING and all(
+                    self.jobs[name].status == JobStatuses.DONE.value for name in job.depends_on)]
+                now = time.monotonic() - started_at
+                for job in ready:
+                    if job.ready_at is None:
+                        job.ready_at = now
+                selected = self._select(ready, running)
+                if selected:
+                    submissions = self.jobs_api.submit_many([job.spec for job in selected])
+                    now = time.monotonic() - started_at
+                    for job, submission in zip(selected, submissions):
+                        job.submitted_at = now
+                        if submission.error is not None:
+                            job.status, job.error, job.finished_at = SCHEDULED_ERROR, submission.error, now
+                            stopped = True
+                        else:
+                            job.status, job.job_id = JobStatuses.INIT.value, submission.job_id
+                            running[job.job_id] = job
+            if not running:
+                break
+
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+            # Statuses changing between two waits are notified from the ones known so far
+            known = {job_id: job.status for job_id, job in running.items()}
+            states = self.jobs_api.wait_for_jobs(list(running), timeout=remaining, return_when=WAIT_FIRST_COMPLETED,
+                                                 status_handler=handle_status, backoff=self.backoff,
+                                                 initial_statuses=known)
+            now = time.monotonic() - started_at
+            for job_id, state in states.items():
+                job = running[job_id]
+                job.status = state['status']
+                if job.status in FINISHED_JOB_STATUSES:
+                    job.finished_at = now
+                    del running[job_id]
+                    if job.status != JobStatuses.DONE.value:
+                        stopped = True
+
+        for job in self.jobs.values():
+            if job.status == SCHEDULED_PENDING:
+                job.status = SCHEDULED_SKIPPED
+        return ScheduleReport(self.jobs, waves, time.monotonic() - started_at, timed_out=timed_out)
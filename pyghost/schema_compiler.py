@@ -0,0 +1,230 @@
+from schema import (And, Optional, Or, Regex, Schema, SchemaError, SchemaMissingKeyError, SchemaUnexpectedTypeError,
+                    SchemaWrongKeyError)
+
+ITERABLE_TYPES = (list, tuple, set, frozenset)
+COMPARABLE_TYPES = (str, bytes, int, float, type(None))
+
+
+class CompiledSchema(object):
+    """
+    A `schema.Schema` compiled once into plain validation closures.
+    Gives the same results and error messages as the original schema, without walking the spec on every call.
+    Unsupported constructs (`Use`, `Hook`, multi-choice `Or`, custom errors...) are delegated to `schema`.
+    Compiling reads some private attributes of the `schema` classes: if a release does not have them anymore, the
+    whole schema is delegated to `schema` rather than breaking at import time.
+
+    >>> compiled = compile_schema(Schema({'name': And(str, Regex(r'^[a-z]+$')), Optional('size', default=20): int}))
+    >>> compiled.validate({'name': 'front'}) == {'name': 'front', 'size': 20}
+    True
+    >>> compiled.validate({'name': 'Front'})
+    Traceback (most recent call last):
+    ...
+    schema.SchemaError: Key 'name' error:
+    'Front' does not match '^[a-z]+$'
+    >>> compiled.is_valid({'name': 'front', 'size': True})
+    False
+    """
+
+    def __init__(self, schema):
+        """
+        :param schema: Schema|object: schema or spec to compile
+        """
+        self.schema = schema
+        try:
+            self._validate = _compile(schema)
+        except AttributeError:
+            self._validate = Schema(schema).validate
+
+    def validate(self, data):
+        """
+        Validate data
+        :param data: data to validate
+        :return: validated data, with defaults applied
+        :raises SchemaError: if the data is invalid
+        """
+        return self._validate(data)
+
+    def is_valid(self, data):
+        """
+        :param data: data to validate
+        :return: bool: true if the data is valid
+        """
+        try:
+            self._validate(data)
+        except SchemaError:
+            return False
+        return True
+
+
+def compile_schema(schema):
+    """
+    Compile a schema, see `CompiledSchema`
+    :param schema: Schema|object: schema or spec to compile
+    :return: CompiledSchema:
+    """
+    return CompiledSchema(schema)
+
+
+def _is_comparable(spec):
+    return isinstance(spec, COMPARABLE_TYPES)
+
+
+def _compile(spec):
+    if type(spec) is Schema:
+        if spec._error or spec._ignore_extra_keys or spec.name:
+            return Schema(spec).validate
+        spec = spec.schema
+    if type(spec) in ITERABLE_TYPES:
+        return _compile_iterable(spec)
+    if isinstance(spec, dict):
+        return _compile_dict(spec)
+    if issubclass(type(spec), type):
+        return _compile_type(spec)
+    if type(spec) is And and not spec._error:
+        return _compile_and(spec)
+    if type(spec) is Regex and not spec._error:
+        return _compile_regex(spec)
+    if hasattr(spec, 'validate'):
+        return Schema(spec).validate
+    if callable(spec):
+        return _compile_callable(spec)
+    if _is_comparable(spec):
+        return _compile_comparable(spec)
+    return Schema(spec).validate
+
+
+def _compile_type(kind):
+    if kind is object:
+        return lambda data: data
+    excludes_bool = kind is int
+
+    def validate(data):
+        if isinstance(data, kind) and not (excludes_bool and isinstance(data, bool)):
+            return data
+        raise SchemaUnexpectedTypeError('{!r} should be instance of {!r}'.format(data, kind.__name__), None)
+    return validate
+
+
+def _compile_and(spec):
+    validators = tuple(_compile(arg) for arg in spec.args)
+
+    def validate(data):
+        for validator in validators:
+            data = validator(data)
+        return data
+    return validate
+
+
+def _compile_regex(spec):
+    pattern = spec._pattern
+    pattern_str = spec.pattern_str
+
+    def validate(data):
+        try:
+            if pattern.search(data):
+                return data
+        except TypeError:
+            raise SchemaError('{!r} is not string nor buffer'.format(data))
+        raise SchemaError('{!r} does not match {!r}'.format(data, pattern_str))
+    return validate
+
+
+def _compile_callable(spec):
+    name = getattr(spec, '__name__', str(spec))
+
+    def validate(data):
+        try:
+            valid = spec(data)
+        except SchemaError as x:
+            raise SchemaError([None] + x.autos, [None] + x.errors)
+        except BaseException as x:
+            raise SchemaError('{}({!r}) raised {!r}'.format(name, data, x))
+        if valid:
+            return data
+        raise SchemaError('{}({!r}) should evaluate to True'.format(name, data))
+    return validate
+
+
+def _compile_comparable(spec):
+    def validate(data):
+        if spec == data:
+            return data
+        raise SchemaError('{!r} does not match {!r}'.format(spec, data))
+    return validate
+
+
+def _compile_iterable(spec):
+    if len(spec) != 1:
+        return Schema(spec).validate
+    validate_type = _compile_type(type(spec))
+    validate_item = _compile(next(iter(spec)))
+    # Same wording as the `Or` built by `schema` for each item
+    or_repr = repr(Or(*spec))
+
+    def validate(data):
+        data = validate_type(data)
+        items = []
+        for item in data:
+            try:
+                items.append(validate_item(item))
+            except SchemaError as x:
+                raise SchemaError(['{} did not validate {!r}'.format(or_repr, item)] + x.autos, [None] + x.errors)
+        return type(data)(items)
+    return validate
+
+
+def _compile_dict(spec):
+    validators = {}
+    required = set()
+    defaults = {}
+    for skey, svalue in spec.items():
+        if type(skey) is Optional and not skey._error and _is_comparable(skey.schema):
+            key = skey.schema
+            if hasattr(skey, 'default'):
+                defaults[key] = (skey.key, skey.default)
+        elif _is_comparable(skey):
+            key = skey
+            required.add(key)
+        else:
+            return Schema(spec).validate
+        if key in validators:
+            return Schema(spec).validate
+        validators[key] = _compile(svalue)
+    validate_type = _compile_type(dict)
+
+    def validate_item(new, key, value):
+        validator = validators.get(key)
+        if validator is None:
+            return
+        try:
+            new[key] = validator(value)
+        except SchemaError as x:
+            raise SchemaError(["Key '{}' error:".format(key)] + x.autos, [None] + x.errors)
+
+    def validate(data):
+        data = validate_type(data)
+        new = type(data)()
+        # Like `schema`, dictionaries values are validated last
+        nested = []
+        for key, value in data.items():
+            if isinstance(value, dict):
+                nested.append((key, value))
+            else:
+                validate_item(new, key, value)
+        for key, value in nested:
+            validate_item(new, key, value)
+        if not required.issubset(new):
+            missing_keys = required.difference(new)
+            raise SchemaMissingKeyError('Missing key{}: {}'.format(
+                's' if len(missing_keys) > 1 else '',
+                ', '.join(repr(k) for k in sorted(missing_keys, key=repr))), None)
+        if len(new) != len(data):
+            wrong_keys = set(data.keys()) - set(new.keys())
+            raise SchemaWrongKeyError('Wrong key{} {} in {!r}'.format(
+                's' if len(wrong_keys) > 1 else '',
+                ', '.join(repr(k) for k in sorted(wrong_keys, key=repr)), data), None)
+        for key, (default_key, default) in defaults.items():
+            if key not in new:
+                new[default_key] = default() if callable(default) else default
+        return new
+    return validate
@@ -0,0 +1,112 @@
+import asyncio
+import copy
+import threading
+
+
+class _Call(object):
+    """
+    A call in flight and the number of callers waiting for it
+    """
+    __slots__ = ('done', 'task', 'result', 'exception', 'followers')
+
+    def __init__(self, task=None):
+        self.done = threading.Event() if task is None else None
+        self.task = task
+        self.result = None
+        self.exception = None
+        self.followers = 0
+
+
+class SingleFlight(object):
+    """
+    Coalesces identical concurrent calls: while a call is in flight, callers using the same key wait for it and
+    share its result, or its exception, instead of making their own call.
+    Followers get a deep copy of the result, so that each caller can modify what it gets back.
+    Works with threads (`do`) and asyncio tasks (`do_async`).
+
+    >>> group = SingleFlight()
+    >>> group.do('/apps/1', lambda: {'_id': '1'})
+    {'_id': '1'}
+    >>> sorted(group.stats().items())
+    [('calls', 1), ('coalesced', 0), ('executed', 1), ('in_flight', 0)]
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Call a function, unless an identical call is already in flight
+        :param key: hashable: identifies identical calls
+        :param function: callable: the call
+        :return: the call result
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                call.followers += 1
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.exception is not None:
+                raise call.exception
+            return copy.deepcopy(call.result)
+
+        try:
+            result = call.result = function(*args, **kwargs)
+        except BaseException as e:
+            call.exception = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                followers = call.followers
+            call.done.set()
+        # The shared result is kept intact for the followers
+        return copy.deepcopy(result) if followers else result
+
+    async def do_async(self, key, coroutine_function, *args, **kwargs):
+        """
+        Await a coroutine function, unless an identical call is already in flight in the same event loop.
+        The call goes on if the task which started it is cancelled, as long as other tasks wait for it.
+        :param key: hashable: identifies identical calls
+        :param coroutine_function: callable: the call, returning an awaitable
+        :return: the call result
+        """
+        task_key = (id(asyncio.get_event_loop()), key)
+        with self._lock:
+            self.calls += 1
+            call = self._tasks.get(task_key)
+            if call is None:
+                call = self._tasks[task_key] = _Call(asyncio.ensure_future(coroutine_function(*args, **kwargs)))
+                call.task.add_done_callback(lambda _: self._forget_task(task_key, call))
+                self.executed += 1
+            else:
+                call.followers += 1
+                self.coalesced += 1
+        result = await asyncio.shield(call.task)
+        return copy.deepcopy(result) if call.followers else result
+
+    def _forget_task(self, task_key, call):
+        with self._lock:
+            if self._tasks.get(task_key) is call:
+                del self._tasks[task_key]
+
+    def stats(self):
+        """
+        Return the counters, `coalesced` is the number of calls saved
+        :return: dict:
+        """
+        with self._lock:
+            return {'calls': self.calls, 'executed': self.executed, 'coalesced': self.coalesced,
+                    'in_flight': len(self._calls) + len(self._tasks)}
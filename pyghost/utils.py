@@ -1,4 +1,19 @@
+import binascii
+import codecs
+import random
 import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+HTML_TAG_RE = re.compile('<[^<]+?>')
+ANSI_ESCAPE_RE = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
+ANSI_ESCAPE_BYTES_RE = re.compile(rb'\x1B\[[0-?]*[ -/]*[@-~]')
+# An escape sequence cut at the end of a chunk, matched from the last ESC byte
+ANSI_PARTIAL_TAIL_BYTES_RE = re.compile(rb'\x1B(?:\[[0-?]*[ -/]*)?\Z')
+
+HTML_PANEL_SEPARATOR = '</div><div class="panel panel-default">'
 
 
 def trim_xml_html_tags(data_str):
@@ -20,7 +35,7 @@ def trim_xml_html_tags(data_str):
     >>> trim_xml_html_tags('<div><h1>hello world!</h1></div><div class="panel panel-default">:)')
     'hello world!\\n:)'
     """
-    return re.sub('<[^<]+?>', '', data_str.replace('</div><div class="panel panel-default">', "\n"))
+    return HTML_TAG_RE.sub('', data_str.replace(HTML_PANEL_SEPARATOR, "\n"))
 
 
 def trim_ansi_tags(data_str):
@@ -52,4 +67,246 @@ def trim_ansi_tags(data_str):
         data_str = data_str.decode('utf-8')
     except AttributeError:
         pass
-    return re.sub(r'\x1B\[[0-?]*[ -/]*[@-~]', '', data_str)
+    return ANSI_ESCAPE_RE.sub('', data_str)
+
+
+class LogDecoder(object):
+    """
+    Incremental decoder of a job log stream.
+    Works on bytes: base64 payloads, ANSI escape sequences and UTF-8 characters may be split between chunks.
+
+    >>> decoder = LogDecoder(no_color=True)
+    >>> decoder.feed(b'\\x1b[3'), decoder.feed(b'2mcaf\\xc3'), decoder.feed(b'\\xa9\\x1b[0m!')
+    ('', 'caf', 'é!')
+    >>> decoder = LogDecoder()
+    >>> decoder.decode_base64('aGVs'), decoder.decode_base64('bG8'), decoder.decode_base64('=')
+    (b'hel', b'', b'lo')
+    >>> LogDecoder(text=False).decode_event({'raw': 'aGVsbG8='})
+    b'hello'
+    >>> LogDecoder(no_color=True).decode_event({'html': '<b>\\x1b[1mhi\\x1b[0m</b>'})
+    'hi\\n'
+    >>> decoder = LogDecoder(no_color=True)
+    >>> decoder.feed(b'caf\\xc3'), decoder.pending
+    ('caf', 1)
+    """
+
+    def __init__(self, no_color=False, text=True, encoding='utf-8', errors='replace'):
+        """
+        :param no_color: bool: should ANSI tags be stripped
+        :param text: bool: return decoded strings, raw bytes otherwise
+        :param encoding: str: log encoding
+        :param errors: str: decoding errors handling
+        """
+        self.no_color = no_color
+        self.text = text
+        self._base64_tail = ''
+        self._ansi_tail = b''
+        self._text_decoder = codecs.getincrementaldecoder(encoding)(errors)
+
+    @property
+    def pending(self):
+        """
+        :return: int: number of log bytes kept back until the next chunk completes them
+        """
+        pending = len(self._ansi_tail)
+        if self.text:
+            pending += len(self._text_decoder.getstate()[0])
+        return pending
+
+    def decode_base64(self, data):
+        """
+        Decode a base64 payload, characters of an incomplete quantum are kept for the next payload
+        :param data: str|bytes: base64 data
+        :return: bytes:
+        """
+        if isinstance(data, bytes):
+            data = data.decode('ascii')
+        if self._base64_tail:
+            data = self._base64_tail + data
+        cut = len(data) - len(data) % 4
+        if cut != len(data):
+            data, self._base64_tail = data[:cut], data[cut:]
+        else:
+            self._base64_tail = ''
+        try:
+            return binascii.a2b_base64(data)
+        except binascii.Error as e:
+            raise ValueError('Invalid base64 log data') from e
+
+    def feed(self, data):
+        """
+        Decode a chunk of log bytes
+        :param data: bytes:
+        :return: str|bytes: decoded data, an incomplete trailing sequence is kept for the next chunk
+        """
+        if self.no_color:
+            if self._ansi_tail:
+                data = self._ansi_tail + data
+                self._ansi_tail = b''
+            last_escape = data.rfind(b'\x1b')
+            if last_escape != -1:
+                if ANSI_PARTIAL_TAIL_BYTES_RE.match(data, last_escape):
+                    data, self._ansi_tail = data[:last_escape], data[last_escape:]
+                data = ANSI_ESCAPE_BYTES_RE.sub(b'', data)
+        if self.text:
+            return self._text_decoder.decode(data)
+        return data
+
+    def decode_event(self, args):
+        """
+        Decode the payload of a `job` websocket event
+        :param args: dict: event payload
+        :return: str|bytes:
+        """
+        if 'raw' not in args:
+            # Backward compatibility, old API returns HTML data for WebUI
+            data_str = trim_xml_html_tags(args['html']) + "\n"
+            return ANSI_ESCAPE_RE.sub('', data_str) if self.no_color else data_str
+        return self.feed(self.decode_base64(args['raw']))
+
+    def flush(self):
+        """
+        Return the data kept back from the last chunks, at the end of the stream
+        :return: str|bytes:
+        """
+        data, self._ansi_tail = self._ansi_tail, b''
+        if self.text:
+            return self._text_decoder.decode(data, final=True)
+        return data
+
+
+class Backoff(object):
+    """
+    Exponential backoff delays with jitter
+
+    >>> backoff = Backoff(initial=1, maximum=5, factor=2, jitter=0)
+    >>> [backoff.next() for _ in range(5)]
+    [1, 2, 4, 5, 5]
+    >>> backoff.reset()
+    >>> backoff.next()
+    1
+    >>> 0.8 <= Backoff(initial=1, jitter=0.2).next() <= 1.2
+    True
+    """
+
+    def __init__(self, initial=0.5, maximum=5, factor=1.5, jitter=0.2):
+        """
+        :param initial: float: first delay, in seconds
+        :param maximum: float: maximum delay, in seconds
+        :param factor: float: delay multiplier between two attempts
+        :param jitter: float: random part of each delay, as a ratio of the delay
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self._delay = initial
+
+    def reset(self):
+        """
+        Restart from the initial delay
+        """
+        self._delay = self.initial
+
+    def next(self):
+        """
+        Return the next delay
+        :return: float: delay in seconds
+        """
+        delay = self._delay
+        self._delay = min(self._delay * self.factor, self.maximum)
+        if self.jitter:
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return delay
+
+
+class CircuitBreaker(object):
+    """
+    Fails fast after too many consecutive failures.
+    Once `failure_threshold` failures in a row are recorded, the circuit opens and no call is allowed for
+    `reset_timeout` seconds. A single trial call is then let through: its success closes the circuit again,
+    its failure re-opens it.
+
+    >>> breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    >>> breaker.record_failure()
+    >>> breaker.allow()
+    True
+    >>> breaker.record_failure()
+    >>> breaker.allow()
+    False
+    >>> breaker.record_success()
+    >>> breaker.allow()
+    True
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        """
+        :param failure_threshold: int: number of consecutive failures opening the circuit
+        :param reset_timeout: float: number of seconds the circuit stays open before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Check whether a call can be made, the first call after `reset_timeout` is the trial one
+        :return: bool:
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # Half-open: let this call through and keep the others out until it is recorded
+            self._opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        """
+        Record a successful call, closing the circuit
+        """
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        """
+        Record a failed call, opening the circuit after too many of them
+        """
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+def parse_retry_after(value):
+    """
+    Parse a `Retry-After` HTTP header
+    :param value: str: number of seconds or HTTP date
+    :return: float: delay in seconds, or None if the header is missing or invalid
+
+    >>> parse_retry_after('3')
+    3.0
+    >>> parse_retry_after('Mon, 01 Jan 2018 10:00:00 GMT')
+    0.0
+    >>> parse_retry_after('soon') is None
+    True
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if date is None:
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
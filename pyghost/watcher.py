@@ -0,0 +1,320 @@
+import collections
+import json
+import threading
+from email.utils import parsedate_to_datetime
+
+from .api_client import DEFAULT_ITER_PAGE_SIZE, FINISHED_JOB_STATUSES, JobCommands, JobStatuses
+from .utils import Backoff
+
+# Longest delay between two polls, in seconds, polls are closer while jobs are changing
+DEFAULT_WATCH_INTERVAL = 3
+
+# Job fields fetched by each poll
+JOB_WATCH_FIELDS = ('status', 'app_id', 'command', '_updated')
+
+_JOB_STATUSES = {status.value: status for status in JobStatuses}
+_JOB_COMMANDS = {command.value: command for command in JobCommands}
+
+JobEvent = collections.namedtuple('JobEvent', ['job_id', 'app_id', 'command', 'old_status', 'new_status', 'job'])
+
+
+class JobSubscription(object):
+    """
+    Handler of the events matching all the given filters, see `JobWatcher.subscribe`
+    """
+    __slots__ = ('handler', 'job_id', 'app_id', 'command')
+
+    def __init__(self, handler, job_id=None, app_id=None, command=None):
+        self.handler = handler
+        self.job_id = job_id
+        self.app_id = app_id
+        self.command = _JOB_COMMANDS.get(str(command), command) if command is not None else None
+
+    def matches(self, event):
+        return ((self.job_id is None or self.job_id == event.job_id) and
+                (self.app_id is None or self.app_id == event.app_id) and
+                (self.command is None or self.command == event.command))
+
+
+class JobWatcher(object):
+    """
+    Watches the status of all the jobs of a host with a single loop.
+    Each poll is one `{"_updated": {"$gte": last_seen}}` list query returning only the jobs changed since the
+    previous poll, whatever the number of jobs followed, plus a page per `DEFAULT_ITER_PAGE_SIZE` changed jobs.
+    Status changes are dispatched as `JobEvent` to the subscribers of the job, of its application or of its command.
+    The first poll only records the current state, jobs first seen afterwards are reported with a None `old_status`.
+    Handlers are called from the watcher thread and must not block.
+
+    >>> watcher = JobWatcher(None)
+    >>> events = []
+    >>> _ = watcher.subscribe(events.append, command=JobCommands.DEPLOY, start=False)
+    >>> watcher.feed([{'_id': 'j1', 'app_id': 'a1', 'command': 'deploy', 'status': 'init',
+    ...                '_updated': 'Mon, 01 Jan 2018 10:00:00 GMT'}])
+    1
+    >>> watcher.feed([{'_id': 'j1', 'app_id': 'a1', 'command': 'deploy', 'status': 'started',
+    ...                '_updated': 'Mon, 01 Jan 2018 10:00:05 GMT'},
+    ...               {'_id': 'j2', 'app_id': 'a1', 'command': 'buildimage', 'status': 'init',
+    ...                '_updated': 'Mon, 01 Jan 2018 10:00:05 GMT'}])
+    2
+    >>> [(event.job_id, event.old_status, event.new_status) for event in events]
+    [('j1', None, <JobStatuses.INIT: 'init'>), ('j1', <JobStatuses.INIT: 'init'>, <JobStatuses.STARTED: 'started'>)]
+    >>> watcher.status('j2'), watcher.last_seen
+    (<JobStatuses.INIT: 'init'>, 'Mon, 01 Jan 2018 10:00:05 GMT')
+    """
+
+    def __init__(self, jobs_api, backoff=None, exception_handler=None):
+        """
+        :param jobs_api: JobsApiClient instance
+        :param backoff: Backoff: delays between two polls, restarted from the shortest one when jobs change
+        :param exception_handler: function: called with the errors of the polls and of the handlers,
+                                  arguments: exception
+        """
+        self.jobs_api = jobs_api
+        self.backoff = backoff or Backoff(initial=1, maximum=DEFAULT_WATCH_INTERVAL)
+        self.exception_handler = exception_handler
+        self.last_seen = None
+        self.polls = 0
+        self._last_seen_date = None
+        # Last known (status, _updated date) of each job
+        self._jobs = {}
+        self._subscriptions = {'job_id': collections.defaultdict(list), 'app_id': collections.defaultdict(list),
+                               'command': collections.defaultdict(list), None: []}
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def subscribe(self, handler, job_id=None, app_id=None, command=None, start=True):
+        """
+        Register a status change handler, for the events matching all the given filters, all events if none is set
+        :param handler: function: arguments: JobEvent, statuses and commands are `JobStatuses` and `JobCommands`
+                        members when known
+        :param job_id: str: Job ID
+        :param app_id: str: Application ID
+        :param command: str|JobCommands: job command
+        :param start: bool: start the watcher loop if it is not running
+        :return: JobSubscription: to be given to `unsubscribe`
+        """
+        subscription = JobSubscription(handler, job_id, app_id, command)
+        with self._lock:
+            self._get_subscriptions(subscription).append(subscription)
+        if start:
+            self.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Unregister a handler
+        :param subscription: JobSubscription: returned by `subscribe`
+        """
+        with self._lock:
+            subscriptions = self._get_subscriptions(subscription)
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+
+    def _get_subscriptions(self, subscription):
+        for key in ('job_id', 'app_id', 'command'):
+            value = getattr(subscription, key)
+            if value is not None:
+                return self._subscriptions[key][value]
+        return self._subscriptions[None]
+
+    def status(self, job_id):
+        """
+        Return the last known status of a job in flight, or recently finished
+        :param job_id: str: Job ID
+        :return: JobStatuses: None if unknown
+        """
+        with self._lock:
+            state = self._jobs.get(job_id)
+        return state and state[0]
+
+    def start(self):
+        """
+        Start the watcher loop in a background thread, if it is not running
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name='pyghost-job-watcher', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """
+        Stop the watcher loop
+        """
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                if self.poll():
+                    self.backoff.reset()
+            except Exception as e:
+                # The loop goes on whatever happens, errors are lost without an `exception_handler`
+                self._handle_exception(e)
+            self._stopped.wait(self.backoff.next())
+
+    def _handle_exception(self, exception):
+        if self.exception_handler is not None:
+            self.exception_handler(exception)
+
+    def poll(self):
+        """
+        Fetch the jobs updated since the previous poll and dispatch their status changes
+
+        >>> class JobsApi(object):
+        ...     '''Serves 5 jobs updated during the same second, 2 per page'''
+        ...     path = '/jobs'
+        ...     requests = 0
+        ...     jobs = [{'_id': 'j%d' % i, 'status': 'started', '_updated': 'Mon, 01 Jan 2018 10:00:00 GMT'}
+        ...             for i in range(5)]
+        ...     def _get_query_params(self, fields):
+        ...         return {}
+        ...     def _do_list(self, path, nb, page, sort, where='{}'):
+        ...         self.requests += 1
+        ...         excluded = json.loads(where).get('_id', {}).get('$nin', [])
+        ...         items = [dict(job) for job in self.jobs if job['_id'] not in excluded]
+        ...         return items[:2], 2, len(items), 1
+        >>> api = JobsApi()
+        >>> watcher = JobWatcher(api)
+        >>> events = []
+        >>> _ = watcher.subscribe(events.append, start=False)
+        >>> watcher.poll(), api.requests, events
+        (5, 4, [])
+        >>> for job in api.jobs[1:4]:
+        ...     job['status'] = 'done'
+        >>> watcher.poll(), api.requests, [event.job_id for event in events]
+        (3, 7, ['j1', 'j2', 'j3'])
+
+        :return: int: number of status changes
+        """
+        api = self.jobs_api
+        params = api._get_query_params(JOB_WATCH_FIELDS)
+        if self.last_seen is None:
+            # Start from the most recently updated job rather than from the whole history
+            items, _, _, _ = api._do_list(api.path, 1, 1, '-_updated', **params)
+            if not items:
+                return 0
+            self._update_last_seen(items[0].get('_updated'))
+        # `_updated` has a one second resolution: jobs updated during that same second are fetched again, and
+        # ignored if their status did not change, rather than missed
+        jobs = []
+        since, since_ids = self.last_seen, []
+        while True:
+            # Keyset pagination: each page starts from the last job of the previous one, less the jobs already
+            # fetched during that second, rather than from a page number, so that jobs updated meanwhile cannot
+            # shift the pages
+            where = {'_updated': {'$gte': since}}
+            if since_ids:
+                where['_id'] = {'$nin': since_ids}
+            items, nb, _, _ = api._do_list(api.path, DEFAULT_ITER_PAGE_SIZE, 1, '_updated', where=json.dumps(where),
+                                           **params)
+            jobs.extend(items)
+            if len(items) < nb:
+                break
+            updated = items[-1].get('_updated')
+            if updated != since:
+                since, since_ids = updated, []
+            since_ids.extend(job['_id'] for job in items if job.get('_updated') == since)
+        silent = self.polls == 0
+        self.polls += 1
+        return self.feed(jobs, silent=silent)
+
+    def _update_last_seen(self, updated):
+        updated_date = _parse_date(updated)
+        if updated_date is not None and (self._last_seen_date is None or updated_date > self._last_seen_date):
+            self._last_seen_date = updated_date
+            self.last_seen = updated
+
+    def feed(self, jobs, silent=False, last_seen=None):
+        """
+        Process updated jobs and dispatch their status changes
+        :param jobs: iterable: job documents, with at least `_id` and `status`
+        :param silent: bool: only record the statuses, without dispatching anything
+        :param last_seen: str: `_updated` date the next polls start from, the most recent one of the jobs if not set
+        :return: int: number of status changes
+        """
+        events = []
+        with self._lock:
+            for job in jobs:
+                job_id = job['_id']
+                status = _JOB_STATUSES.get(job.get('status'), job.get('status'))
+                updated_date = _parse_date(job.get('_updated'))
+                if last_seen is None:
+                    self._update_last_seen(job.get('_updated'))
+                previous = self._jobs.get(job_id)
+                self._jobs[job_id] = (status, updated_date)
+                if previous is not None and previous[0] == status:
+                    continue
+                app_id = job.get('app_id')
+                if isinstance(app_id, dict):
+                    app_id = app_id.get('_id')
+                command = _JOB_COMMANDS.get(job.get('command'), job.get('command'))
+                events.append(JobEvent(job_id, app_id, command, previous and previous[0], status, job))
+            if last_seen is not None:
+                self._update_last_seen(last_seen)
+            self._forget_finished()
+            if silent:
+                return len(events)
+            dispatches = [(event, self._match(event)) for event in events]
+
+        for event, subscriptions in dispatches:
+            for subscription in subscriptions:
+                try:
+                    subscription.handler(event)
+                except Exception as e:
+                    if self.exception_handler is None:
+                        raise
+                    self._handle_exception(e)
+        return len(events)
+
+    def _match(self, event):
+        candidates = (self._subscriptions['job_id'].get(event.job_id, []) +
+                      self._subscriptions['app_id'].get(event.app_id, []) +
+                      self._subscriptions['command'].get(event.command, []) + self._subscriptions[None])
+        return [subscription for subscription in candidates if subscription.matches(event)]
+
+    def _forget_finished(self):
+        """
+        Drop the finished jobs which cannot be returned by the next polls anymore
+        """
+        forgotten = [job_id for job_id, (status, updated_date) in self._jobs.items()
+                     if str(status) in FINISHED_JOB_STATUSES and updated_date is not None and
+                     updated_date < self._last_seen_date]
+        for job_id in forgotten:
+            del self._jobs[job_id]
+
+
+def _parse_date(value):
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+_job_watchers = {}
+_job_watchers_lock = threading.Lock()
+
+
+def get_job_watcher(jobs_api):
+    """
+    Return the `JobWatcher` shared by all the jobs clients of a host and user
+    :param jobs_api: JobsApiClient instance, used by the watcher if it does not exist yet
+    :return: JobWatcher:
+    """
+    with _job_watchers_lock:
+        key = (jobs_api.host, jobs_api.username)
+        watcher = _job_watchers.get(key)
+        if watcher is None:
+            watcher = _job_watchers[key] = JobWatcher(jobs_api)
+        return watcher
@@ -9,8 +9,21 @@ import importlib
 
 modules = [
     "pyghost.api_client",
+    "pyghost.app_index",
     "pyghost.app_schema",
+    "pyghost.async_api_client",
+    "pyghost.cache",
+    "pyghost.disk_cache",
+    "pyghost.log_archive",
+    "pyghost.logs",
+    "pyghost.metrics",
+    "pyghost.rate_limit",
+    "pyghost.scheduler",
+    "pyghost.records",
+    "pyghost.schema_compiler",
+    "pyghost.single_flight",
     "pyghost.utils",
+    "pyghost.watcher",
 ]
 
 runner = doctest.DocTestRunner(verbose=True)
@@ -25,4 +25,9 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     install_requires=[str(ir.req) for ir in requirements],
+    extras_require={
+        'async': ['aiohttp>=3.3'],
+        'opentelemetry': ['opentelemetry-api'],
+        'zstd': ['zstandard'],
+    },
 )